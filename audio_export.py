@@ -0,0 +1,346 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from normalizer import normalize, NORMALIZER_VERSION
+from segmenter import split_text_into_chunks, chunk_sizes
+from tts_engine import wav_to_pcm, SAMPLE_RATE, SAMPLE_WIDTH, CHANNELS
+
+
+FORMATS = ("wav", "ogg", "mp3")
+MANIFEST_NAME = ".audio_export.json"
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def safe_file_name(title):
+    """Безопасное имя файла из заголовка текста"""
+    return "".join(i if i.isalnum() else "_" for i in title).rstrip("_") or "text"
+
+
+class AudioExporter:
+    """
+    Экспорт текстов категории в аудиофайлы (WAV, OGG, MP3).
+
+    Тексты синтезируются параллельно в workers потоках, у каждого потока свой
+    движок из engine_factory. Звук пишется в файл по предложениям, поэтому
+    большие тексты не держатся в памяти целиком. С кэшем синтеза (RenderCache)
+    уже произнесённые или экспортированные ранее предложения не синтезируются
+    повторно.
+
+    Готовые файлы записываются в манифест папки вместе с хэшем текста, голоса
+    и скорости. Повторный экспорт в ту же папку (например, после отмены)
+    пропускает готовые неизменённые тексты. Файлы пишутся во временные и
+    переименовываются по готовности, недописанных файлов не остаётся.
+
+    progress(done, total, title) вызывается из рабочих потоков после каждого
+    текста. OGG и MP3 кодируются через ffmpeg. lexicon - словарь
+    произношений (pronunciation.PronunciationLexicon), применяется после
+    нормализации.
+    """
+
+    def __init__(self, engine_factory, cache=None, workers=2, audio_format="wav",
+                 voice_id=None, speed=1.0, progress=None, lexicon=None):
+        if audio_format not in FORMATS:
+            raise ValueError(f"Неизвестный формат: {audio_format}")
+        self.engine_factory = engine_factory
+        self.cache = cache
+        self.workers = max(1, workers)
+        self.audio_format = audio_format
+        self.voice_id = voice_id
+        self.speed = speed
+        self.progress = progress
+        self.lexicon = lexicon
+        self.written = []
+        self.skipped = 0
+        self.failed = []
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._done = 0
+        self._total = 0
+        self._folder = None
+        self._manifest = {}
+
+    def cancel(self):
+        """Отмена экспорта: начатые тексты прерываются на ближайшем предложении"""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def export(self, texts, folder, single_file=None, numbered=True):
+        """
+        Экспорт текстов (строки get_texts_by_category) в папку folder.
+        С single_file все тексты собираются в один файл с таким именем
+        (без расширения), главы перечисляются в .cue рядом с ним.
+        Без numbered файлы называются по заголовкам без порядкового номера.
+        Возвращает список записанных файлов
+        """
+        if self.audio_format != "wav" and shutil.which("ffmpeg") is None:
+            raise RuntimeError(f"Для экспорта в {self.audio_format} нужен ffmpeg")
+        os.makedirs(folder, exist_ok=True)
+        self._folder = folder
+        self._manifest = self._load_manifest(folder)
+        self._done = 0
+        self._total = len(texts) + (1 if single_file else 0)
+
+        # Номер в имени сохраняет порядок текстов категории при прослушивании
+        # и не даёт текстам с одинаковыми заголовками перезаписать друг друга
+        jobs = []
+        used_names = set()
+        for number, (text_id, _, title, content) in enumerate(texts, 1):
+            name = f"{number:03d}_{safe_file_name(title)}" if numbered else safe_file_name(title)
+            suffix = 1
+            while name.lower() in used_names:
+                suffix += 1
+                name = f"{safe_file_name(title)}_{suffix}"
+            used_names.add(name.lower())
+            if single_file:
+                # Главы собираются из промежуточных WAV
+                jobs.append((title, content, os.path.join(".parts", name + ".wav"), "wav"))
+            else:
+                jobs.append((title, content, f"{name}.{self.audio_format}", self.audio_format))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                list(executor.map(self._export_text, jobs))
+            except BaseException:
+                # Например, KeyboardInterrupt: не ждём окончания всех текстов
+                self.cancel()
+                raise
+        if self.cancelled:
+            raise ExportCancelled()
+        if single_file and not self.failed:
+            path = os.path.join(folder, f"{single_file}.{self.audio_format}")
+            self._join_chapters([(job[0], os.path.join(folder, job[2])) for job in jobs], path)
+            shutil.rmtree(os.path.join(folder, ".parts"), ignore_errors=True)
+            with self._lock:
+                for job in jobs:
+                    self._manifest.pop(job[2], None)
+                self._save_manifest()
+                # Промежуточные файлы глав уже удалены
+                self.written = [path]
+            self._report(os.path.basename(path))
+        return list(self.written)
+
+    def stream(self, sentences):
+        """
+        Синтез предложений в workers потоках с выдачей WAV каждого
+        предложения по порядку. Вперёд синтезируется не больше workers * 2
+        предложений, поэтому память не зависит от длины текста
+        """
+        window = self.workers * 2
+        futures = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                for sentence in sentences:
+                    if self.cancelled:
+                        raise ExportCancelled()
+                    futures.append(executor.submit(self._synthesize, sentence))
+                    if len(futures) >= window:
+                        yield futures.popleft().result()
+                while futures:
+                    yield futures.popleft().result()
+            finally:
+                # Генератор закрыт раньше времени: лишнее не синтезируем
+                for future in futures:
+                    future.cancel()
+
+    def _synthesize(self, sentence):
+        engine = self._engine()
+        # Движку передаётся текст с числами и сокращениями словами
+        sentence = normalize(sentence).text
+        if self.lexicon:
+            sentence = self.lexicon.apply(sentence, engine.supports_ssml).text
+        if self.cache is not None:
+            return self.cache.get_or_render(engine, sentence)
+        return engine.synthesize(sentence)
+
+    def _engine(self):
+        engine = getattr(self._local, "engine", None)
+        if engine is None:
+            engine = self.engine_factory()
+            if self.voice_id is not None:
+                engine.set_voice(self.voice_id)
+            engine.set_rate(self.speed)
+            self._local.engine = engine
+        return engine
+
+    def _fingerprint(self, engine, title, content, audio_format):
+        # Другие правила нормализации или словарь произношений дают другой
+        # звук: файл пересоздаётся
+        lexicon = self.lexicon.fingerprint.hex() if self.lexicon and self.lexicon.fingerprint else ""
+        data = (f"{engine.name}\0{engine.voice_id}\0{engine.speed:.2f}\0{audio_format}\0"
+                f"{NORMALIZER_VERSION}\0{lexicon}\0{title}\0{content}")
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _export_text(self, job):
+        title, content, relative, audio_format = job
+        if self.cancelled:
+            return
+        path = os.path.join(self._folder, relative)
+        try:
+            engine = self._engine()
+            fingerprint = self._fingerprint(engine, title, content, audio_format)
+            with self._lock:
+                done = self._manifest.get(relative) == fingerprint and os.path.exists(path)
+            if done:
+                with self._lock:
+                    self.skipped += 1
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._render(content, path, audio_format)
+                with self._lock:
+                    self._manifest[relative] = fingerprint
+                    self._save_manifest()
+                    self.written.append(path)
+        except ExportCancelled:
+            return
+        except Exception as e:
+            print(f"Ошибка экспорта {title}: {e}")
+            with self._lock:
+                self.failed.append(title)
+        self._report(title)
+
+    def _render(self, content, path, audio_format):
+        # Фрагменты по длительности при скорости экспорта: меньше вызовов движка
+        sentences, _ = split_text_into_chunks(content, chunk_sizes(self.speed))
+        wav_path = path + ".part.wav"
+        try:
+            with wave.open(wav_path, "wb") as output:
+                # Формат по умолчанию нужен и для текста без предложений, и для
+                # закрытия файла при отмене; до записи звука его можно сменить
+                output.setframerate(SAMPLE_RATE)
+                output.setnchannels(CHANNELS)
+                output.setsampwidth(SAMPLE_WIDTH)
+                params = None
+                for sentence in sentences:
+                    if self.cancelled:
+                        raise ExportCancelled()
+                    audio = self._synthesize(sentence)
+                    pcm, sample_rate, channels, sample_width = wav_to_pcm(audio)
+                    if params is None:
+                        params = (sample_rate, channels, sample_width)
+                        output.setframerate(sample_rate)
+                        output.setnchannels(channels)
+                        output.setsampwidth(sample_width)
+                    elif params != (sample_rate, channels, sample_width):
+                        raise RuntimeError("Движок вернул звук в другом формате")
+                    output.writeframes(pcm)
+            if audio_format == "wav":
+                os.replace(wav_path, path)
+            else:
+                self._encode(wav_path, path, audio_format)
+        finally:
+            if os.path.exists(wav_path):
+                os.remove(wav_path)
+
+    @staticmethod
+    def _encode(wav_path, path, audio_format, metadata_path=None):
+        """Кодирование WAV через ffmpeg во временный файл с переименованием"""
+        temp_path = path + ".part"
+        command = ["ffmpeg", "-y", "-loglevel", "error", "-i", wav_path]
+        if metadata_path is not None:
+            command += ["-i", metadata_path, "-map_metadata", "1"]
+        command += ["-f", audio_format, temp_path]
+        try:
+            subprocess.run(command, capture_output=True, check=True)
+            os.replace(temp_path, path)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(e.stderr.decode("utf-8", "replace").strip())
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _join_chapters(self, chapters, path):
+        """Сборка глав в один файл и запись .cue с началом каждой главы"""
+        wav_path = path + ".part.wav"
+        metadata_path = path + ".metadata.txt"
+        starts = []
+        position = 0
+        sample_rate = SAMPLE_RATE
+        try:
+            with wave.open(wav_path, "wb") as output:
+                output.setparams((CHANNELS, SAMPLE_WIDTH, SAMPLE_RATE, 0, "NONE", "not compressed"))
+                for index, (title, chapter_path) in enumerate(chapters):
+                    with wave.open(chapter_path, "rb") as chapter:
+                        if index == 0:
+                            output.setparams(chapter.getparams())
+                            sample_rate = chapter.getframerate()
+                        elif chapter.getparams()[:3] != output.getparams()[:3]:
+                            raise RuntimeError("Главы записаны в разных форматах")
+                        starts.append((title, position / sample_rate))
+                        while True:
+                            frames = chapter.readframes(sample_rate)
+                            if not frames:
+                                break
+                            output.writeframes(frames)
+                        position += chapter.getnframes()
+            duration = position / sample_rate
+            self._write_cue(path, starts)
+            if self.audio_format == "wav":
+                os.replace(wav_path, path)
+            else:
+                with open(metadata_path, "w", encoding="utf-8") as f:
+                    f.write(";FFMETADATA1\n")
+                    for index, (title, start) in enumerate(starts):
+                        end = starts[index + 1][1] if index + 1 < len(starts) else duration
+                        f.write(f"[CHAPTER]\nTIMEBASE=1/1000\nSTART={int(start * 1000)}\n"
+                                f"END={int(end * 1000)}\ntitle={self._escape_metadata(title)}\n")
+                self._encode(wav_path, path, self.audio_format, metadata_path)
+        finally:
+            for temp_path in (wav_path, metadata_path):
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    def _write_cue(self, path, starts):
+        file_type = {"wav": "WAVE", "mp3": "MP3"}.get(self.audio_format, "OGG")
+        lines = [f'FILE "{os.path.basename(path)}" {file_type}']
+        for number, (title, start) in enumerate(starts, 1):
+            # Время в CUE: минуты, секунды и кадры (75 в секунду)
+            frames = int(round(start * 75))
+            lines.append(f"  TRACK {number:02d} AUDIO")
+            lines.append(f'    TITLE "{title.replace(chr(34), chr(39))}"')
+            lines.append(f"    INDEX 01 {frames // 4500:02d}:{frames // 75 % 60:02d}:{frames % 75:02d}")
+        cue_path = os.path.splitext(path)[0] + ".cue"
+        with open(cue_path + ".part", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(cue_path + ".part", cue_path)
+
+    @staticmethod
+    def _escape_metadata(value):
+        for char in "\\=;#\n":
+            value = value.replace(char, "\\" + char)
+        return value
+
+    def _report(self, title):
+        with self._lock:
+            self._done += 1
+            done = self._done
+        if self.progress is not None:
+            self.progress(done, self._total, title)
+
+    @staticmethod
+    def _load_manifest(folder):
+        try:
+            with open(os.path.join(folder, MANIFEST_NAME), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        path = os.path.join(self._folder, MANIFEST_NAME)
+        with open(path + ".part", "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, ensure_ascii=False, indent=1)
+        os.replace(path + ".part", path)
+
@@ -0,0 +1,534 @@
+import collections
+import threading
+import time
+import wave
+
+from tts_engine import TTSEngine, wav_to_pcm
+
+try:
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtMultimedia import QAudioFormat, QAudioSink, QMediaDevices
+except ImportError:  # без QtMultimedia доступны только NullSink и FileSink
+    QAudioSink = None
+
+
+# Буфер устройства вывода: столько звука уже отдано устройству, на столько
+# же может запаздывать остановка или перемотка
+BUFFER_MS = 100
+# Период, с которым поток вывода дописывает буфер и проверяет события
+PERIOD_MS = 10
+
+
+class RingBuffer:
+    """
+    Кольцевой буфер байтов фиксированной ёмкости. write() берёт столько,
+    сколько помещается, read() отдаёт накопленное в порядке записи. Буфер
+    не синхронизирован: из нескольких потоков (QtSink) - под замком владельца
+    """
+
+    def __init__(self, capacity):
+        self._data = bytearray(capacity)
+        self._start = 0
+        self._size = 0
+
+    @property
+    def capacity(self):
+        return len(self._data)
+
+    def __len__(self):
+        return self._size
+
+    def free(self):
+        return len(self._data) - self._size
+
+    def write(self, data):
+        """Запись начала data; возвращает количество записанных байт"""
+        capacity = len(self._data)
+        count = min(len(data), capacity - self._size)
+        position = (self._start + self._size) % capacity if capacity else 0
+        first = min(count, capacity - position)
+        self._data[position:position + first] = data[:first]
+        self._data[:count - first] = data[first:count]
+        self._size += count
+        return count
+
+    def read(self, size):
+        """До size байт из начала буфера"""
+        capacity = len(self._data)
+        count = min(size, self._size)
+        first = min(count, capacity - self._start)
+        data = bytes(self._data[self._start:self._start + first]) + bytes(self._data[:count - first])
+        self._start = (self._start + count) % capacity if capacity else 0
+        self._size -= count
+        return data
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+
+class NullSink:
+    """
+    Устройство вывода без звука: данные копятся в RingBuffer на buffer_ms и
+    "проигрываются" по часам с частотой дискретизации (realtime=False -
+    сразу при записи). Для проверки конвейера вывода без звуковой карты.
+
+    Протокол устройства (все методы вызываются из потока вывода):
+    open(частота, каналы, байт на отсчёт), write(data) -> записано байт,
+    free(), played() - байт проиграно с open(), pause(), resume(),
+    reset() - сброс недоигранного, close()
+    """
+
+    def __init__(self, buffer_ms=BUFFER_MS, realtime=True, clock=time.monotonic):
+        self.buffer_ms = buffer_ms
+        self.realtime = realtime
+        self.clock = clock
+        self.buffer = None
+        self._frame = 1
+        self._byte_rate = 1
+        self._played = 0
+        self._mark = 0.0
+        self._paused = False
+
+    def open(self, sample_rate, channels, sample_width):
+        self._frame = channels * sample_width
+        self._byte_rate = sample_rate * self._frame
+        frames = max(1, sample_rate * self.buffer_ms // 1000)
+        self.buffer = RingBuffer(frames * self._frame)
+        self._played = 0
+        self._mark = self.clock()
+        self._paused = False
+
+    def write(self, data):
+        self._drain()
+        count = min(len(data), self.buffer.free())
+        return self.buffer.write(data[:count - count % self._frame])
+
+    def free(self):
+        self._drain()
+        return self.buffer.free()
+
+    def played(self):
+        self._drain()
+        return self._played
+
+    def pause(self):
+        self._drain()
+        self._paused = True
+
+    def resume(self):
+        if self._paused:
+            self._paused = False
+            self._mark = self.clock()
+
+    def reset(self):
+        self._drain()
+        self.buffer.clear()
+
+    def close(self):
+        self.buffer = None
+
+    def _drain(self):
+        if self._paused or not self.buffer:
+            return
+        if self.realtime:
+            now = self.clock()
+            count = min(int((now - self._mark) * self._byte_rate) // self._frame * self._frame, len(self.buffer))
+            if count == len(self.buffer):
+                # Буфер опустел: устройство простаивает до следующей записи
+                self._mark = now
+            else:
+                self._mark += count / self._byte_rate
+        else:
+            count = len(self.buffer)
+        if count:
+            self._consume(self.buffer.read(count))
+            self._played += count
+
+    def _consume(self, data):
+        pass
+
+
+class FileSink(NullSink):
+    """
+    Вывод в WAV-файл: в файл попадает ровно то, что было бы проиграно,
+    включая место паузы и обрыв при остановке. По умолчанию без
+    ожидания реального времени
+    """
+
+    def __init__(self, path, buffer_ms=BUFFER_MS, realtime=False, clock=time.monotonic):
+        super().__init__(buffer_ms, realtime, clock)
+        self.path = path
+        self._file = None
+
+    def open(self, sample_rate, channels, sample_width):
+        self.close()
+        super().open(sample_rate, channels, sample_width)
+        self._file = wave.open(self.path, "wb")
+        self._file.setnchannels(channels)
+        self._file.setsampwidth(sample_width)
+        self._file.setframerate(sample_rate)
+
+    def close(self):
+        if self._file is not None:
+            self._drain()
+            self._file.close()
+            self._file = None
+        super().close()
+
+    def _consume(self, data):
+        if self._file is not None:
+            self._file.writeframes(data)
+
+
+class QtSink:
+    """
+    Вывод на звуковое устройство по умолчанию через QAudioSink (режим
+    push). QAudioSink живёт в потоке GUI: объект создаётся там же, и его
+    таймер каждые PERIOD_MS переносит звук из RingBuffer в буфер
+    QAudioSink размером buffer_ms. Поток вывода только пишет в RingBuffer
+    и выставляет запросы (открытие, пауза, сброс), которые таймер
+    выполняет при следующем срабатывании. Проиграно - отданное устройству
+    минус ещё не проигранное им. Пауза - suspend(): недоигранный звук
+    остаётся в буферах и продолжается с того же отсчёта
+    """
+
+    def __init__(self, buffer_ms=BUFFER_MS):
+        if QAudioSink is None:
+            raise RuntimeError("Не установлен модуль PyQt6.QtMultimedia")
+        self.buffer_ms = buffer_ms
+        self._lock = threading.Lock()
+        # Запросы потока вывода; номер открытия меняется при каждом open() и close()
+        self.buffer = None
+        self._format = None
+        self._opening = 0
+        self._paused = False
+        self._reset = False
+        self._frame = 1
+        self._played = 0
+        # Состояние в потоке GUI
+        self._sink = None
+        self._device = None
+        self._sink_opening = 0
+        self._sink_paused = False
+        self._carry = b""
+        self._pushed = 0
+        self._pending = 0
+        self._timer = QTimer()
+        self._timer.setInterval(PERIOD_MS)
+        self._timer.timeout.connect(self._pump)
+        self._timer.start()
+
+    def open(self, sample_rate, channels, sample_width):
+        with self._lock:
+            self._frame = channels * sample_width
+            self.buffer = RingBuffer(max(1, sample_rate * self.buffer_ms // 1000) * self._frame)
+            self._format = (sample_rate, channels, sample_width)
+            self._opening += 1
+            self._paused = False
+            self._reset = False
+            self._played = 0
+
+    def write(self, data):
+        with self._lock:
+            count = min(len(data), self.buffer.free())
+            return self.buffer.write(data[:count - count % self._frame])
+
+    def free(self):
+        with self._lock:
+            return self.buffer.free()
+
+    def played(self):
+        with self._lock:
+            if self._reset or self._sink_opening != self._opening:
+                # Сброс или открытие ещё не выполнены: отсчёт стоит на месте
+                return self._played
+            return max(0, self._pushed - self._pending)
+
+    def pause(self):
+        with self._lock:
+            self._paused = True
+
+    def resume(self):
+        with self._lock:
+            self._paused = False
+
+    def reset(self):
+        with self._lock:
+            if not self._reset:
+                self._played = max(0, self._pushed - self._pending)
+            self._reset = True
+            self.buffer.clear()
+
+    def close(self):
+        with self._lock:
+            self._format = None
+            self._opening += 1
+            self.buffer = None
+
+    def _pump(self):
+        """Срабатывание таймера в потоке GUI"""
+        with self._lock:
+            if self._sink_opening != self._opening:
+                self._open_sink(self._format)
+                self._sink_opening = self._opening
+            if self._sink is None:
+                return
+            if self._reset:
+                # reset() отбрасывает буфер QAudioSink и останавливает вывод
+                self._reset = False
+                self._carry = b""
+                self._sink.reset()
+                self._device = self._sink.start()
+                self._sink_paused = False
+                self._pushed = self._played
+                self._pending = 0
+            if self._paused != self._sink_paused:
+                self._sink_paused = self._paused
+                self._sink.suspend() if self._paused else self._sink.resume()
+            if not self._paused:
+                free = self._sink.bytesFree()
+                data = self._carry + self.buffer.read(max(0, free - len(self._carry)))
+                if data:
+                    written = max(0, self._device.write(data))
+                    self._carry = data[written:]
+                    self._pushed += written
+            self._pending = self._sink.bufferSize() - self._sink.bytesFree()
+
+    def _open_sink(self, audio_format):
+        if self._sink is not None:
+            self._sink.stop()
+            self._sink = None
+            self._device = None
+        self._carry = b""
+        self._pushed = 0
+        self._pending = 0
+        self._sink_paused = False
+        if audio_format is None:
+            return
+        sample_rate, channels, sample_width = audio_format
+        qt_format = QAudioFormat()
+        qt_format.setSampleRate(sample_rate)
+        qt_format.setChannelCount(channels)
+        qt_format.setSampleFormat(QAudioFormat.SampleFormat.Int16 if sample_width == 2
+                                  else QAudioFormat.SampleFormat.UInt8)
+        self._sink = QAudioSink(QMediaDevices.defaultAudioOutput(), qt_format)
+        self._sink.setBufferSize(max(1, sample_rate * self.buffer_ms // 1000) * channels * sample_width)
+        self._device = self._sink.start()
+
+
+def create_sink(name):
+    """
+    Устройство вывода по имени: "qt" - звуковая карта (QtMultimedia),
+    "null" - без звука, иначе путь к WAV-файлу
+    """
+    if name == "qt":
+        return QtSink()
+    if name == "null":
+        return NullSink()
+    return FileSink(name)
+
+
+class BufferedEngine(TTSEngine):
+    """
+    Движок с собственным выводом звука.
+
+    Текст синтезируется в память движком из engine_factory (synthesize_words)
+    в отдельном потоке, не дальше lookahead фраз вперёд; готовый WAV
+    (speak_audio) проходит ту же очередь без синтеза. Поток вывода
+    дописывает звук в буфер устройства (sink) и сообщает о начале и конце
+    потоков и о словах, когда до них доходит проигранная часть.
+
+    Пауза останавливает устройство на текущем отсчёте: буфер и очередь
+    сохраняются, resume() продолжает с того же места без повторного
+    синтеза. purge() сбрасывает очередь и буфер устройства, поэтому
+    остановка и перемотка запаздывают не больше чем на период вывода.
+    """
+
+    def __init__(self, engine_factory, sink=None, lookahead=2):
+        super().__init__()
+        self.engine_factory = engine_factory
+        # Экземпляр для голосов и синхронного синтеза в потоке владельца
+        self.engine = engine_factory()
+        self.name = self.engine.name
+        self.supports_ssml = self.engine.supports_ssml
+        self.voice_id = self.engine.voice_id
+        self.speed = self.engine.speed
+        self.sink = sink if sink is not None else NullSink()
+        self.lookahead = lookahead
+        self._condition = threading.Condition()
+        self._texts = collections.deque()  # (поколение, номер потока, текст, WAV)
+        self._ready = collections.deque()  # (номер потока, PCM, формат, слова)
+        self._generation = 0
+        self._stream_number = 0
+        self._active = 0
+        self._paused = False
+        self._closed = False
+        self._threads = [threading.Thread(target=self._run_synthesis, daemon=True),
+                         threading.Thread(target=self._run_output, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def list_voices(self):
+        return self.engine.list_voices()
+
+    def set_voice(self, voice_id):
+        self.engine.set_voice(voice_id)
+        self.voice_id = voice_id
+
+    def set_rate(self, speed):
+        self.engine.set_rate(speed)
+        self.speed = speed
+
+    def speak(self, text):
+        return self._enqueue(text, None)
+
+    def speak_audio(self, wav):
+        return self._enqueue(None, wav)
+
+    def _enqueue(self, text, wav):
+        with self._condition:
+            self._stream_number += 1
+            self._active += 1
+            self._texts.append((self._generation, self._stream_number, text, wav))
+            self._condition.notify_all()
+            return self._stream_number
+
+    def purge(self):
+        with self._condition:
+            self._generation += 1
+            self._texts.clear()
+            self._ready.clear()
+            self._active = 0
+            self._condition.notify_all()
+
+    def pause(self):
+        with self._condition:
+            self._paused = True
+            self._condition.notify_all()
+
+    def resume(self):
+        with self._condition:
+            self._paused = False
+            self._condition.notify_all()
+
+    def is_speaking(self):
+        with self._condition:
+            return self._active > 0
+
+    def synthesize(self, text):
+        return self.engine.synthesize(text)
+
+    def close(self):
+        """Остановка потоков и закрытие устройства"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _run_synthesis(self):
+        engine = None
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or (
+                    self._texts and len(self._ready) < self.lookahead))
+                if self._closed:
+                    break
+                generation, stream_number, text, wav = self._texts.popleft()
+                voice_id, speed = self.voice_id, self.speed
+            words = []
+            try:
+                if wav is None:
+                    # Свой экземпляр движка: объекты COM нельзя делить между потоками
+                    if engine is None:
+                        engine = self.engine_factory()
+                    if voice_id is not None and engine.voice_id != voice_id:
+                        engine.set_voice(voice_id)
+                    if engine.speed != speed:
+                        engine.set_rate(speed)
+                    wav, words = engine.synthesize_words(text)
+                pcm, sample_rate, channels, sample_width = wav_to_pcm(wav)
+                audio_format = (sample_rate, channels, sample_width)
+            except Exception as e:
+                # Поток всё равно заканчивается, чтобы очередь шла дальше
+                print(f"Ошибка синтеза: {e}")
+                pcm, audio_format, words = b"", None, []
+            with self._condition:
+                if generation == self._generation:
+                    self._ready.append((stream_number, pcm, audio_format, words))
+                    self._condition.notify_all()
+
+    def _run_output(self):
+        sink = self.sink
+        sink_format = None
+        generation = None
+        paused = False
+        current = None  # (PCM, записано байт)
+        events = collections.deque()  # (позиция в звуке устройства, обработчик, аргументы)
+        written = 0
+        period = PERIOD_MS / 1000
+        try:
+            while True:
+                with self._condition:
+                    if self._closed:
+                        break
+                    if generation != self._generation:
+                        # purge(): недоигранное отбрасывается
+                        generation = self._generation
+                        current = None
+                        events.clear()
+                        if sink_format is not None:
+                            sink.reset()
+                            written = sink.played()
+                    if paused != self._paused:
+                        paused = self._paused
+                        if sink_format is not None:
+                            sink.pause() if paused else sink.resume()
+                    if paused or (current is None and not events and not self._ready):
+                        self._condition.wait()
+                        continue
+                    if current is None and self._ready:
+                        audio_format = self._ready[0][2]
+                        # Смена формата - только после того, как доиграно прежнее
+                        if audio_format is None or audio_format == sink_format or not events:
+                            stream_number, pcm, _, words = self._ready.popleft()
+                            self._condition.notify_all()
+                            if audio_format is not None and audio_format != sink_format:
+                                if sink_format is not None:
+                                    sink.close()
+                                sink.open(*audio_format)
+                                sink_format = audio_format
+                                written = 0
+                            events.append((written, self.on_start_stream, (stream_number,)))
+                            events.extend((written + offset, self.on_word, (stream_number, position, length))
+                                          for offset, position, length in words)
+                            events.append((written + len(pcm), self._end_stream, (stream_number,)))
+                            current = (memoryview(pcm), 0)
+                if current is not None and sink_format is not None:
+                    pcm, offset = current
+                    count = sink.write(pcm[offset:offset + sink.free()])
+                    written += count
+                    offset += count
+                    current = (pcm, offset) if offset < len(pcm) else None
+                elif current is not None:
+                    current = None
+                played = sink.played() if sink_format is not None else written
+                while events and events[0][0] <= played:
+                    _, handler, args = events.popleft()
+                    with self._condition:
+                        if generation != self._generation:
+                            break
+                    self._emit(handler, *args)
+                with self._condition:
+                    if generation == self._generation and paused == self._paused and (
+                            current is None or not sink.free()) and (events or current is not None):
+                        self._condition.wait(period)
+        finally:
+            if sink_format is not None:
+                sink.close()
+
+    def _end_stream(self, stream_number):
+        with self._condition:
+            self._active = max(0, self._active - 1)
+        self._emit(self.on_end_stream, stream_number)
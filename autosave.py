@@ -0,0 +1,226 @@
+import hashlib
+import threading
+
+
+# Автосохранение: через AUTOSAVE_DELAY_MS после последней правки, но при
+# непрерывном наборе не реже, чем раз в AUTOSAVE_MAX_DELAY_MS
+AUTOSAVE_DELAY_MS = 1000
+AUTOSAVE_MAX_DELAY_MS = 5000
+
+
+def changed_bytes(old, new):
+    """
+    Размер изменённого участка между двумя версиями (байты UTF-8): всё,
+    кроме общего начала и общего конца. Сравнение срезами с двоичным
+    поиском не перебирает символы в Python
+    """
+    limit = min(len(old), len(new))
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[:middle] == new[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    prefix = low
+    low, high = 0, limit - prefix
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[len(old) - middle:] == new[len(new) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+    suffix = low
+    return max(len(old), len(new)) - prefix - suffix
+
+
+class AutosaveService:
+    """
+    Фоновое сохранение текстов в базу.
+
+    submit() только запоминает последнюю версию текста и сразу возвращает
+    управление; хэши считаются в отдельном потоке, запись выполняет поток
+    записи db (DatabaseManager). Версии, накопившиеся за время предыдущей
+    записи, сохраняются одной транзакцией, промежуточные версии одного
+    текста не пишутся. Текст, хэш
+    которого совпадает с сохранённым, не записывается. Индекс предложений
+    (submit_index) записывается после содержимого, для которого построен.
+
+    Откладывание сохранения на время набора (debounce) остаётся на стороне
+    окна: оно решает, когда взять снимок документа. on_saved(count) и
+    on_error(message) вызываются из потока записи.
+
+    stats() возвращает счётчики и коэффициент усиления записи (сколько байт
+    записано в базу на байт реально изменённого текста).
+    """
+
+    def __init__(self, db, on_saved=None, on_error=None):
+        self.db = db
+        self.on_saved = on_saved
+        self.on_error = on_error
+        self._condition = threading.Condition()
+        self._pending = {}  # id текста -> (заголовок, содержимое, индекс предложений)
+        self._in_flight = {}  # версии, которые сейчас записываются
+        # id текста -> (заголовок, хэш, содержимое в UTF-8); для только что
+        # загруженного текста хэш считается при первой записи
+        self._saved = {}
+        self._writing = False
+        self._closed = False
+        self.requests = 0
+        self.skipped = 0
+        self.written = 0
+        self.transactions = 0
+        self.bytes_written = 0
+        self.bytes_changed = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def track(self, text_id, title, content):
+        """
+        Текст загружен из базы: его версия считается сохранённой. Сохранённые
+        версии других текстов, не ожидающих записи, забываются. content=None -
+        текст загружен по частям и целиком не известен: первая правка будет
+        записана без сравнения
+        """
+        with self._condition:
+            self._saved = {key: value for key, value in self._saved.items()
+                           if key in self._pending or key in self._in_flight}
+            self._saved[text_id] = (title, None, content)
+
+    def latest(self, text_id):
+        """
+        Переданная, но ещё не записанная версия текста (заголовок, содержимое)
+        или None: её нужно показывать вместо версии из базы
+        """
+        with self._condition:
+            for versions in (self._pending, self._in_flight):
+                version = versions.get(text_id)
+                if version is not None and version[1] is not None:
+                    return version[:2]
+            return None
+
+    def submit(self, text_id, title, content):
+        """Новая версия текста для сохранения (предыдущая несохранённая заменяется)"""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Автосохранение остановлено")
+            self.requests += 1
+            # Индекс предыдущей версии к новой не подходит
+            self._pending[text_id] = (title, content, None)
+            self._condition.notify_all()
+
+    def submit_index(self, text_id, packed):
+        """
+        Индекс предложений (SentenceIndex.pack) последней переданной или
+        сохранённой версии текста. Следующий submit() этого текста индекс
+        отменяет
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Автосохранение остановлено")
+            previous = self._pending.get(text_id)
+            if previous is not None:
+                self._pending[text_id] = previous[:2] + (packed,)
+            else:
+                self._pending[text_id] = (None, None, packed)
+            self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Ожидание записи всех переданных версий"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def close(self):
+        """Запись оставшихся версий и остановка потока"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "requests": self.requests,
+                "skipped": self.skipped,
+                "written": self.written,
+                "transactions": self.transactions,
+                "bytes_written": self.bytes_written,
+                "bytes_changed": self.bytes_changed,
+                "write_amplification": self.bytes_written / self.bytes_changed if self.bytes_changed else 0.0,
+            }
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    break
+                batch, self._pending = self._pending, {}
+                self._in_flight = batch
+                self._writing = True
+            try:
+                self._write(batch)
+                failed = False
+            except Exception as e:
+                self._report_error(f"Ошибка сохранения текста: {str(e)}")
+                failed = True
+            with self._condition:
+                self._writing = False
+                self._in_flight = {}
+                if failed:
+                    # Несохранённые версии ждут следующей правки (или закрытия)
+                    for text_id, version in batch.items():
+                        self._pending.setdefault(text_id, version)
+                    self._condition.notify_all()
+                    if self._closed:
+                        break
+                    requests = self.requests
+                    self._condition.wait_for(lambda: self.requests != requests or self._closed)
+                self._condition.notify_all()
+
+    def _write(self, batch):
+        rows = []
+        saved = {}
+        changed = 0
+        skipped = 0
+        indexes = [(text_id, packed) for text_id, (_, _, packed) in batch.items() if packed is not None]
+        for text_id, (title, content, _) in batch.items():
+            if content is None:
+                continue
+            data = content.encode("utf-8")
+            digest = hashlib.blake2b(data).digest()
+            with self._condition:
+                previous = self._saved.get(text_id)
+            if previous is not None and previous[2] is None:
+                previous = None
+            if previous is not None and previous[1] is None:
+                old = previous[2].encode("utf-8")
+                previous = (previous[0], hashlib.blake2b(old).digest(), old)
+            if previous is not None and previous[0] == title and previous[1] == digest:
+                skipped += 1
+                continue
+            rows.append((text_id, title, content))
+            saved[text_id] = (title, digest, data)
+            changed += changed_bytes(previous[2], data) if previous is not None else len(data)
+            if previous is not None and previous[0] != title:
+                changed += len(title.encode("utf-8"))
+        # Текст, хранящийся частями, записывается не целиком: update_texts
+        # возвращает действительно записанный объём
+        written = self.db.update_texts(rows) if rows else 0
+        if indexes:
+            self.db.save_sentence_indexes(indexes)
+        with self._condition:
+            self._saved.update(saved)
+            self.skipped += skipped
+            self.written += len(rows)
+            self.transactions += 1 if rows else 0
+            self.bytes_written += written + sum(len(title.encode("utf-8")) for title, _, _ in saved.values())
+            self.bytes_changed += changed
+        if rows and self.on_saved is not None:
+            self.on_saved(len(rows))
+
+    def _report_error(self, message):
+        if self.on_error is not None:
+            self.on_error(message)
+        else:
+            print(message)
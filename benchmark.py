@@ -0,0 +1,1532 @@
+"""
+Замеры производительности отдельных компонентов приложения.
+
+Запуск:
+    python benchmark.py segmenter [--sizes 1 10 50]
+    python benchmark.py index [--sizes 1 10 50]
+    python benchmark.py highlight [--sizes 0.1 1 5]   (нужен PyQt6)
+    python benchmark.py gap [--sentences 200]
+    python benchmark.py playback [--sentences 100000]
+    python benchmark.py cache [--sentences 500] [--replays 3]
+    python benchmark.py prerender [--sentences 60] [--synthesis-ms-per-char 0.5]
+    python benchmark.py export [--texts 24] [--jobs 1 2 4 8]
+    python benchmark.py stream [--sentences 200] [--jobs 1 2 4 8]
+    python benchmark.py listing [--texts 2000] [--sizes-kb 1 16 128]
+    python benchmark.py database [--texts 100000] [--categories 100]
+    python benchmark.py search [--texts 100000]
+    python benchmark.py autosave [--size-kb 256] [--keystrokes 2000]
+    python benchmark.py storage [--size-mb 50]
+    python benchmark.py pool [--readers 4] [--writers 4] [--writes 500]
+    python benchmark.py import [--files 10000] [--jobs 1 4]
+    python benchmark.py resume [--pages 1000]
+    python benchmark.py textexport [--texts 2000] [--size-kb 64] [--large-mb 20]
+    python benchmark.py revisions [--size-kb 512] [--edits 200] [--copies 5]
+    python benchmark.py normalize [--size-mb 10]
+    python benchmark.py pronunciation [--entries 100000] [--size-mb 2]
+    python benchmark.py chunks [--size-kb 512] [--run-ons 20] [--overhead-ms 100]
+    python benchmark.py words [--seconds 10] [--speedups 1 10 50]   (с PyQt6 - с перерисовкой)
+    python benchmark.py audio [--sentences 12] [--pauses 6] [--buffers 20 50 100 200]
+"""
+import argparse
+import random
+import sys
+import time
+
+from segmenter import split_text_into_sentences, SentenceIndex
+from tts_engine import FakeEngine
+from playback import SentenceQueue, WordTracker
+from render_cache import RenderCache
+from renderer import RenderPool
+from audio_export import AudioExporter
+from text_search import build_match_query
+
+
+SAMPLE_SENTENCES = [
+    "Мороз и солнце; день чудесный!",
+    "Ещё ты дремлешь, друг прелестный — пора, красавица, проснись.",
+    "Вечор, ты помнишь, вьюга злилась, на мутном небе мгла носилась; луна, как бледное пятно, сквозь тучи мрачные желтела.",
+    "Под голубыми небесами великолепными коврами, блестя на солнце, снег лежит; прозрачный лес один чернеет.",
+    "И ель сквозь иней зеленеет, и речка подо льдом блестит.",
+    "Вся комната янтарным блеском озарена, весёлым треском трещит затопленная печь.",
+    "Приятно думать у лежанки, но знаешь, не велеть ли в санки кобылку бурую запречь?",
+    "Скользя по утреннему снегу, друг милый, предадимся бегу нетерпеливого коня.",
+    "«Куда ты идёшь?» — спросил он.",
+    "Цена выросла на 3.5 процента, т.е. почти вдвое.",
+    "Он жил на ул. Ленина, д. 5... Потом переехал.",
+    "А. С. Пушкин родился в 1799 г. в Москве.",
+    "Глава 1: Начало",
+    "Что же делать?",
+]
+
+
+def make_corpus(size_bytes, seed=0):
+    """Генерация русского текста примерно заданного размера в байтах UTF-8"""
+    rnd = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size_bytes:
+        paragraph = " ".join(rnd.choice(SAMPLE_SENTENCES) for _ in range(rnd.randint(3, 12)))
+        parts.append(paragraph)
+        total += len(paragraph.encode("utf-8")) + 1
+    return "\n".join(parts)
+
+
+def legacy_split_text_into_sentences(text):
+    """Прежняя реализация MainWindow.split_text_into_sentences (для сравнения)"""
+    sentences = []
+    positions = []
+    current_sentence = ""
+    current_start = 0
+
+    for i, char in enumerate(text):
+        current_sentence += char
+        if char in '.!?\n:;':
+            sentences.append(current_sentence.strip())
+            positions.append((current_start, i + 1))
+            current_sentence = ""
+            current_start = i + 1
+
+    if current_sentence.strip():
+        sentences.append(current_sentence.strip())
+        positions.append((current_start, len(text)))
+
+    filtered_sentences = []
+    filtered_positions = []
+    for sentence, pos in zip(sentences, positions):
+        if sentence:
+            filtered_sentences.append(sentence)
+            filtered_positions.append(pos)
+
+    return filtered_sentences, filtered_positions
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_segmenter(args):
+    print(f"{'Размер':>8} {'Прежний, с':>12} {'Новый, с':>10} {'Ускорение':>10} {'Предложений':>12}")
+    for size_mb in args.sizes:
+        text = make_corpus(int(size_mb * 1024 * 1024))
+        legacy_time, _ = timed(legacy_split_text_into_sentences, text)
+        new_time, (sentences, _) = timed(split_text_into_sentences, text)
+        print(f"{size_mb:>6} МБ {legacy_time:>12.2f} {new_time:>10.2f} "
+              f"{legacy_time / new_time:>9.1f}x {len(sentences):>12}")
+
+
+def bench_index(args):
+    """
+    Правка в середине документа и повторный старт воспроизведения: правка
+    внутри абзаца и правка, добавляющая абзац (Enter)
+    """
+    print(f"{'Размер':>8} {'Переразбиение, мс':>18} {'Индекс, мс':>11} {'Новый абзац, мс':>16}")
+    for size_mb in args.sizes:
+        text = make_corpus(int(size_mb * 1024 * 1024))
+        index = SentenceIndex(text)
+        position = len(text) // 2
+        results = []
+        for insert in (" Вставленное предложение.", "\n"):
+            new_text = text[:position] + insert + text[position:]
+
+            def edit_and_start():
+                index.apply_change(position, 0, len(insert), lambda a, b: new_text[a:b])
+                # Старт воспроизведения: число предложений и первое предложение
+                return len(index), index.sentence(0), index.position(len(index) // 2)
+
+            results.append(timed(edit_and_start)[0])
+            text = new_text
+        full_time, _ = timed(split_text_into_sentences, text)
+        print(f"{size_mb:>6} МБ {full_time * 1000:>18.1f} {results[0] * 1000:>11.3f} {results[1] * 1000:>16.3f}")
+
+
+def bench_highlight(args):
+    """Стоимость выделения одного предложения в зависимости от размера документа"""
+    import os
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication, QTextEdit
+    from PyQt6.QtGui import QTextCursor, QTextCharFormat, QColor
+
+    app = QApplication.instance() or QApplication([])
+    highlight_format = QTextCharFormat()
+    highlight_format.setBackground(QColor(0, 255, 255, 100))
+    normal_format = QTextCharFormat()
+    normal_format.setBackground(QColor(0, 0, 0, 0))
+
+    def merge_format_highlight(edit, start, end):
+        # Прежний способ: сброс формата всего документа и новый формат диапазона
+        cursor = edit.textCursor()
+        cursor.select(QTextCursor.SelectionType.Document)
+        cursor.mergeCharFormat(normal_format)
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        cursor.mergeCharFormat(highlight_format)
+
+    def extra_selection_highlight(edit, start, end):
+        cursor = QTextCursor(edit.document())
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        selection = QTextEdit.ExtraSelection()
+        selection.cursor = cursor
+        selection.format = highlight_format
+        edit.setExtraSelections([selection])
+
+    print(f"{'Размер':>8} {'mergeCharFormat, мс':>20} {'ExtraSelections, мс':>20} {'Шагов отмены':>13}")
+    for size_mb in args.sizes:
+        text = make_corpus(int(size_mb * 1024 * 1024))
+        _, positions = split_text_into_sentences(text)
+        steps = positions[:args.steps]
+        results = []
+        for method in (merge_format_highlight, extra_selection_highlight):
+            edit = QTextEdit()
+            edit.setPlainText(text)
+            edit.document().clearUndoRedoStacks()
+
+            def run():
+                for start, end in steps:
+                    method(edit, start, end)
+                    app.processEvents()
+
+            elapsed, _ = timed(run)
+            results.append((elapsed / len(steps) * 1000, edit.document().availableUndoSteps()))
+        print(f"{size_mb:>6} МБ {results[0][0]:>20.3f} {results[1][0]:>20.3f} "
+              f"{results[0][1]:>6}/{results[1][1]:<6}")
+
+
+def inter_sentence_gaps(engine):
+    """Паузы между концом фразы и началом следующей по журналу FakeEngine"""
+    return [nxt[2] - prev[3] for prev, nxt in zip(engine.spoken, engine.spoken[1:])]
+
+
+def play_polling(engine, sentences, interval=0.1):
+    """Прежняя схема: опрос состояния движка таймером"""
+    index = 0
+    engine.speak(sentences[index])
+    while True:
+        engine.advance(interval)
+        if not engine.is_speaking():
+            index += 1
+            if index >= len(sentences):
+                break
+            engine.speak(sentences[index])
+    return engine
+
+
+def play_events(engine, sentences):
+    """Переход к следующему предложению по событию окончания потока"""
+    state = {"index": 0}
+
+    def on_end_stream(stream_number):
+        state["index"] += 1
+        if state["index"] < len(sentences):
+            engine.speak(sentences[state["index"]])
+
+    engine.on_end_stream = on_end_stream
+    engine.speak(sentences[0])
+    engine.run_until_idle()
+    return engine
+
+
+def play_queue(engine, sentences, lookahead=3):
+    """Очередь из нескольких предложений, заранее поставленных в движок"""
+    queue = SentenceQueue(engine, sentences, lookahead)
+    engine.on_end_stream = queue.finish
+    queue.start(0)
+    engine.run_until_idle()
+    return engine
+
+
+def bench_gap(args):
+    sentences, _ = split_text_into_sentences(make_corpus(64 * 1024))
+    sentences = sentences[:args.sentences]
+    print(f"Задержка старта синтеза в пустой очереди: {args.latency * 1000:.0f} мс")
+    print(f"{'Схема':>10} {'Средняя пауза, мс':>18} {'Макс. пауза, мс':>16} {'Общее время, с':>15}")
+    for name, player in (("Опрос", play_polling), ("События", play_events), ("Очередь", play_queue)):
+        engine = player(FakeEngine(start_latency=args.latency), sentences)
+        gaps = inter_sentence_gaps(engine)
+        print(f"{name:>10} {sum(gaps) / len(gaps) * 1000:>18.1f} {max(gaps) * 1000:>16.1f} "
+              f"{engine.spoken[-1][3]:>15.1f}")
+
+
+def bench_playback(args):
+    """Нагрузочный прогон очереди воспроизведения на FakeEngine с перемотками"""
+    rnd = random.Random(0)
+    sentences = [rnd.choice(SAMPLE_SENTENCES) for _ in range(args.sentences)]
+    engine = FakeEngine(chars_per_second=1000.0)
+    queue = SentenceQueue(engine, sentences)
+    engine.on_end_stream = queue.finish
+    seeks = 0
+
+    start = time.perf_counter()
+    queue.start(0)
+    while queue.current_index is not None:
+        engine.advance(1.0)
+        if rnd.random() < 0.05 and queue.current_index is not None:
+            # Перемотка как по кнопкам BtnNext/BtnPrevious
+            target = max(0, min(len(sentences) - 1, queue.current_index + rnd.choice((-1, 1))))
+            queue.purge()
+            queue.start(target)
+            seeks += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"Предложений: {len(sentences)}, перемоток: {seeks}, вызовов speak: {len(engine.enqueued)}")
+    print(f"Виртуальное время: {engine.clock:.0f} с, реальное: {elapsed:.2f} с "
+          f"({elapsed / len(engine.enqueued) * 1e6:.1f} мкс на вызов speak)")
+
+
+def bench_cache(args):
+    """Повторное чтение одного текста через кэш синтеза"""
+    import tempfile
+
+    rnd = random.Random(0)
+    # Уникальные предложения: в кэше не должно быть случайных совпадений
+    sentences = [f"{rnd.choice(SAMPLE_SENTENCES)} ({i})" for i in range(args.sentences)]
+    with tempfile.TemporaryDirectory() as directory:
+        cache = RenderCache(directory, max_bytes=args.max_mb * 1024 * 1024)
+        print(f"{'Проход':>7} {'Попадания':>10} {'Промахи':>8} {'Отдано, МБ':>11} {'Время, с':>9}")
+        for replay in range(1, args.replays + 1):
+            before = cache.stats()
+            engine = FakeEngine()
+            queue = SentenceQueue(engine, sentences, cache=cache)
+            engine.on_end_stream = queue.finish
+            elapsed, _ = timed(lambda: (queue.start(0), engine.run_until_idle()))
+            after = cache.stats()
+            print(f"{replay:>7} {after['hits'] - before['hits']:>10} {after['misses'] - before['misses']:>8} "
+                  f"{(after['bytes_served'] - before['bytes_served']) / 1e6:>11.1f} {elapsed:>9.2f}")
+        stats = cache.stats()
+        print(f"Итого: доля попаданий {stats['hit_rate']:.0%}, записей {stats['entries']}, "
+              f"размер {stats['size_bytes'] / 1e6:.1f} МБ, вытеснено {stats['evictions']}")
+
+
+def bench_prerender(args):
+    """
+    Время, которое поток GUI проводит в синтезе: синтез при промахе кэша
+    против фонового пула. Виртуальное время FakeEngine идёт в time_scale раз
+    быстрее реального, чтобы пул успевал работать между предложениями.
+    """
+    import tempfile
+
+    rnd = random.Random(0)
+    sentences = [f"{rnd.choice(SAMPLE_SENTENCES)} ({i})" for i in range(args.sentences)]
+    synthesis = args.synthesis_ms_per_char / 1000
+
+    def run(with_pool, directory):
+        cache = RenderCache(directory)
+        engine = FakeEngine(synthesis_seconds_per_char=synthesis)
+        pool = RenderPool(lambda: FakeEngine(synthesis_seconds_per_char=synthesis), cache,
+                          workers=args.workers) if with_pool else None
+        queue = SentenceQueue(engine, sentences, cache=cache, renderer=pool)
+        engine.on_end_stream = queue.finish
+        blocked = []
+        started = time.perf_counter()
+        queue.start(0)
+        blocked.append(time.perf_counter() - started)
+        while engine.next_event_time() is not None:
+            delay = engine.next_event_time() - engine.clock
+            time.sleep(delay / args.time_scale)
+            started = time.perf_counter()
+            engine.advance(delay)
+            blocked.append(time.perf_counter() - started)
+        if pool is not None:
+            pool.close()
+        return blocked, cache.stats()
+
+    print(f"{'Схема':>12} {'Блокировка GUI, с':>18} {'Макс. шаг, мс':>14} {'Доля попаданий':>15}")
+    for name, with_pool in (("При промахе", False), ("Фоновый пул", True)):
+        with tempfile.TemporaryDirectory() as directory:
+            blocked, stats = run(with_pool, directory)
+        print(f"{name:>12} {sum(blocked):>18.2f} {max(blocked) * 1000:>14.1f} {stats['hit_rate']:>15.0%}")
+
+
+def bench_export(args):
+    """
+    Экспорт категории в WAV с разным числом потоков, затем повторный экспорт
+    в ту же папку (продолжение) и экспорт новых файлов из прогретого кэша.
+    Синтез FakeEngine занимает реальное время (synthesis_seconds_per_char).
+    """
+    import tempfile
+
+    rnd = random.Random(0)
+    texts = []
+    for i in range(args.texts):
+        sentences = [f"{rnd.choice(SAMPLE_SENTENCES)} ({i}.{j})" for j in range(args.sentences)]
+        texts.append((i, 1, f"Текст {i}", " ".join(sentences)))
+    synthesis = args.synthesis_ms_per_char / 1000
+
+    def factory():
+        return FakeEngine(synthesis_seconds_per_char=synthesis)
+
+    print(f"{'Прогон':>22} {'Время, с':>9} {'Записано':>9} {'Пропущено':>10}")
+    baseline = None
+    for jobs in args.jobs:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = RenderCache(f"{directory}/cache")
+            exporter = AudioExporter(factory, cache, workers=jobs)
+            elapsed, _ = timed(exporter.export, texts, f"{directory}/out")
+            baseline = baseline or elapsed
+            print(f"{f'{jobs} потоков':>22} {elapsed:>9.2f} {len(exporter.written):>9} {exporter.skipped:>10}"
+                  f"  x{baseline / elapsed:.1f}")
+            if jobs != args.jobs[-1]:
+                continue
+            exporter = AudioExporter(factory, cache, workers=jobs)
+            elapsed, _ = timed(exporter.export, texts, f"{directory}/out")
+            print(f"{'Продолжение':>22} {elapsed:>9.2f} {len(exporter.written):>9} {exporter.skipped:>10}")
+            exporter = AudioExporter(factory, cache, workers=jobs)
+            elapsed, _ = timed(exporter.export, texts, f"{directory}/again")
+            print(f"{'Из кэша в новую папку':>22} {elapsed:>9.2f} {len(exporter.written):>9} {exporter.skipped:>10}")
+
+
+def bench_stream(args):
+    """
+    Потоковый синтез для вывода в stdout (python -m tts_cli): время до первого
+    звука и общее время при разном числе потоков, без кэша
+    """
+    rnd = random.Random(0)
+    sentences = [f"{rnd.choice(SAMPLE_SENTENCES)} ({i})" for i in range(args.sentences)]
+    synthesis = args.synthesis_ms_per_char / 1000
+
+    print(f"{'Потоков':>8} {'Первый звук, мс':>16} {'Всего, с':>9} {'Ускорение':>10}")
+    baseline = None
+    for jobs in args.jobs:
+        exporter = AudioExporter(lambda: FakeEngine(synthesis_seconds_per_char=synthesis), workers=jobs)
+        start = time.perf_counter()
+        first = None
+        for _ in exporter.stream(sentences):
+            if first is None:
+                first = time.perf_counter() - start
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{jobs:>8} {first * 1000:>16.1f} {elapsed:>9.2f} {baseline / elapsed:>9.1f}x")
+
+
+def bench_listing(args):
+    """
+    Смена категории: прежняя загрузка списка через get_texts_by_category
+    (с содержимым) против первой страницы и полного списка get_text_list
+    """
+    import os
+    import tempfile
+    from database import DatabaseManager
+
+    print(f"{'Текст, КБ':>10} {'С содержимым, мс':>17} {'Страница, мс':>13} {'Весь список, мс':>16}")
+    for size_kb in args.sizes_kb:
+        with tempfile.TemporaryDirectory() as directory:
+            db = DatabaseManager(os.path.join(directory, "texts.db"))
+            category_id = db.add_category("Тест")
+            other_id = db.add_category("Другая")
+            content = make_corpus(int(size_kb * 1024))
+            db.write(lambda cursor: cursor.executemany(
+                "INSERT INTO texts (category_id, title, content, content_length) VALUES (?, ?, ?, ?)",
+                ((category_id if i % 2 else other_id, f"Текст {i}", content, len(content))
+                 for i in range(args.texts * 2)))).result()
+            full, rows = timed(db.get_texts_by_category, category_id)
+            page, _ = timed(db.get_text_list, category_id, args.page_size, 0)
+            listing, _ = timed(db.get_text_list, category_id)
+            db.close()
+        print(f"{size_kb:>10g} {full * 1000:>17.1f} {page * 1000:>13.2f} {listing * 1000:>16.1f}")
+
+
+def bench_database(args):
+    """
+    База из texts текстов в прежней структуре (без индексов, журнал отката)
+    против той же базы после обновления схемы на месте (индексы, WAL)
+    """
+    import os
+    import sqlite3
+    import tempfile
+    from database import DatabaseManager, MIGRATIONS, PRAGMAS
+
+    rnd = random.Random(0)
+    content = make_corpus(int(args.size_kb * 1024))
+    category_ids = list(range(1, args.categories + 1))
+    sample_categories = rnd.sample(category_ids, min(20, len(category_ids)))
+    sample_texts = rnd.sample(range(1, args.texts + 1), 1000)
+
+    def measure(conn, listing_sql):
+        # Запросы те же, что в DatabaseManager
+        results = {}
+        results["Тексты категории"] = timed(lambda: [conn.execute(
+            "SELECT id, category_id, title, content FROM texts WHERE category_id = ? "
+            "ORDER BY sort_index, created_at DESC", (c,)).fetchall() for c in sample_categories])[0]
+        results["Список категории"] = timed(lambda: [conn.execute(
+            listing_sql, (c,)).fetchall() for c in sample_categories])[0]
+        results["Загрузка текста"] = timed(lambda: [conn.execute(
+            "SELECT content FROM texts WHERE id = ?", (i,)).fetchall() for i in sample_texts])[0]
+
+        def updates():
+            for i in sample_texts[:args.updates]:
+                conn.execute("UPDATE texts SET title = ?, updated_at = (datetime('now', 'localtime')) "
+                             "WHERE id = ?", (f"Текст {i}", i))
+                conn.commit()
+        results["Сохранение"] = timed(updates)[0]
+        return results
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "texts.db")
+        conn = sqlite3.connect(path)
+        MIGRATIONS[0](conn.cursor())
+        with conn:
+            conn.executemany("INSERT INTO categories (name) VALUES (?)",
+                             ((f"Категория {c}",) for c in category_ids))
+            conn.executemany("INSERT INTO texts (category_id, title, content, sort_index) VALUES (?, ?, ?, ?)",
+                             ((rnd.choice(category_ids), f"Текст {i}", content, i % 50)
+                              for i in range(args.texts)))
+        before = measure(conn, "SELECT id, title, sort_index, length(content), updated_at FROM texts "
+                               "WHERE category_id = ? ORDER BY sort_index, created_at DESC")
+        conn.close()
+
+        upgrade, db = timed(DatabaseManager, path)
+        db.close()
+        # Соединения DatabaseManager только читают, сохранения меряются на
+        # обычном соединении с теми же настройками
+        conn = sqlite3.connect(path)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        after = measure(conn, "SELECT id, title, sort_index, content_length, updated_at FROM texts "
+                              "WHERE category_id = ? ORDER BY sort_index, created_at DESC")
+        conn.close()
+
+    print(f"{args.texts} текстов по {args.size_kb:g} КБ, обновление схемы {upgrade:.2f} с")
+    print(f"{'Операция':>18} {'До, мс':>10} {'После, мс':>10} {'Ускорение':>10}")
+    for name in before:
+        print(f"{name:>18} {before[name] * 1000:>10.1f} {after[name] * 1000:>10.1f} "
+              f"{before[name] / after[name]:>9.1f}x")
+
+
+def bench_search(args):
+    """
+    Полнотекстовый поиск (FTS5) против LIKE по содержимому на базе из
+    texts текстов. Словарь - vocabulary основ с падежными окончаниями,
+    частоты слов по закону Ципфа; запросы - слова разной частоты в других
+    формах, чем в текстах
+    """
+    import itertools
+    import os
+    import tempfile
+    from database import DatabaseManager
+
+    rnd = random.Random(0)
+    syllables = ["ка", "ро", "ми", "ле", "ту", "на", "во", "ск", "пр", "ди", "ба", "зо", "гр", "че", "шу"]
+    bases = set()
+    while len(bases) < args.vocabulary:
+        bases.add("".join(rnd.choice(syllables) for _ in range(rnd.randint(2, 4))) + rnd.choice("кнтрлмд"))
+    bases = sorted(bases)
+    rnd.shuffle(bases)
+    endings = ["", "а", "у", "ом", "е", "ами", "ах", "ов"]
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(bases))))
+    words_per_text = int(args.size_kb * 1024 / 8)
+
+    def make_text():
+        return " ".join(base + rnd.choice(endings)
+                        for base in rnd.choices(bases, cum_weights=weights, k=words_per_text))
+
+    # Запросы: слово по частотному рангу в форме, которой может не быть в тексте
+    queries = [(f"ранг {rank}", bases[rank] + "ами") for rank in (10, 300, 3000, args.vocabulary - 1)]
+    queries.append(("два слова", f"{bases[50]}ом {bases[500]}у"))
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = DatabaseManager(os.path.join(directory, "texts.db"))
+        category_id = db.add_category("Тест")
+        indexing, _ = timed(lambda: db.write(lambda cursor: cursor.executemany(
+            "INSERT INTO texts (category_id, title, content, content_length) VALUES (?, ?, ?, 0)",
+            ((category_id, f"Текст {i}", make_text()) for i in range(args.texts)))).result())
+        print(f"{args.texts} текстов по {args.size_kb:g} КБ, вставка с индексацией {indexing:.1f} с")
+        print(f"{'Запрос':>12} {'Совпадений':>11} {'FTS5, мс':>9} {'LIKE, мс':>9}")
+        for name, query in queries:
+            fts, _ = timed(db.search_texts, query, args.limit)
+            matches = db.conn.execute("SELECT count(*) FROM texts_fts WHERE texts_fts MATCH ?",
+                                      (build_match_query(query),)).fetchone()[0]
+            # LIKE без индекса просматривает содержимое всех текстов
+            pattern = "%" + query.split()[0][:-3] + "%"
+            like, _ = timed(lambda: db.conn.execute(
+                "SELECT count(*) FROM texts WHERE content LIKE ?", (pattern,)).fetchone())
+            print(f"{name:>12} {matches:>11} {fts * 1000:>9.2f} {like * 1000:>9.1f}")
+        db.close()
+
+
+def bench_autosave(args):
+    """
+    Сеанс набора: keystrokes правок в тексте size_kb КБ с паузами, часть
+    потерь фокуса без правок. Прежняя схема сохраняет весь текст в потоке
+    окна при каждой потере фокуса; новая снимает документ после паузы в
+    наборе (время виртуальное) и пишет его в потоке AutosaveService
+    """
+    import os
+    import tempfile
+    from autosave import AutosaveService, AUTOSAVE_DELAY_MS, AUTOSAVE_MAX_DELAY_MS
+    from database import DatabaseManager
+
+    rnd = random.Random(0)
+    content = make_corpus(int(args.size_kb * 1024))
+    # Сеанс: (момент в мс, позиция правки или None для потери фокуса)
+    events = []
+    now = 0
+    cursor = rnd.randint(0, len(content))
+    for _ in range(args.keystrokes):
+        # Обычно 100-250 мс между нажатиями, иногда пауза, после которой
+        # правка продолжается в другом месте текста
+        if rnd.random() > 0.03:
+            now += rnd.randint(100, 250)
+            cursor += 1
+        else:
+            now += rnd.randint(1500, 8000)
+            cursor = rnd.randint(0, len(content))
+        events.append((now, None if rnd.random() < args.focus_rate else cursor))
+
+    def edits():
+        # Правки вставляют букву в позицию курсора
+        text = content
+        for moment, position in events:
+            if position is not None:
+                text = text[:position] + "а" + text[position:]
+            yield moment, position, text
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "texts.db")
+        db = DatabaseManager(path)
+        text_id = db.save_text(db.add_category("Тест"), "Текст", content)
+
+        # Прежняя схема: update_text при каждой потере фокуса
+        saves = 0
+        old_bytes = 0
+        old_blocking = 0.0
+        for _, position, text in edits():
+            if position is None:
+                elapsed, _ = timed(db.update_text, text_id, "Текст", text)
+                old_blocking += elapsed
+                old_bytes += len(text.encode("utf-8"))
+                saves += 1
+        db.update_text(text_id, "Текст", content)
+        db.close()
+
+        # Новая схема: таймер откладывания как в окне, запись в фоне
+        db = DatabaseManager(path)
+        service = AutosaveService(db)
+        service.track(text_id, "Текст", content)
+        new_blocking = 0.0
+        submits = 0
+        dirty_since = None
+        deadline = None
+        revision = saved_revision = 0
+        for moment, position, text in edits():
+            if deadline is not None and moment >= deadline:
+                # Таймер сработал до этого события
+                elapsed, _ = timed(service.submit, text_id, "Текст", pending_text)
+                new_blocking += elapsed
+                submits += 1
+                saved_revision = revision
+                dirty_since = deadline = None
+            if position is None:
+                # Потеря фокуса больше ничего не сохраняет
+                continue
+            revision += 1
+            pending_text = text
+            if dirty_since is None:
+                dirty_since = moment
+            deadline = moment + max(0, min(AUTOSAVE_DELAY_MS, AUTOSAVE_MAX_DELAY_MS - (moment - dirty_since)))
+            # Запись в фоне идёт параллельно набору: даём ей время между нажатиями
+            time.sleep(0.0005)
+        if revision != saved_revision:
+            elapsed, _ = timed(service.submit, text_id, "Текст", pending_text)
+            new_blocking += elapsed
+            submits += 1
+        service.close()
+        db.close()
+        stats = service.stats()
+
+    edited = sum(1 for _, position in events if position is not None)
+    print(f"Текст {args.size_kb:g} КБ, правок {edited}, потерь фокуса {len(events) - edited}, "
+          f"сеанс {events[-1][0] / 60000:.1f} мин")
+    print(f"{'Схема':>12} {'Сохранений':>11} {'Транзакций':>11} {'Записано, МБ':>13} {'Окно, мс':>9}")
+    print(f"{'фокус':>12} {saves:>11} {saves:>11} {old_bytes / 2 ** 20:>13.1f} {old_blocking * 1000:>9.1f}")
+    print(f"{'фон':>12} {submits:>11} {stats['transactions']:>11} "
+          f"{stats['bytes_written'] / 2 ** 20:>13.1f} {new_blocking * 1000:>9.2f}")
+    print(f"Пропущено без изменений: {stats['skipped']}, усиление записи: {stats['write_amplification']:.0f}x "
+          f"(изменено {stats['bytes_changed']} байт)")
+
+
+def bench_storage(args):
+    """
+    Текст size_mb МБ одной строкой texts.content (прежнее хранение) против
+    сжатых частей text_chunks: размер базы, открытие (время и пик памяти
+    Python при чтении целиком и при потоковом чтении по частям) и
+    сохранение после правки одного слова (время и объём журнала WAL)
+    """
+    import os
+    import tempfile
+    import tracemalloc
+    from database import DatabaseManager
+
+    content = make_corpus(int(args.size_mb * 2 ** 20))
+    position = len(content) // 2
+    edited = content[:position] + "правка " + content[position:]
+
+    def wal_size(db):
+        return os.path.getsize(db.db_name + "-wal") if os.path.exists(db.db_name + "-wal") else 0
+
+    def measure(db, text_id, save):
+        db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        # Пик памяти Python при открытии; память SQLite не учитывается
+        tracemalloc.start()
+        whole, _ = timed(db.get_text_content, text_id)
+        whole_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        tracemalloc.start()
+        streamed, _ = timed(lambda: sum(len(piece) for piece in db.iter_text_content(text_id)))
+        streamed_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        saving, _ = timed(save)
+        return whole, whole_peak, streamed, streamed_peak, saving, wal_size(db)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        db = DatabaseManager(os.path.join(directory, "inline.db"))
+        category_id = db.add_category("Тест")
+        # Прежнее хранение: запросы те же, что до хранения частями
+        text_id = db.write(lambda cursor: cursor.execute(
+            "INSERT INTO texts (category_id, title, content, content_length) VALUES (?, ?, ?, ?)",
+            (category_id, "Текст", content, len(content))).lastrowid).result()
+
+        def save_inline():
+            db.write(lambda cursor: cursor.execute(
+                "UPDATE texts SET title = ?, content = ?, content_length = ?, "
+                "updated_at = (datetime('now', 'localtime')) WHERE id = ?",
+                ("Текст", edited, len(edited), text_id))).result()
+        row = measure(db, text_id, save_inline)
+        db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        results.append(("строка", os.path.getsize(db.db_name)) + row)
+        db.close()
+
+        db = DatabaseManager(os.path.join(directory, "chunked.db"))
+        category_id = db.add_category("Тест")
+        writing, text_id = timed(db.save_text, category_id, "Текст", content)
+        row = measure(db, text_id, lambda: db.update_text(text_id, "Текст", edited))
+        db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        results.append(("части", os.path.getsize(db.db_name)) + row)
+        chunks = db.conn.execute("SELECT count(*) FROM text_chunks").fetchone()[0]
+        db.close()
+
+    size = len(content.encode("utf-8"))
+    print(f"Текст {size / 2 ** 20:.1f} МБ, {chunks} частей, первая запись частями {writing:.1f} с")
+    print(f"{'Хранение':>9} {'База, МБ':>9} {'Чтение, мс':>11} {'Память, МБ':>11} "
+          f"{'Потоком, мс':>12} {'Память, МБ':>11} {'Правка, мс':>11} {'WAL, МБ':>8}")
+    for name, db_size, whole, whole_peak, streamed, streamed_peak, saving, wal in results:
+        print(f"{name:>9} {db_size / 2 ** 20:>9.1f} {whole * 1000:>11.0f} {whole_peak / 2 ** 20:>11.1f} "
+              f"{streamed * 1000:>12.0f} {streamed_peak / 2 ** 20:>11.2f} {saving * 1000:>11.0f} "
+              f"{wal / 2 ** 20:>8.2f}")
+
+
+def bench_pool(args):
+    """
+    Фоновые потоки работают с базой одновременно: readers потоков читают
+    случайные тексты (с паузой pause_ms на обработку прочитанного), writers
+    потоков сохраняют по writes правок. Прежний
+    доступ - одно соединение на всех под блокировкой с фиксацией каждой
+    записи; новый - соединения потоков для чтения и поток записи,
+    объединяющий записи в транзакции
+    """
+    import os
+    import sqlite3
+    import tempfile
+    import threading
+    from database import DatabaseManager, PRAGMAS
+
+    content = make_corpus(int(args.size_kb * 1024))
+
+    def run(read, write):
+        stop = threading.Event()
+        latencies = []
+
+        def reader(seed):
+            rnd = random.Random(seed)
+            while not stop.is_set():
+                elapsed, _ = timed(read, rnd.randint(1, args.texts))
+                latencies.append(elapsed)
+                time.sleep(args.pause_ms / 1000)
+
+        def writer(seed):
+            rnd = random.Random(seed)
+            for i in range(args.writes):
+                write(rnd.randint(1, args.texts), f"Текст {seed}-{i}")
+
+        readers = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+        writers = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+        for thread in readers:
+            thread.start()
+        start = time.perf_counter()
+        for thread in writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for thread in readers:
+            thread.join()
+        latencies.sort()
+        return elapsed, len(latencies), latencies[len(latencies) * 99 // 100], latencies[-1]
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        db = DatabaseManager(os.path.join(directory, "texts.db"))
+        category_id = db.add_category("Тест")
+        db.write(lambda cursor: cursor.executemany(
+            "INSERT INTO texts (category_id, title, content, content_length) VALUES (?, ?, ?, ?)",
+            ((category_id, f"Текст {i}", content, len(content)) for i in range(args.texts)))).result()
+        db.close()
+
+        # Прежний доступ: соединение окна, общее для всех потоков
+        conn = sqlite3.connect(db.db_name, check_same_thread=False)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        lock = threading.Lock()
+
+        def read_shared(text_id):
+            with lock:
+                conn.execute("SELECT content FROM texts WHERE id = ?", (text_id,)).fetchall()
+
+        def write_shared(text_id, title):
+            with lock:
+                conn.execute("UPDATE texts SET title = ? WHERE id = ?", (title, text_id))
+                conn.commit()
+        measured = run(read_shared, write_shared)
+        conn.close()
+        results.append(("общее", args.writers * args.writes) + measured)
+
+        db = DatabaseManager(db.db_name)
+
+        def write_queued(text_id, title):
+            db.write(lambda cursor: cursor.execute("UPDATE texts SET title = ? WHERE id = ?",
+                                                   (title, text_id))).result()
+        measured = run(db.get_text_content, write_queued)
+        transactions, _ = db.write_stats()
+        db.close()
+        results.append(("потоки", transactions) + measured)
+
+    print(f"{args.texts} текстов по {args.size_kb:g} КБ, читателей {args.readers}, "
+          f"писателей {args.writers} по {args.writes} записей, процессоров {os.cpu_count()}")
+    print(f"{'Доступ':>8} {'Записи, с':>10} {'Транзакций':>11} {'Чтений/с':>9} "
+          f"{'Чтение p99, мс':>15} {'Чтение макс, мс':>16}")
+    for name, transactions, elapsed, reads, p99, worst in results:
+        print(f"{name:>8} {elapsed:>10.2f} {transactions:>11} {reads / elapsed:>9.0f} "
+              f"{p99 * 1000:>15.2f} {worst * 1000:>16.2f}")
+
+
+def bench_import(args):
+    """
+    Импорт папки из files файлов (txt в UTF-8 и cp1251, html, fb2, epub,
+    часть - повторы) по size_kb КБ: прежний путь - чтение файлов по одному
+    и save_text на каждый файл - против BulkImporter с jobs процессами
+    """
+    import os
+    import tempfile
+    import zipfile
+    from database import DatabaseManager
+    from importer import BulkImporter, find_files, extract_text
+
+    rnd = random.Random(0)
+
+    def write_files(root):
+        for i in range(args.files):
+            folder = os.path.join(root, f"Автор {i % 20}")
+            os.makedirs(folder, exist_ok=True)
+            # Каждый двадцатый файл повторяет один из предыдущих
+            seed = rnd.randrange(i) if i and i % 20 == 0 else i
+            content = make_corpus(int(args.size_kb * 1024), seed)
+            kind = i % 20
+            path = os.path.join(folder, f"Текст {i}")
+            if kind == 1:
+                with open(path + ".html", "w", encoding="utf-8") as f:
+                    f.write("<html><head><title>Текст</title></head><body>" +
+                            "".join(f"<p>{line}</p>" for line in content.split("\n")) + "</body></html>")
+            elif kind == 2:
+                with open(path + ".fb2", "wb") as f:
+                    f.write(('<?xml version="1.0" encoding="windows-1251"?>'
+                             '<FictionBook xmlns="http://www.gribuser.ru/xml/fictionbook/2.0"><body><section>' +
+                             "".join(f"<p>{line}</p>" for line in content.split("\n")) +
+                             "</section></body></FictionBook>").encode("cp1251", errors="replace"))
+            elif kind == 3:
+                with zipfile.ZipFile(path + ".epub", "w") as book:
+                    book.writestr("META-INF/container.xml",
+                                  '<container><rootfiles><rootfile full-path="content.opf"/></rootfiles></container>')
+                    book.writestr("content.opf", '<package><manifest><item id="c" href="c.html"/></manifest>'
+                                                 '<spine><itemref idref="c"/></spine></package>')
+                    book.writestr("c.html", "<html><body>" +
+                                  "".join(f"<p>{line}</p>" for line in content.split("\n")) + "</body></html>")
+            else:
+                with open(path + ".txt", "wb") as f:
+                    f.write(content.encode("cp1251" if i % 2 else "utf-8", errors="replace"))
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = os.path.join(directory, "Библиотека")
+        generating, _ = timed(write_files, root)
+        print(f"{args.files} файлов по {args.size_kb:g} КБ, создание {generating:.1f} с")
+        print(f"{'Способ':>16} {'Время, с':>9} {'Файлов/с':>9} {'Добавлено':>10} {'Повторов':>9}")
+
+        db = DatabaseManager(os.path.join(directory, "serial.db"))
+
+        def serial():
+            # Категория на папку, как у BulkImporter, но без повторов и пачек
+            categories = {}
+            for path, category in find_files(root):
+                if category not in categories:
+                    categories[category] = db.add_category(category)
+                title, content = extract_text(path)
+                db.save_text(categories[category], title, content)
+        elapsed, _ = timed(serial)
+        db.close()
+        print(f"{'по одному':>16} {elapsed:>9.2f} {args.files / elapsed:>9.0f} {args.files:>10} {0:>9}")
+
+        for jobs in args.jobs:
+            db = DatabaseManager(os.path.join(directory, f"bulk{jobs}.db"))
+            importer = BulkImporter(db, workers=jobs)
+            elapsed, _ = timed(importer.import_folder, root)
+            db.close()
+            print(f"{f'процессов: {jobs}':>16} {elapsed:>9.2f} {args.files / elapsed:>9.0f} "
+                  f"{importer.imported:>10} {importer.duplicates:>9}")
+
+
+def bench_resume(args):
+    """
+    Повторное открытие текста в pages страниц (1800 символов) с места
+    остановки: разбиение на предложения заново против загрузки индекса из
+    text_state. Документ заменяет строка текста, прочитанная из базы
+    """
+    import os
+    import tempfile
+    from database import DatabaseManager
+
+    content = make_corpus(args.pages * 1800 * 2)[:args.pages * 1800]
+    with tempfile.TemporaryDirectory() as directory:
+        db = DatabaseManager(os.path.join(directory, "resume.db"))
+        category_id = db.add_category("Тест")
+        text_id = db.save_text(category_id, "Текст", content)
+        index = SentenceIndex(content)
+        db.save_sentence_indexes([(text_id, index.pack())])
+        position = index.position(len(index) // 2)[0]
+        db.save_position_async(text_id, position).result()
+
+        def segmented():
+            text = "".join(db.iter_text_content(text_id))
+            restored = SentenceIndex(text)
+            return restored.sentence(restored.find(position))
+
+        def loaded():
+            text = "".join(db.iter_text_content(text_id))
+            packed, saved_position = db.get_text_state(text_id)
+            restored = SentenceIndex()
+            if not restored.load(packed, lambda start, end: text[start:end], len(text)):
+                raise RuntimeError("Индекс не подходит к тексту")
+            return restored.sentence(restored.find(saved_position))
+
+        reading, _ = timed(lambda: "".join(db.iter_text_content(text_id)))
+        before, first = timed(segmented)
+        after, second = timed(loaded)
+        assert first == second
+        packed_size = len(db.get_text_state(text_id)[0])
+        db.close()
+
+    print(f"Текст {len(content)} символов, {len(index)} предложений, индекс {packed_size / 1024:.0f} КБ")
+    print(f"Чтение текста из базы: {reading * 1000:.0f} мс")
+    print(f"Открытие с разбиением: {before * 1000:.0f} мс")
+    print(f"Открытие с индексом:   {after * 1000:.0f} мс")
+
+
+def bench_textexport(args):
+    """
+    Экспорт категории в txt: прежний способ (все тексты категории через
+    get_texts_by_category, затем файл на текст) против TextExporter в папку,
+    zip и tar. Пик памяти Python (tracemalloc) и время; в категории texts
+    текстов по size_kb КБ и один текст large_mb МБ, хранящийся частями
+    """
+    import os
+    import tempfile
+    import tracemalloc
+    from database import DatabaseManager
+    from text_export import TextExporter
+    from text_storage import text_digest
+
+    texts = [make_corpus(int(args.size_kb * 1024), seed) for seed in range(50)]
+    with tempfile.TemporaryDirectory() as directory:
+        db = DatabaseManager(os.path.join(directory, "export.db"))
+        category_id = db.add_category("Тест")
+        # Одинаковые заголовки: раньше такие файлы перезаписывали друг друга
+        rows = []
+        for i in range(args.texts):
+            content = f"{texts[i % len(texts)]}\n{i}"
+            rows.append(("Тест", f"Текст {i % (args.texts // 2 or 1)}", content, text_digest(content)))
+        db.import_texts_async(rows).result()
+        if args.large_mb:
+            db.save_text(category_id, "Большой", make_corpus(int(args.large_mb * 2 ** 20)))
+
+        def legacy(folder):
+            os.makedirs(folder)
+            for text_id, _, title, content in db.get_texts_by_category(category_id):
+                safe_title = "".join(i if i.isalnum() else "_" for i in title).rstrip("_")
+                with open(f"{folder}/{safe_title}.txt", "w", encoding="utf-8") as f:
+                    f.write(content)
+            return folder
+
+        runs = [("прежний", lambda: legacy(os.path.join(directory, "legacy")))]
+        for text_format in ("txt", "zip", "tar"):
+            runs.append((text_format, lambda text_format=text_format: TextExporter(db, text_format).export(
+                category_id, os.path.join(directory, text_format), "Тест")))
+        print(f"{'Способ':>8} {'Время, с':>9} {'Память, МБ':>11} {'Файлов':>7} {'Размер, МБ':>11}")
+        for name, run in runs:
+            tracemalloc.start()
+            elapsed, path = timed(run)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if os.path.isdir(path):
+                files = len(os.listdir(path))
+                size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            else:
+                files = 1
+                size = os.path.getsize(path)
+            print(f"{name:>8} {elapsed:>9.2f} {peak / 2 ** 20:>11.1f} {files:>7} {size / 2 ** 20:>11.1f}")
+        db.close()
+
+
+def bench_revisions(args):
+    """
+    История версий: текст size_kb КБ сохраняется edits раз с правкой одного
+    слова в случайном месте (каждое сохранение - отдельная версия), затем
+    тот же текст копируется в copies категорий и правится в каждой.
+    Сравнение хранимого объёма с полными копиями версий (без сжатия и со
+    сжатием каждой версии целиком) и время сохранения
+    """
+    import os
+    import tempfile
+    import zlib
+    from database import DatabaseManager
+
+    rnd = random.Random(0)
+    content = make_corpus(int(args.size_kb * 1024))
+    with tempfile.TemporaryDirectory() as directory:
+        db = DatabaseManager(os.path.join(directory, "revisions.db"))
+        category_id = db.add_category("Тест")
+        text_id = db.save_text(category_id, "Текст", content)
+        whole_compressed = 0
+        times = []
+        for _ in range(args.edits):
+            position = content.find(" ", rnd.randrange(len(content)))
+            content = content[:position] + " правка" + content[position:]
+            whole_compressed += len(zlib.compress(content.encode("utf-8"), 6))
+            # Без объединения недавних версий: каждое сохранение остаётся в истории
+            elapsed, _ = timed(lambda: db.write(db._update_texts, [(text_id, "Текст", content)], False).result())
+            times.append(elapsed)
+        for copy in range(args.copies):
+            copy_id = db.save_text(db.add_category(f"Копия {copy}"), "Текст", content)
+            db.update_text(copy_id, "Текст", content + f"\nКонец копии {copy}.")
+        revisions, blobs, history, stored, duplicates, duplicate_chars = db.storage_stats()
+        db.close()
+
+    times.sort()
+    print(f"Текст {args.size_kb:.0f} КБ, версий {revisions}, частей {blobs}")
+    print(f"Все версии без сжатия:            {history / 2 ** 20:>8.1f} МБ")
+    print(f"Правки: каждая версия сжата целиком: {whole_compressed / 2 ** 20:>5.1f} МБ")
+    print(f"Хранится частей (общие один раз):  {stored / 2 ** 20:>7.2f} МБ")
+    print(f"Сохранение с историей: медиана {times[len(times) // 2] * 1000:.1f} мс, "
+          f"p99 {times[int(len(times) * 0.99)] * 1000:.1f} мс")
+    print(f"Текстов-повторов в категориях: {duplicates}")
+
+
+def bench_normalize(args):
+    """
+    Нормализация текста для синтеза: обычный корпус и корпус, где в каждом
+    предложении числа, даты, суммы и сокращения. Кэш раскрытий (_expand)
+    очищается перед каждым прогоном
+    """
+    from normalizer import normalize, _expand
+
+    size = int(args.size_mb * 1024 * 1024)
+    rng = random.Random(3)
+    templates = [
+        lambda: f"В {rng.randint(1000, 2030)} г. цена выросла на {rng.randint(1, 99)}.{rng.randint(1, 9)} процента.",
+        lambda: f"Встреча {rng.randint(1, 28)}.{rng.randint(1, 12):02d}.{rng.randint(1900, 2030)} в {rng.randint(0, 23)}:{rng.randint(0, 59):02d}.",
+        lambda: f"Он купил {rng.randint(1, 500)} книг за ${rng.randint(1, 100000)}, см. рис. {rng.randint(1, 40)}.",
+        lambda: f"Жил на ул. Ленина, д. {rng.randint(1, 200)}, на {rng.randint(1, 25)}-м этаже, т.е. высоко.",
+        lambda: f"Было {rng.randint(-40, 40)} °C и {rng.randint(0, 2000)} мм осадков, № {rng.randint(1, 999)}.",
+    ]
+    pieces = []
+    total = 0
+    while total < size:
+        sentence = rng.choice(templates)() + " "
+        pieces.append(sentence)
+        total += len(sentence.encode("utf-8"))
+    corpora = [("Обычный текст", make_corpus(size)), ("Числа в каждом предложении", "".join(pieces))]
+
+    print(f"{'Корпус':<28} {'МБ':>6} {'Время, с':>9} {'МБ/с':>7} {'Замен':>8} {'Попаданий в кэш':>16}")
+    for name, text in corpora:
+        _expand.cache_clear()
+        elapsed, normalized = timed(normalize, text)
+        info = _expand.cache_info()
+        calls = info.hits + info.misses
+        megabytes = len(text.encode("utf-8")) / 1024 / 1024
+        print(f"{name:<28} {megabytes:>6.1f} {elapsed:>9.2f} {megabytes / elapsed:>7.1f} "
+              f"{len(normalized._replacements):>8} {info.hits / calls if calls else 0:>16.0%}")
+
+
+def bench_pronunciation(args):
+    """
+    Словарь произношений: сборка дерева из entries записей базы против
+    сборки из сохранённых записей (JSON) и скорость подстановки в предложения
+    корпуса при словарях разного размера. Часть терминов - слова корпуса,
+    часть - из двух слов, часть - фонемы. Найденных терминов при любом
+    размере столько же: слова корпуса в словарях одни и те же
+    """
+    import os
+    import tempfile
+    from database import DatabaseManager
+    from pronunciation import PronunciationLexicon, load_lexicon
+
+    rng = random.Random(5)
+    letters = "абвгдежзиклмнопрстуфхцчшщэюя"
+    corpus = make_corpus(int(args.size_mb * 1024 * 1024))
+    sentences = split_text_into_sentences(corpus)[0]
+    vocabulary = sorted({word for sentence in SAMPLE_SENTENCES for word in sentence.split() if word.isalpha()})
+
+    def make_entries(count):
+        entries = [(word, word.upper(), False) for word in vocabulary[:10]]
+        while len(entries) < count:
+            term = "".join(rng.choice(letters) for _ in range(rng.randint(4, 10)))
+            if rng.random() < 0.2:
+                term += " " + "".join(rng.choice(letters) for _ in range(rng.randint(3, 8)))
+            entries.append((term, term[::-1], rng.random() < 0.1))
+        return entries
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = DatabaseManager(os.path.join(directory, "lexicon.db"))
+        dictionary_id = db.add_pronunciation_dictionary("Тест")
+        db.save_pronunciation_entries(dictionary_id, make_entries(args.entries))
+        built, lexicon = timed(load_lexicon, db)
+        db.write(lambda cursor: None).result()
+        cached, restored = timed(load_lexicon, db)
+        assert len(restored) == len(lexicon)
+        packed_size = len(lexicon.pack())
+        db.close()
+    print(f"Записей: {len(lexicon)}, сохранённые записи {packed_size / 1024 / 1024:.1f} МБ")
+    print(f"Загрузка из словарей базы: {built * 1000:.0f} мс")
+    print(f"Загрузка сохранённых записей: {cached * 1000:.0f} мс")
+
+    print(f"\n{'Записей':>8} {'Время, с':>9} {'МБ/с':>6} {'Предложений/с':>14} {'Замен':>8}")
+    size = len(corpus.encode("utf-8")) / 1024 / 1024
+    for count in (1000, args.entries):
+        lexicon = PronunciationLexicon.build(make_entries(count))
+        elapsed, results = timed(lambda: [lexicon.apply(sentence, True) for sentence in sentences])
+        replaced = sum(len(result._replacements) for result in results)
+        print(f"{count:>8} {elapsed:>9.2f} {size / elapsed:>6.1f} {len(sentences) / elapsed:>14.0f} {replaced:>8}")
+
+
+def bench_chunks(args):
+    """
+    Фрагменты для синтеза против предложений: текст воспроизводится через
+    SentenceQueue на FakeEngine (15 символов в секунду). Кроме корпуса в
+    тексте есть абзацы без знаков препинания. Накладные расходы реального
+    движка на вызов (запуск фразы, опрос состояния, паузы на краях фразы)
+    моделируются добавкой overhead_ms к каждому вызову speak
+    """
+    from segmenter import split_text_into_chunks, chunk_sizes, CHUNK_MIN_SECONDS, CHUNK_MAX_SECONDS
+
+    rng = random.Random(7)
+    words = [word for sentence in SAMPLE_SENTENCES for word in sentence.lower().strip(".!?…").split()]
+    paragraphs = [" ".join(rng.choice(words) for _ in range(rng.randint(150, 600))) for _ in range(args.run_ons)]
+    text = make_corpus(int(args.size_kb * 1024)) + "\n" + "\n".join(paragraphs)
+    overhead = args.overhead_ms / 1000
+
+    print(f"Текст {len(text)} символов, накладные расходы {args.overhead_ms:.0f} мс на вызов")
+    print(f"{'Разбиение':>12} {'Вызовов':>8} {'Средний, с':>11} {'Макс., с':>9} {'В 2-15 с':>9} "
+          f"{'Звучание, с':>12} {'Python, с':>10} {'С расходами, с':>15}")
+    for name, split in (("Предложения", split_text_into_sentences),
+                        ("Фрагменты", lambda text: split_text_into_chunks(text, chunk_sizes()))):
+        sentences = split(text)[0]
+        engine = FakeEngine()
+        queue = SentenceQueue(engine, sentences)
+        engine.on_end_stream = queue.finish
+        elapsed, _ = timed(lambda: (queue.start(0), engine.run_until_idle()))
+        durations = [engine.duration(sentence) for sentence in sentences]
+        in_range = sum(CHUNK_MIN_SECONDS <= duration <= CHUNK_MAX_SECONDS for duration in durations)
+        calls = len(engine.enqueued)
+        print(f"{name:>12} {calls:>8} {sum(durations) / len(durations):>11.1f} {max(durations):>9.1f} "
+              f"{in_range / len(durations):>9.0%} {engine.clock:>12.0f} {elapsed:>10.2f} "
+              f"{engine.clock + calls * overhead:>15.0f}")
+
+
+def bench_words(args):
+    """
+    Выделение слов по событиям FakeEngine при максимальной скорости
+    ValueSpeed (2.0) в реальном времени: перерисовка на каждое событие
+    против перерисовки по таймеру кадров (WordTracker). speedup ускоряет
+    речь, моделируя движок, присылающий события чаще. Задержка - от
+    момента события до перерисовки, в которую оно попало; CPU - время
+    процесса к длительности прогона. Без PyQt6 перерисовка не выполняется
+    и замеряются только обработка событий и перевод позиций
+    """
+    from segmenter import split_text_into_chunks, chunk_sizes
+    from normalizer import SpokenSentences
+
+    max_speed = 2.0
+    frame = 1 / args.fps
+    text = make_corpus(256 * 1024)
+    sentences, positions = split_text_into_chunks(text, chunk_sizes(max_speed))
+    bases = [start + len(text[start:end]) - len(text[start:end].lstrip()) for start, end in positions]
+
+    try:
+        import os
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtWidgets import QApplication, QTextEdit
+        from PyQt6.QtGui import QTextCursor, QTextCharFormat, QColor
+
+        app = QApplication.instance() or QApplication([])
+        edit = QTextEdit()
+        edit.setPlainText(text)
+        edit.resize(800, 600)
+        edit.show()
+        word_format = QTextCharFormat()
+        word_format.setBackground(QColor(255, 200, 0, 160))
+
+        def paint(word):
+            cursor = QTextCursor(edit.document())
+            cursor.setPosition(word[0])
+            cursor.setPosition(word[1], QTextCursor.MoveMode.KeepAnchor)
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = cursor
+            selection.format = word_format
+            edit.setExtraSelections([selection])
+            app.processEvents()
+    except ImportError:
+        print("PyQt6 не установлен: перерисовка не выполняется")
+
+        def paint(word):
+            pass
+
+    def run(per_event, speedup):
+        engine = FakeEngine()
+        engine.set_rate(max_speed)
+        spoken = SpokenSentences(sentences)
+        queue = SentenceQueue(engine, spoken)
+        tracker = WordTracker(spoken, clock=lambda: engine.clock)
+        pending = []
+        latencies = []
+        counts = {"events": 0, "paints": 0}
+        started = time.perf_counter()
+
+        def now():
+            return time.perf_counter() - started
+
+        def draw(word):
+            paint(word)
+            counts["paints"] += 1
+            painted = now()
+            latencies.extend(painted - moment for moment in pending)
+            pending.clear()
+
+        def on_start(stream_number):
+            index = queue.index_of(stream_number)
+            if index is not None:
+                tracker.start(index, bases[index])
+
+        def on_word(stream_number, position, length):
+            counts["events"] += 1
+            # Событие должно было прийти в момент виртуального времени движка
+            pending.append(engine.clock / speedup)
+            tracker.word(queue.index_of(stream_number), position, length)
+            if per_event:
+                word = tracker.current()
+                if word is not None:
+                    draw(word)
+
+        engine.on_start_stream = on_start
+        engine.on_word = on_word
+        engine.on_end_stream = queue.finish
+        cpu = time.process_time()
+        queue.start(0)
+        # События FakeEngine приходят в моменты, кратные 1/30 с, как и кадры
+        # 60 Гц: кадры сдвинуты на полкадра, чтобы не совпадать с событиями
+        next_frame = frame * 1.5
+        while engine.is_speaking() and now() < args.seconds:
+            engine.advance(now() * speedup - engine.clock)
+            wake = args.seconds
+            if not per_event:
+                if now() >= next_frame:
+                    word = tracker.take()
+                    if word is not None:
+                        draw(word)
+                    else:
+                        # Слово на экране не изменилось (например, число,
+                        # произносимое несколькими словами): события уже показаны
+                        latencies.extend(now() - moment for moment in pending)
+                        pending.clear()
+                    next_frame += frame
+                wake = next_frame
+            event_time = engine.next_event_time()
+            if event_time is not None:
+                wake = min(wake, event_time / speedup)
+            time.sleep(max(0.0, wake - now()))
+        elapsed = now()
+        cpu = time.process_time() - cpu
+        queue.purge()
+        latencies.sort()
+        return counts, elapsed, cpu, latencies
+
+    print(f"Скорость {max_speed}, кадр {frame * 1000:.1f} мс, прогон {args.seconds:.0f} с")
+    print(f"{'Ускорение':>9} {'Перерисовка':>12} {'Событий/с':>10} {'Кадров/с':>9} "
+          f"{'Задержка ср., мс':>17} {'p99, мс':>8} {'Макс., мс':>10} {'CPU':>6}")
+    for speedup in args.speedups:
+        for name, per_event in (("на событие", True), ("по кадрам", False)):
+            counts, elapsed, cpu, latencies = run(per_event, speedup)
+            mean = sum(latencies) / len(latencies) * 1000 if latencies else 0.0
+            p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0
+            worst = latencies[-1] * 1000 if latencies else 0.0
+            print(f"{speedup:>8}x {name:>12} {counts['events'] / elapsed:>10.0f} {counts['paints'] / elapsed:>9.0f} "
+                  f"{mean:>17.1f} {p99:>8.1f} {worst:>10.1f} {cpu / elapsed:>6.1%}")
+
+
+def bench_audio(args):
+    """
+    Собственный вывод звука (BufferedEngine) в реальном времени. Пауза и
+    продолжение: звук в WAV-файле (FileSink) сравнивается побайтно с
+    синтезированным, считаются вызовы синтеза; для прежней схемы (purge при
+    паузе и повтор предложения с начала) повтор и повторный синтез
+    считаются для тех же моментов пауз. Перемотка: от purge() до начала
+    нового потока, и загрузка CPU при воспроизведении для разных размеров
+    буфера устройства (NullSink)
+    """
+    import os
+    import tempfile
+    import threading
+    import wave
+    from audio_output import BufferedEngine, FileSink, NullSink
+    from segmenter import split_text_into_chunks, chunk_sizes
+    from tts_engine import pcm_to_wav, wav_to_pcm, SAMPLE_RATE, SAMPLE_WIDTH
+
+    class NoisyEngine(FakeEngine):
+        # Звук зависит от текста, чтобы совпадение проверялось по содержимому
+        calls = 0
+
+        def synthesize(self, text):
+            NoisyEngine.calls += 1
+            frames = int(self.duration(text) * SAMPLE_RATE)
+            return pcm_to_wav(random.Random(text).randbytes(frames * SAMPLE_WIDTH))
+
+    rng = random.Random(3)
+    sentences = split_text_into_chunks(make_corpus(64 * 1024), chunk_sizes())[0][:args.sentences]
+    # Речь ускорена, чтобы прогон шёл секунды
+    factory = lambda: NoisyEngine(chars_per_second=150)
+    durations = [factory().duration(sentence) for sentence in sentences]
+    total = sum(durations)
+    expected = b"".join(wav_to_pcm(factory().synthesize(sentence))[0] for sentence in sentences)
+    pause_points = sorted(rng.uniform(0, total) for _ in range(args.pauses))
+
+    path = os.path.join(tempfile.mkdtemp(), "output.wav")
+    NoisyEngine.calls = 0
+    engine = BufferedEngine(factory, FileSink(path, realtime=True))
+    finished = threading.Event()
+    engine.on_end_stream = lambda stream_number: stream_number == len(sentences) and finished.set()
+    for sentence in sentences:
+        engine.speak(sentence)
+    started = time.perf_counter()
+    paused = 0.0
+    for point in pause_points:
+        time.sleep(max(0.0, started + paused + point - time.perf_counter()))
+        engine.pause()
+        time.sleep(0.05)
+        engine.resume()
+        paused += 0.05
+    finished.wait()
+    engine.close()
+    with wave.open(path, "rb") as wav:
+        written = wav.readframes(wav.getnframes())
+
+    # Прежняя схема: после паузы предложение звучит и синтезируется заново
+    repeated = 0.0
+    resynthesized = 0
+    for point in pause_points:
+        position = 0.0
+        for duration in durations:
+            if point < position + duration:
+                repeated += point - position
+                resynthesized += 1
+                break
+            position += duration
+
+    print(f"{len(sentences)} фрагментов, {total:.1f} с звука, {len(pause_points)} пауз")
+    print(f"{'Схема':>20} {'Синтезов':>9} {'Повтор, с':>10} {'Звук совпадает':>15}")
+    print(f"{'purge и повтор':>20} {len(sentences) + resynthesized:>9} {repeated:>10.2f} {'нет':>15}")
+    print(f"{'BufferedEngine':>20} {NoisyEngine.calls:>9} {(len(written) - len(expected)) / SAMPLE_WIDTH / SAMPLE_RATE:>10.2f} "
+          f"{'да' if written == expected else 'нет':>15}")
+
+    print()
+    print(f"{'Буфер, мс':>10} {'Перемотка ср., мс':>18} {'Макс., мс':>10} {'CPU':>6}")
+    long_wav = factory().synthesize("а" * 600)
+    short_wav = factory().synthesize("б" * 30)
+    for buffer_ms in args.buffers:
+        engine = BufferedEngine(factory, NullSink(buffer_ms))
+        latencies = []
+        started_streams = {}
+        engine.on_start_stream = lambda stream_number: started_streams.setdefault(stream_number, time.perf_counter())
+        engine.speak_audio(long_wav)
+        time.sleep(0.2)
+        wall, cpu = time.perf_counter(), time.process_time()
+        time.sleep(1.0)
+        load = (time.process_time() - cpu) / (time.perf_counter() - wall)
+        for _ in range(20):
+            moment = time.perf_counter()
+            engine.purge()
+            stream_number = engine.speak_audio(short_wav)
+            engine.speak_audio(long_wav)
+            while stream_number not in started_streams:
+                time.sleep(0.0005)
+            latencies.append(started_streams[stream_number] - moment)
+            time.sleep(0.05)
+        engine.close()
+        print(f"{buffer_ms:>10} {sum(latencies) / len(latencies) * 1000:>18.1f} {max(latencies) * 1000:>10.1f} {load:>6.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности TextToSpeechWin")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("segmenter", help="Разбиение текста на предложения")
+    p.add_argument("--sizes", type=float, nargs="+", default=[1, 10, 50], help="Размеры корпусов в МБ")
+    p.set_defaults(func=bench_segmenter)
+
+    p = sub.add_parser("index", help="Инкрементальный индекс предложений")
+    p.add_argument("--sizes", type=float, nargs="+", default=[1, 10, 50], help="Размеры документов в МБ")
+    p.set_defaults(func=bench_index)
+
+    p = sub.add_parser("highlight", help="Выделение текущего предложения (PyQt6)")
+    p.add_argument("--sizes", type=float, nargs="+", default=[0.1, 1, 5], help="Размеры документов в МБ")
+    p.add_argument("--steps", type=int, default=200, help="Количество выделяемых предложений")
+    p.set_defaults(func=bench_highlight)
+
+    p = sub.add_parser("gap", help="Паузы между предложениями на FakeEngine")
+    p.add_argument("--sentences", type=int, default=200, help="Количество предложений")
+    p.add_argument("--latency", type=float, default=0.05, help="Задержка старта синтеза, с")
+    p.set_defaults(func=bench_gap)
+
+    p = sub.add_parser("playback", help="Нагрузочный прогон очереди воспроизведения")
+    p.add_argument("--sentences", type=int, default=100000, help="Количество предложений")
+    p.set_defaults(func=bench_playback)
+
+    p = sub.add_parser("cache", help="Кэш синтезированной речи")
+    p.add_argument("--sentences", type=int, default=500, help="Количество предложений")
+    p.add_argument("--replays", type=int, default=3, help="Количество повторных чтений")
+    p.add_argument("--max-mb", type=float, default=512, help="Предельный размер кэша, МБ")
+    p.set_defaults(func=bench_cache)
+
+    p = sub.add_parser("prerender", help="Фоновый синтез следующих предложений")
+    p.add_argument("--sentences", type=int, default=60, help="Количество предложений")
+    p.add_argument("--synthesis-ms-per-char", type=float, default=0.5, help="Время синтеза символа, мс")
+    p.add_argument("--workers", type=int, default=2, help="Потоков синтеза")
+    p.add_argument("--time-scale", type=float, default=50.0, help="Ускорение виртуального времени")
+    p.set_defaults(func=bench_prerender)
+
+    p = sub.add_parser("export", help="Экспорт категории в аудиофайлы")
+    p.add_argument("--texts", type=int, default=24, help="Количество текстов")
+    p.add_argument("--sentences", type=int, default=20, help="Предложений в тексте")
+    p.add_argument("--synthesis-ms-per-char", type=float, default=0.05, help="Время синтеза символа, мс")
+    p.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, 8], help="Числа потоков")
+    p.set_defaults(func=bench_export)
+
+    p = sub.add_parser("stream", help="Потоковый синтез в stdout (tts_cli)")
+    p.add_argument("--sentences", type=int, default=200, help="Количество предложений")
+    p.add_argument("--synthesis-ms-per-char", type=float, default=0.1, help="Время синтеза символа, мс")
+    p.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, 8], help="Числа потоков")
+    p.set_defaults(func=bench_stream)
+
+    p = sub.add_parser("listing", help="Список текстов категории без содержимого")
+    p.add_argument("--texts", type=int, default=2000, help="Текстов в категории")
+    p.add_argument("--sizes-kb", type=float, nargs="+", default=[1, 16, 128], help="Размеры текстов в КБ")
+    p.add_argument("--page-size", type=int, default=200, help="Строк на странице модели")
+    p.set_defaults(func=bench_listing)
+
+    p = sub.add_parser("database", help="Индексы и WAL на большой базе")
+    p.add_argument("--texts", type=int, default=100000, help="Количество текстов")
+    p.add_argument("--categories", type=int, default=100, help="Количество категорий")
+    p.add_argument("--size-kb", type=float, default=1, help="Размер текста в КБ")
+    p.add_argument("--updates", type=int, default=200, help="Сохранений с фиксацией")
+    p.set_defaults(func=bench_database)
+
+    p = sub.add_parser("search", help="Полнотекстовый поиск по текстам")
+    p.add_argument("--texts", type=int, default=100000, help="Количество текстов")
+    p.add_argument("--size-kb", type=float, default=1, help="Размер текста в КБ")
+    p.add_argument("--vocabulary", type=int, default=20000, help="Размер словаря")
+    p.add_argument("--limit", type=int, default=20, help="Результатов на запрос")
+    p.set_defaults(func=bench_search)
+
+    p = sub.add_parser("autosave", help="Автосохранение при наборе текста")
+    p.add_argument("--size-kb", type=float, default=256, help="Размер текста в КБ")
+    p.add_argument("--keystrokes", type=int, default=2000, help="Событий в сеансе")
+    p.add_argument("--focus-rate", type=float, default=0.05, help="Доля потерь фокуса среди событий")
+    p.set_defaults(func=bench_autosave)
+
+    p = sub.add_parser("storage", help="Хранение больших текстов сжатыми частями")
+    p.add_argument("--size-mb", type=float, default=50, help="Размер текста в МБ")
+    p.set_defaults(func=bench_storage)
+
+    p = sub.add_parser("pool", help="Одновременная работа фоновых потоков с базой")
+    p.add_argument("--texts", type=int, default=2000, help="Количество текстов")
+    p.add_argument("--size-kb", type=float, default=4, help="Размер текста в КБ")
+    p.add_argument("--readers", type=int, default=4, help="Потоков чтения")
+    p.add_argument("--writers", type=int, default=4, help="Потоков записи")
+    p.add_argument("--writes", type=int, default=500, help="Записей в потоке")
+    p.add_argument("--pause-ms", type=float, default=1, help="Обработка прочитанного текста, мс")
+    p.set_defaults(func=bench_pool)
+
+    p = sub.add_parser("import", help="Импорт папки с текстами")
+    p.add_argument("--files", type=int, default=10000, help="Количество файлов")
+    p.add_argument("--size-kb", type=float, default=4, help="Размер файла в КБ")
+    p.add_argument("--jobs", type=int, nargs="+", default=[1, 4], help="Числа процессов")
+    p.set_defaults(func=bench_import)
+
+    p = sub.add_parser("resume", help="Продолжение чтения с сохранённым индексом")
+    p.add_argument("--pages", type=int, default=1000, help="Страниц текста")
+    p.set_defaults(func=bench_resume)
+
+    p = sub.add_parser("textexport", help="Экспорт категории в текстовые файлы и архивы")
+    p.add_argument("--texts", type=int, default=2000, help="Количество текстов")
+    p.add_argument("--size-kb", type=float, default=64, help="Размер текста в КБ")
+    p.add_argument("--large-mb", type=float, default=20, help="Размер большого текста в МБ")
+    p.set_defaults(func=bench_textexport)
+
+    p = sub.add_parser("revisions", help="История версий с общими частями")
+    p.add_argument("--size-kb", type=float, default=512, help="Размер текста в КБ")
+    p.add_argument("--edits", type=int, default=200, help="Сохранений с правкой")
+    p.add_argument("--copies", type=int, default=5, help="Копий текста в других категориях")
+    p.set_defaults(func=bench_revisions)
+
+    p = sub.add_parser("normalize", help="Нормализация чисел, дат и сокращений")
+    p.add_argument("--size-mb", type=float, default=10, help="Размер корпуса в МБ")
+    p.set_defaults(func=bench_normalize)
+
+    p = sub.add_parser("pronunciation", help="Словарь произношений: сборка, загрузка и подстановка")
+    p.add_argument("--entries", type=int, default=100000, help="Записей в словаре")
+    p.add_argument("--size-mb", type=float, default=2, help="Размер корпуса в МБ")
+    p.set_defaults(func=bench_pronunciation)
+
+    p = sub.add_parser("chunks", help="Фрагменты для синтеза против предложений")
+    p.add_argument("--size-kb", type=float, default=512, help="Размер корпуса в КБ")
+    p.add_argument("--run-ons", type=int, default=20, help="Абзацев без знаков препинания")
+    p.add_argument("--overhead-ms", type=float, default=100, help="Накладные расходы движка на вызов, мс")
+    p.set_defaults(func=bench_chunks)
+
+    p = sub.add_parser("words", help="Выделение слов по событиям движка на максимальной скорости")
+    p.add_argument("--seconds", type=float, default=10, help="Длительность каждого прогона, с")
+    p.add_argument("--speedups", type=float, nargs="+", default=[1, 10, 50], help="Ускорения речи")
+    p.add_argument("--fps", type=float, default=60, help="Частота обновления экрана, Гц")
+    p.set_defaults(func=bench_words)
+
+    p = sub.add_parser("audio", help="Собственный вывод звука: пауза, перемотка, CPU")
+    p.add_argument("--sentences", type=int, default=12, help="Количество фрагментов")
+    p.add_argument("--pauses", type=int, default=6, help="Количество пауз")
+    p.add_argument("--buffers", type=int, nargs="+", default=[20, 50, 100, 200], help="Размеры буфера, мс")
+    p.set_defaults(func=bench_audio)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,72 +1,575 @@
 import os
+import queue
 import sqlite3
+import threading
+from concurrent.futures import Future
 from datetime import datetime
 
+from text_search import build_match_query, match_offsets, make_snippet
+from text_storage import (CHUNKED_THRESHOLD, DEFAULT_CODEC, REVISION_CHUNK_MIN, content_chunks,
+                          text_digest, compress, decompressor, iter_chunk, fold_for_search)
+
+
+def _migration_initial(cursor):
+    """Исходная структура: категории и тексты"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            created_at DATETIME DEFAULT (datetime('now', 'localtime'))
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS texts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category_id INTEGER,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            sort_index INTEGER DEFAULT 0,
+            created_at DATETIME DEFAULT (datetime('now', 'localtime')),
+            updated_at DATETIME DEFAULT (datetime('now', 'localtime')),
+            FOREIGN KEY(category_id) REFERENCES categories(id)
+        )
+    ''')
+
+
+def _migration_listing(cursor):
+    """
+    Длина текста и покрывающий индекс для списка текстов категории. Столбцы
+    после content хранятся в строке таблицы за длинным текстом (в страницах
+    переполнения), поэтому список строится только по индексу и не читает
+    содержимое. Индекс также служит для выборки и сортировки
+    get_texts_by_category
+    """
+    cursor.execute("PRAGMA table_info(texts)")
+    if 'content_length' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute('ALTER TABLE texts ADD COLUMN content_length INTEGER NOT NULL DEFAULT 0')
+        cursor.execute('UPDATE texts SET content_length = length(content)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_texts_listing
+        ON texts (category_id, sort_index, created_at DESC, title, content_length, updated_at)
+    ''')
+
+
+def _migration_categories_index(cursor):
+    """Покрывающий индекс для списка категорий"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_categories_listing
+        ON categories (created_at DESC, name)
+    ''')
+
+
+# Текст для полнотекстового индекса: "ё" заменяется на "е" (длина не меняется,
+# позиции совпадают с исходным текстом)
+_FTS_FOLD = "replace(replace({0}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def _migration_search(cursor):
+    """
+    Полнотекстовый индекс FTS5 по заголовкам и текстам. Индекс хранит свою
+    копию текста (для фрагментов и позиций найденного) и обновляется
+    триггерами при любом изменении таблицы texts. Формы русских слов
+    находятся по основе слова в запросе (text_search.build_match_query)
+    """
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS texts_fts
+        USING fts5(title, content, tokenize = 'unicode61 remove_diacritics 2')
+    ''')
+    # Совпадения в заголовке весят больше
+    cursor.execute("INSERT INTO texts_fts(texts_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+    title, content = _FTS_FOLD.format('new.title'), _FTS_FOLD.format('new.content')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS texts_fts_insert AFTER INSERT ON texts BEGIN
+            INSERT INTO texts_fts (rowid, title, content) VALUES (new.id, {title}, {content});
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS texts_fts_delete AFTER DELETE ON texts BEGIN
+            DELETE FROM texts_fts WHERE rowid = old.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS texts_fts_update AFTER UPDATE OF title, content ON texts BEGIN
+            UPDATE texts_fts SET title = {title}, content = {content} WHERE rowid = new.id;
+        END
+    ''')
+    cursor.execute('DELETE FROM texts_fts')
+    cursor.execute(f'''
+        INSERT INTO texts_fts (rowid, title, content)
+        SELECT id, {_FTS_FOLD.format('title')}, {_FTS_FOLD.format('content')} FROM texts
+    ''')
+
+
+def _migration_chunks(cursor):
+    """
+    Хранение больших текстов сжатыми частями (text_storage). У такого
+    текста texts.chunked = 1, а texts.content пуст; части упорядочены по
+    seq с промежутками, чтобы новые части вставлялись между соседними без
+    перезаписи остальных. Индекс idx_text_chunks - оглавление частей без
+    чтения данных. Части индексируются для поиска в chunks_fts по
+    отдельности: при сохранении переиндексируются только изменённые части
+    """
+    cursor.execute("PRAGMA table_info(texts)")
+    if 'chunked' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute('ALTER TABLE texts ADD COLUMN chunked INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS text_chunks (
+            id INTEGER PRIMARY KEY,
+            text_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            length INTEGER NOT NULL,
+            digest BLOB NOT NULL,
+            codec INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            FOREIGN KEY(text_id) REFERENCES texts(id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_text_chunks
+        ON text_chunks (text_id, seq, length, digest, codec)
+    ''')
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts
+        USING fts5(content, tokenize = 'unicode61 remove_diacritics 2')
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS text_chunks_fts_delete AFTER DELETE ON text_chunks BEGIN
+            DELETE FROM chunks_fts WHERE rowid = old.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS texts_chunks_delete AFTER DELETE ON texts BEGIN
+            DELETE FROM text_chunks WHERE text_id = old.id;
+        END
+    ''')
+
+
+def _migration_content_hash(cursor):
+    """
+    Хэш содержимого (text_storage.text_digest) для поиска повторов при
+    импорте. У текстов, сохранённых раньше, хэш пуст до
+    DatabaseManager.fill_content_hashes()
+    """
+    cursor.execute("PRAGMA table_info(texts)")
+    if 'content_hash' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute('ALTER TABLE texts ADD COLUMN content_hash BLOB')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_texts_content_hash ON texts (content_hash)')
+
+
+def _migration_text_state(cursor):
+    """
+    Состояние текста для продолжения чтения: место остановки (позиция в
+    тексте) и индекс предложений (SentenceIndex.pack). Индекс действителен,
+    пока index_hash совпадает с texts.content_hash. Отдельная таблица не
+    увеличивает строки texts
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS text_state (
+            text_id INTEGER PRIMARY KEY,
+            position INTEGER NOT NULL DEFAULT 0,
+            index_hash BLOB,
+            sentence_index BLOB,
+            FOREIGN KEY(text_id) REFERENCES texts(id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS texts_state_delete AFTER DELETE ON texts BEGIN
+            DELETE FROM text_state WHERE text_id = old.id;
+        END
+    ''')
+
+
+def _migration_revisions(cursor):
+    """
+    История версий текстов. Версия (revisions) - заголовок и список частей
+    текста (revision_blobs, text_storage.content_chunks). Части хранятся в
+    blobs сжатыми, по одному разу на хэш содержимого: их разделяют соседние
+    версии одного текста и одинаковые тексты разных категорий.
+    blobs.refcount - число ссылок из revision_blobs, его ведут триггеры;
+    часть без ссылок удаляется
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            id INTEGER PRIMARY KEY,
+            digest BLOB NOT NULL UNIQUE,
+            codec INTEGER NOT NULL,
+            length INTEGER NOT NULL,
+            raw_size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            data BLOB NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS revisions (
+            id INTEGER PRIMARY KEY,
+            text_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            content_length INTEGER NOT NULL,
+            content_hash BLOB NOT NULL,
+            created_at DATETIME DEFAULT (datetime('now', 'localtime')),
+            FOREIGN KEY(text_id) REFERENCES texts(id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_revisions_text ON revisions (text_id, id)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS revision_blobs (
+            revision_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            blob_id INTEGER NOT NULL,
+            PRIMARY KEY (revision_id, seq),
+            FOREIGN KEY(revision_id) REFERENCES revisions(id),
+            FOREIGN KEY(blob_id) REFERENCES blobs(id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS revision_blobs_insert AFTER INSERT ON revision_blobs BEGIN
+            UPDATE blobs SET refcount = refcount + 1 WHERE id = new.blob_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS revision_blobs_delete AFTER DELETE ON revision_blobs BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE id = old.blob_id;
+            DELETE FROM blobs WHERE id = old.blob_id AND refcount <= 0;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS revisions_delete AFTER DELETE ON revisions BEGIN
+            DELETE FROM revision_blobs WHERE revision_id = old.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS texts_revisions_delete AFTER DELETE ON texts BEGIN
+            DELETE FROM revisions WHERE text_id = old.id;
+        END
+    ''')
+
+
+def _migration_pronunciation(cursor):
+    """
+    Словари произношений. Версия словаря увеличивается при каждом изменении
+    записей: по версиям включённых словарей проверяется, подходит ли
+    сохранённое собранное дерево (pronunciation_cache). AUTOINCREMENT не
+    даёт новому словарю получить id удалённого вместе с его версией
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pronunciation_dictionaries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            enabled INTEGER NOT NULL DEFAULT 1,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pronunciation_entries (
+            dictionary_id INTEGER NOT NULL,
+            term TEXT NOT NULL,
+            replacement TEXT NOT NULL,
+            phoneme INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dictionary_id, term),
+            FOREIGN KEY(dictionary_id) REFERENCES pronunciation_dictionaries(id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS pronunciation_dictionaries_delete
+        AFTER DELETE ON pronunciation_dictionaries BEGIN
+            DELETE FROM pronunciation_entries WHERE dictionary_id = old.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pronunciation_cache (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            fingerprint BLOB NOT NULL,
+            data BLOB NOT NULL
+        )
+    ''')
+
+
+def _migration_shared_chunks(cursor):
+    """
+    Части текстов, хранящихся частями, - ссылки на blobs (text_chunks.blob_id),
+    как части версий: текст и его версии, одинаковые тексты разных категорий
+    хранят общие части один раз. blobs.refcount считает ссылки и из
+    text_chunks; данные уже сохранённых частей переносятся в blobs
+    """
+    cursor.execute("PRAGMA table_info(text_chunks)")
+    if 'blob_id' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute('ALTER TABLE text_chunks ADD COLUMN blob_id INTEGER REFERENCES blobs(id)')
+    chunk_ids = cursor.execute('SELECT id FROM text_chunks WHERE blob_id IS NULL').fetchall()
+    for chunk_id, in chunk_ids:
+        digest, codec, length, data = cursor.execute(
+            'SELECT digest, codec, length, data FROM text_chunks WHERE id = ?', (chunk_id,)).fetchone()
+        row = cursor.execute('SELECT id, codec FROM blobs WHERE digest = ?', (digest,)).fetchone()
+        if row is None:
+            raw_size = len(decompressor(codec).decompress(data))
+            cursor.execute('''
+                INSERT INTO blobs (digest, codec, length, raw_size, data) VALUES (?, ?, ?, ?, ?)
+            ''', (digest, codec, length, raw_size, data))
+            row = (cursor.lastrowid, codec)
+        cursor.execute('UPDATE blobs SET refcount = refcount + 1 WHERE id = ?', (row[0],))
+        cursor.execute("UPDATE text_chunks SET blob_id = ?, codec = ?, data = x'' WHERE id = ?",
+                       (row[0], row[1], chunk_id))
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS text_chunks_blob_insert AFTER INSERT ON text_chunks
+        WHEN new.blob_id IS NOT NULL BEGIN
+            UPDATE blobs SET refcount = refcount + 1 WHERE id = new.blob_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS text_chunks_blob_delete AFTER DELETE ON text_chunks
+        WHEN old.blob_id IS NOT NULL BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE id = old.blob_id;
+            DELETE FROM blobs WHERE id = old.blob_id AND refcount <= 0;
+        END
+    ''')
+
+
+# Промежуток между номерами соседних частей текста
+CHUNK_SEQ_STEP = 1024
+
+def _iter_blobs(conn, rows):
+    """Содержимое частей из blobs [(id, кодек), ...] по порциям, потоково"""
+    for blob_id, codec in rows:
+        with conn.blobopen('blobs', 'data', blob_id, readonly=True) as blob:
+            yield from iter_chunk(blob, codec)
+
+
+# Правки в течение REVISION_INTERVAL минут после последней версии текста
+# заменяют её, а не добавляют новую
+REVISION_INTERVAL = 10
+
+
+# Миграции схемы по порядку: после i-й миграции PRAGMA user_version = i + 1.
+# Новые миграции только добавляются в конец списка
+MIGRATIONS = [
+    _migration_initial,
+    _migration_listing,
+    _migration_categories_index,
+    _migration_search,
+    _migration_chunks,
+    _migration_content_hash,
+    _migration_text_state,
+    _migration_revisions,
+    _migration_pronunciation,
+    _migration_shared_chunks,
+]
+
+# Настройки соединения. WAL не блокирует чтение во время записи и вместе с
+# synchronous = NORMAL не требует fsync на каждую транзакцию (fsync только
+# при контрольной точке); кэш страниц 64 МБ, до 256 МБ файла через mmap
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class DatabaseWriter:
+    """
+    Единственный поток записи в базу со своим соединением. submit() ставит
+    запись в очередь и возвращает Future с её результатом; записи,
+    накопившиеся в очереди, выполняются одной транзакцией (не больше
+    batch_size), каждая в своей точке сохранения: ошибка одной записи
+    откатывает только её
+    """
+
+    def __init__(self, connect, batch_size=256):
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self.transactions = 0
+        self.writes = 0
+        self._thread = threading.Thread(target=self._run, args=(connect,), daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args):
+        """Запись func(cursor, *args) в потоке записи; возвращает Future"""
+        future = Future()
+        self._queue.put((future, func, args))
+        return future
+
+    def close(self):
+        """Выполнение оставшихся записей и остановка потока"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self, connect):
+        conn = connect()
+        # Транзакциями управляет поток записи
+        conn.isolation_level = None
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(conn, batch)
+        try:
+            # Обновление статистики планировщика запросов для изменившихся таблиц
+            conn.execute("PRAGMA optimize")
+        except sqlite3.DatabaseError:
+            pass
+        conn.close()
+
+    def _commit(self, conn, batch):
+        results = []
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for future, func, args in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                cursor.execute("SAVEPOINT write")
+                try:
+                    results.append((future, func(cursor, *args), None))
+                    cursor.execute("RELEASE write")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO write")
+                    cursor.execute("RELEASE write")
+                    results.append((future, None, e))
+            cursor.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            for future, func, args in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.transactions += 1
+        self.writes += len(results)
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
 
 class DatabaseManager:
+    """
+    Доступ к базе из любого потока. Чтение идёт через соединение текущего
+    потока (conn, только для чтения): в режиме WAL потоки читают
+    параллельно и не ждут записи. Все изменения выполняет один поток
+    DatabaseWriter: методы *_async возвращают Future, синхронные методы
+    ждут результата той же записи
+    """
+    SCHEMA_VERSION = len(MIGRATIONS)
+
     def __init__(self, db_name='texts.db'):
         self.db_name = db_name
-        self.conn = None
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._writer = None
         self._initialize_database()
 
-    def _initialize_database(self):
-        """Инициализация БД с проверкой структуры"""
-        is_new_db = not os.path.exists(self.db_name)
+    @property
+    def conn(self):
+        """Соединение текущего потока для чтения"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+        return conn
 
+    def _connect(self):
+        # Соединение используется одним потоком, но закрывается в close()
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _initialize_database(self):
+        """Инициализация БД с проверкой структуры и обновлением схемы"""
         try:
-            self.conn = sqlite3.connect(self.db_name)
-            if is_new_db:
-                self._create_tables()
-            else:
-                if not self._check_tables_structure():
-                    self._handle_invalid_database()
+            self._local.conn = sqlite3.connect(self.db_name, check_same_thread=False)
+            if not self._check_tables_structure():
+                self._handle_invalid_database()
+            self._configure_connection()
+            self._migrate()
+            # Дальше соединение потока только читает
+            self.conn.execute("PRAGMA query_only = ON")
+            with self._lock:
+                self._connections.append(self.conn)
         except Exception as e:
             raise RuntimeError(f"Ошибка инициализации БД: {str(e)}")
 
-    def _create_tables(self):
-        """Создание таблиц в новой БД"""
-        cursor = self.conn.cursor()
+    def _configure_connection(self):
+        for pragma in PRAGMAS:
+            self.conn.execute(pragma)
 
-        cursor.execute('''
-            CREATE TABLE categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                created_at DATETIME DEFAULT (datetime('now', 'localtime'))
-            )
-        ''')
+    def write(self, func, *args):
+        """
+        Запись func(cursor, *args) в потоке записи одной транзакцией с
+        соседними записями; возвращает Future с результатом func
+        """
+        with self._lock:
+            if self._writer is None:
+                self._writer = DatabaseWriter(self._connect)
+            writer = self._writer
+        return writer.submit(func, *args)
 
-        cursor.execute('''
-            CREATE TABLE texts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                category_id INTEGER,
-                title TEXT NOT NULL,
-                content TEXT NOT NULL,
-                sort_index INTEGER DEFAULT 0,
-                created_at DATETIME DEFAULT (datetime('now', 'localtime')),
-                updated_at DATETIME DEFAULT (datetime('now', 'localtime')),
-                FOREIGN KEY(category_id) REFERENCES categories(id)
-            )
-        ''')
-        self.conn.commit()
+    def schema_version(self):
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def _migrate(self):
+        """
+        Обновление схемы на месте: выполняются миграции после текущей версии,
+        каждая в своей транзакции вместе с новым номером версии
+        """
+        version = self.schema_version()
+        # База более новой версии программы: миграции только добавляют
+        # таблицы, столбцы и индексы, поэтому с ней можно работать как есть
+        for number in range(version, len(MIGRATIONS)):
+            cursor = self.conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                MIGRATIONS[number](cursor)
+                cursor.execute(f"PRAGMA user_version = {number + 1}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
 
     def _check_tables_structure(self):
-        """Проверка соответствия структуры таблиц"""
+        """
+        Проверка соответствия структуры таблиц: в существующей базе должны
+        быть все столбцы исходной структуры (остальные добавляют миграции)
+        """
         try:
             cursor = self.conn.cursor()
 
             # Проверяем существование и структуру таблицы categories
             cursor.execute("PRAGMA table_info(categories)")
             categories_columns = {row[1] for row in cursor.fetchall()}
-            required_categories = {'id', 'name', 'created_at'}
-            if categories_columns != required_categories:
-                return False
 
             # Проверяем существование и структуру таблицы texts
             cursor.execute("PRAGMA table_info(texts)")
             texts_columns = {row[1] for row in cursor.fetchall()}
+
+            # Новая (пустая) база
+            if not categories_columns and not texts_columns:
+                return True
+
+            required_categories = {'id', 'name', 'created_at'}
+            if not required_categories <= categories_columns:
+                return False
+
             required_texts = {'id', 'category_id', 'title', 'content',
                               'sort_index', 'created_at', 'updated_at'}
-            if texts_columns != required_texts:
+            if not required_texts <= texts_columns:
                 return False
 
             return True
@@ -82,9 +585,18 @@ class DatabaseManager:
         os.makedirs("dump_files", exist_ok=True)
         dest_path = os.path.join("dump_files", backup_name)
         os.rename(self.db_name, dest_path)
+        # Журнал WAL относится к переименованной базе
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(self.db_name + suffix):
+                os.rename(self.db_name + suffix, dest_path + suffix)
+
+        self._local.conn = sqlite3.connect(self.db_name, check_same_thread=False)
 
-        self.conn = sqlite3.connect(self.db_name)
-        self._create_tables()
+    def write_stats(self):
+        """Количество транзакций и записей потока записи"""
+        with self._lock:
+            writer = self._writer
+        return (writer.transactions, writer.writes) if writer is not None else (0, 0)
 
     # Методы для работы с категориями
     def get_all_categories(self):
@@ -93,57 +605,605 @@ class DatabaseManager:
         return cursor.fetchall()
 
     def add_category(self, name):
-        cursor = self.conn.cursor()
+        return self.add_category_async(name).result()
+
+    def add_category_async(self, name):
+        return self.write(self._add_category, name)
+
+    def _add_category(self, cursor, name):
         cursor.execute('INSERT INTO categories (name) VALUES (?)', (name,))
-        self.conn.commit()
         return cursor.lastrowid
 
     # Методы для работы с текстами
     def get_texts_by_category(self, category_id):
         cursor = self.conn.cursor()
         cursor.execute('''
-            SELECT id, category_id, title, content
+            SELECT id, category_id, title, content, chunked
+            FROM texts
+            WHERE category_id = ?
+            ORDER BY sort_index, created_at DESC
+        ''', (category_id,))
+        return [(text_id, category_id, title, self._read_chunks(text_id) if chunked else content)
+                for text_id, category_id, title, content, chunked in cursor.fetchall()]
+
+    def iter_texts_by_category(self, category_id):
+        """
+        Тексты категории по одному: (id, заголовок, содержимое по частям).
+        Строки читаются курсором по мере перебора, текст, хранящийся частями,
+        - потоково (iter_text_content)
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT id, title, content, chunked
             FROM texts
             WHERE category_id = ?
             ORDER BY sort_index, created_at DESC
         ''', (category_id,))
+        for text_id, title, content, chunked in cursor:
+            yield text_id, title, self.iter_text_content(text_id) if chunked else iter((content,))
+
+    def get_text_list(self, category_id, limit=-1, offset=0):
+        """
+        Список текстов категории без содержимого:
+        (id, title, sort_index, content_length, updated_at)
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT id, title, sort_index, content_length, updated_at
+            FROM texts
+            WHERE category_id = ?
+            ORDER BY sort_index, created_at DESC
+            LIMIT ? OFFSET ?
+        ''', (category_id, limit, offset))
         return cursor.fetchall()
 
-    def get_text_content(self, text_id):
+    def count_texts(self, category_id):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM texts WHERE category_id = ?', (category_id,))
+        return cursor.fetchone()[0]
+
+    def search_texts(self, query, limit=20, marks=("[", "]")):
+        """
+        Поиск по всем текстам, лучшие совпадения первыми. Возвращает список
+        (id, category_id, title, фрагмент, позиции), где фрагмент - кусок
+        текста с найденными словами между marks, позиции - список
+        (позиция, длина) найденных слов в тексте. Отбор и ранжирование идут
+        только по индексу; содержимое читается, а позиции и фрагмент
+        вычисляются (match_offsets, make_snippet) только для возвращаемых
+        текстов, для текста, хранящегося частями, - по лучшей части. Части
+        индексируются отдельно, поэтому фраза, разорванная границей частей,
+        не находится
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
         cursor = self.conn.cursor()
-        cursor.execute('SELECT content FROM texts WHERE id = ?', (text_id,))
-        result = cursor.fetchall()
-        return result[0] if result else ""
+        cursor.execute('''
+            SELECT f.rowid, t.category_id, t.title, f.rank
+            FROM texts_fts AS f
+            JOIN texts AS t ON t.id = f.rowid
+            WHERE texts_fts MATCH ?
+            ORDER BY f.rank
+            LIMIT ?
+        ''', (match, limit))
+        # id текста -> (ранг, id, category_id, заголовок, id лучшей части или None)
+        found = {}
+        for text_id, category_id, title, rank in cursor.fetchall():
+            found[text_id] = (rank, text_id, category_id, title, None)
+
+        # Тексты, хранящиеся частями, ищутся по частям; из текста берётся
+        # лучшая часть, позиции отсчитываются от начала текста
+        cursor.execute('''
+            SELECT c.text_id, t.category_id, t.title, f.rank, c.id
+            FROM chunks_fts AS f
+            JOIN text_chunks AS c ON c.id = f.rowid
+            JOIN texts AS t ON t.id = c.text_id
+            WHERE chunks_fts MATCH ?
+            ORDER BY f.rank
+            LIMIT ?
+        ''', (match, limit))
+        for text_id, category_id, title, rank, chunk_id in cursor.fetchall():
+            if text_id not in found or rank < found[text_id][0]:
+                found[text_id] = (rank, text_id, category_id, title, chunk_id)
+
+        results = []
+        for _, text_id, category_id, title, chunk_id in sorted(found.values(), key=lambda item: item[0])[:limit]:
+            if chunk_id is None:
+                content = cursor.execute('SELECT content FROM texts WHERE id = ?', (text_id,)).fetchone()[0]
+                start = 0
+            else:
+                blob_id, codec, start = cursor.execute('''
+                    SELECT b.id, b.codec, (SELECT coalesce(sum(p.length), 0) FROM text_chunks AS p
+                                           WHERE p.text_id = c.text_id AND p.seq < c.seq)
+                    FROM text_chunks AS c JOIN blobs AS b ON b.id = c.blob_id
+                    WHERE c.id = ?
+                ''', (chunk_id,)).fetchone()
+                content = "".join(_iter_blobs(self.conn, [(blob_id, codec)]))
+            offsets = match_offsets(content, query)
+            results.append((text_id, category_id, title, make_snippet(content, offsets, marks),
+                            [(start + position, length) for position, length in offsets]))
+        return results
+
+    def get_text_content(self, text_id, conn=None):
+        cursor = (conn or self.conn).cursor()
+        cursor.execute('SELECT content, chunked FROM texts WHERE id = ?', (text_id,))
+        result = cursor.fetchone()
+        if result is None:
+            return ""
+        return (self._read_chunks(text_id, conn),) if result[1] else (result[0],)
+
+    def iter_text_content(self, text_id, conn=None):
+        """
+        Содержимое текста по частям. Текст, хранящийся частями, читается
+        потоково (sqlite3 blob I/O) и целиком в памяти не собирается.
+        Поток записи передаёт своё соединение conn, чтобы видеть ещё не
+        зафиксированные изменения своей транзакции
+        """
+        conn = conn or self.conn
+        cursor = conn.cursor()
+        cursor.execute('SELECT content, chunked FROM texts WHERE id = ?', (text_id,))
+        result = cursor.fetchone()
+        if result is None:
+            return
+        if not result[1]:
+            yield result[0]
+            return
+        cursor.execute('''
+            SELECT b.id, b.codec
+            FROM text_chunks AS c
+            JOIN blobs AS b ON b.id = c.blob_id
+            WHERE c.text_id = ?
+            ORDER BY c.seq
+        ''', (text_id,))
+        yield from _iter_blobs(conn, cursor.fetchall())
+
+    def _read_chunks(self, text_id, conn=None):
+        return "".join(self.iter_text_content(text_id, conn))
 
     def save_text(self, category_id, title, content):
+        return self.save_text_async(category_id, title, content).result()
+
+    def save_text_async(self, category_id, title, content):
+        return self.write(self._save_text, category_id, title, content)
+
+    def _save_text(self, cursor, category_id, title, content):
+        chunked = len(content) >= CHUNKED_THRESHOLD
+        cursor.execute('''
+            INSERT INTO texts (category_id, title, content, content_length, chunked, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (category_id, title, "" if chunked else content, len(content), int(chunked), text_digest(content)))
+        text_id = cursor.lastrowid
+        if chunked:
+            self._write_chunks(cursor, text_id, content)
+        return text_id
+
+    def update_text(self, text_id, title, content):
+        return self.update_text_async(text_id, title, content).result()
+
+    def update_text_async(self, text_id, title, content):
+        return self.write(self._update_texts, [(text_id, title, content)])
+
+    def update_texts(self, texts):
+        """
+        Сохранение нескольких текстов одной транзакцией: [(id, заголовок,
+        содержимое), ...]. Текст длиннее CHUNKED_THRESHOLD переводится в
+        хранение частями, у такого текста перезаписываются только изменённые
+        части. Возвращает количество записанных байт содержимого
+        """
+        return self.update_texts_async(texts).result()
+
+    def update_texts_async(self, texts):
+        return self.write(self._update_texts, list(texts))
+
+    def _update_texts(self, cursor, texts, merge=True):
+        written = 0
+        for text_id, title, content in texts:
+            cursor.execute('SELECT chunked, title, content FROM texts WHERE id = ?', (text_id,))
+            row = cursor.fetchone()
+            if row is None:
+                continue
+            digest = text_digest(content)
+            first = cursor.execute('SELECT 1 FROM revisions WHERE text_id = ? LIMIT 1', (text_id,)).fetchone() is None
+            if first:
+                # История начинается с первой правки: сначала версия до неё
+                old = self._read_chunks(text_id, cursor.connection) if row[0] else row[2]
+                written += self._add_revision(cursor, text_id, row[1], old, text_digest(old), merge=False)
+            written += self._add_revision(cursor, text_id, title, content, digest, merge and not first)
+            chunked = bool(row[0]) or len(content) >= CHUNKED_THRESHOLD
+            if chunked:
+                written += self._write_chunks(cursor, text_id, content)
+            else:
+                written += len(content.encode("utf-8"))
+            cursor.execute('''
+                UPDATE texts
+                SET title = ?, content = ?, content_length = ?, chunked = ?, content_hash = ?,
+                    updated_at = (datetime('now', 'localtime'))
+                WHERE id = ?
+            ''', (title, "" if chunked else content, len(content), int(chunked), digest, text_id))
+        return written
+
+    def _add_revision(self, cursor, text_id, title, content, digest, merge=True):
+        """
+        Новая версия текста; части, уже хранящиеся в blobs, не записываются.
+        С merge недавняя последняя версия (не единственная) заменяется новой.
+        Возвращает количество записанных байт
+        """
+        cursor.execute('''
+            SELECT id, title, content_hash, created_at > datetime('now', 'localtime', ?)
+            FROM revisions WHERE text_id = ? ORDER BY id DESC LIMIT 2
+        ''', (f'-{REVISION_INTERVAL} minutes', text_id))
+        latest = cursor.fetchall()
+        if latest and latest[0][1] == title and latest[0][2] == digest:
+            return 0
+        cursor.execute('''
+            INSERT INTO revisions (text_id, title, content_length, content_hash) VALUES (?, ?, ?, ?)
+        ''', (text_id, title, len(content), digest))
+        revision_id = cursor.lastrowid
+        written = 0
+        rows = []
+        for seq, (start, end) in enumerate(content_chunks(content)):
+            blob_id, _, size = self._store_blob(cursor, content[start:end], text_digest(content[start:end]))
+            written += size
+            rows.append((revision_id, seq, blob_id))
+        cursor.executemany('INSERT INTO revision_blobs (revision_id, seq, blob_id) VALUES (?, ?, ?)', rows)
+        if merge and len(latest) == 2 and latest[0][3]:
+            # Части, общие с новой версией, уже получили новую ссылку и не удаляются
+            cursor.execute('DELETE FROM revisions WHERE id = ?', (latest[0][0],))
+        return written
+
+    def _store_blob(self, cursor, piece, digest):
+        """
+        Часть в blobs: (id, кодек, количество записанных байт). Часть с тем же
+        хэшем уже может храниться - тогда ничего не записывается. Ссылку на
+        часть (и refcount) добавляет вызывающий
+        """
+        row = cursor.execute('SELECT id, codec FROM blobs WHERE digest = ?', (digest,)).fetchone()
+        if row is not None:
+            return row[0], row[1], 0
+        data = compress(piece, DEFAULT_CODEC)
+        cursor.execute('''
+            INSERT INTO blobs (digest, codec, length, raw_size, data) VALUES (?, ?, ?, ?, ?)
+        ''', (digest, DEFAULT_CODEC, len(piece), len(piece.encode("utf-8")), data))
+        return cursor.lastrowid, DEFAULT_CODEC, len(data)
+
+    def get_revisions(self, text_id):
+        """Версии текста, новые первыми: (id, title, content_length, created_at)"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT id, title, content_length, created_at
+            FROM revisions
+            WHERE text_id = ?
+            ORDER BY id DESC
+        ''', (text_id,))
+        return cursor.fetchall()
+
+    def iter_revision_content(self, revision_id, conn=None):
+        """Содержимое версии по частям, как iter_text_content"""
+        conn = conn or self.conn
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT b.id, b.codec
+            FROM revision_blobs AS r
+            JOIN blobs AS b ON b.id = r.blob_id
+            WHERE r.revision_id = ?
+            ORDER BY r.seq
+        ''', (revision_id,))
+        yield from _iter_blobs(conn, cursor.fetchall())
+
+    def restore_revision(self, revision_id):
+        """
+        Возврат текста к версии revision_id. Текущее содержимое остаётся в
+        истории, восстановление добавляет новую версию. Возвращает id текста
+        """
+        return self.restore_revision_async(revision_id).result()
+
+    def restore_revision_async(self, revision_id):
+        return self.write(self._restore_revision, revision_id)
+
+    def _restore_revision(self, cursor, revision_id):
+        row = cursor.execute('SELECT text_id, title FROM revisions WHERE id = ?', (revision_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Версия {revision_id} не найдена")
+        text_id, title = row
+        content = "".join(self.iter_revision_content(revision_id, cursor.connection))
+        self._update_texts(cursor, [(text_id, title, content)], merge=False)
+        return text_id
+
+    def storage_stats(self):
+        """
+        Экономия места историей версий: (версий, частей в blobs, объём всех
+        версий без сжатия и общих частей, объём хранимых частей) в байтах,
+        а также (текстов-повторов, их объём в символах) по content_hash.
+        Хранимые части включают и части текстов, хранящихся частями (они
+        общие с версиями); небольшие тексты хранятся в texts.content и сюда
+        не входят
+        """
+        cursor = self.conn.cursor()
+        revisions = cursor.execute('SELECT count(*) FROM revisions').fetchone()[0]
+        history = cursor.execute('''
+            SELECT coalesce(sum(b.raw_size), 0)
+            FROM revision_blobs AS r
+            JOIN blobs AS b ON b.id = r.blob_id
+        ''').fetchone()[0]
+        blobs, stored = cursor.execute('SELECT count(*), coalesce(sum(length(data)), 0) FROM blobs').fetchone()
+        duplicates = cursor.execute('''
+            SELECT count(*), coalesce(sum(content_length), 0)
+            FROM texts AS t
+            WHERE content_hash IS NOT NULL
+              AND EXISTS (SELECT 1 FROM texts AS o WHERE o.content_hash = t.content_hash AND o.id < t.id)
+        ''').fetchone()
+        return (revisions, blobs, history, stored) + duplicates
+
+    def import_texts_async(self, texts):
+        """
+        Добавление импортированных текстов одной транзакцией: [(категория,
+        заголовок, содержимое, хэш), ...]. Категории находятся по названию
+        или создаются, тексты встают в конец категории. Тексты с хэшем,
+        который уже есть в базе, пропускаются. Результат Future -
+        (добавлено, пропущено повторов)
+        """
+        return self.write(self._import_texts, list(texts))
+
+    def _import_texts(self, cursor, texts):
+        categories = {}
+        seen = set()
+        rows = []
+        duplicates = 0
+        for category, title, content, digest in texts:
+            if digest in seen or cursor.execute('SELECT 1 FROM texts WHERE content_hash = ? LIMIT 1',
+                                                (digest,)).fetchone():
+                duplicates += 1
+                continue
+            seen.add(digest)
+            if category not in categories:
+                row = cursor.execute('SELECT id FROM categories WHERE name = ? ORDER BY id LIMIT 1',
+                                     (category,)).fetchone()
+                category_id = row[0] if row else self._add_category(cursor, category)
+                sort_index = cursor.execute('SELECT coalesce(max(sort_index) + 1, 0) FROM texts WHERE category_id = ?',
+                                            (category_id,)).fetchone()[0]
+                categories[category] = [category_id, sort_index]
+            category_id, sort_index = categories[category]
+            categories[category][1] += 1
+            if len(content) >= CHUNKED_THRESHOLD:
+                text_id = self._save_text(cursor, category_id, title, content)
+                cursor.execute('UPDATE texts SET sort_index = ? WHERE id = ?', (sort_index, text_id))
+            else:
+                rows.append((category_id, title, content, len(content), digest, sort_index))
+        cursor.executemany('''
+            INSERT INTO texts (category_id, title, content, content_length, content_hash, sort_index)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', rows)
+        return len(texts) - duplicates, duplicates
+
+    def fill_content_hashes(self):
+        """Хэши содержимого текстов, сохранённых до их появления"""
+        text_ids = self.conn.execute('SELECT id FROM texts WHERE content_hash IS NULL').fetchall()
+        hashes = [(text_digest(self.get_text_content(text_id)[0]), text_id) for text_id, in text_ids]
+        if hashes:
+            self.write(lambda cursor: cursor.executemany(
+                'UPDATE texts SET content_hash = ? WHERE id = ?', hashes)).result()
+
+    def get_text_state(self, text_id):
+        """
+        (индекс предложений или None, позиция остановки) текста. Индекс
+        возвращается, только если он построен для текущего содержимого
+        """
         cursor = self.conn.cursor()
         cursor.execute('''
-            INSERT INTO texts (category_id, title, content)
-            VALUES (?, ?, ?)
-        ''', (category_id, title, content))
-        self.conn.commit()
+            SELECT CASE WHEN s.index_hash = t.content_hash THEN s.sentence_index END, s.position
+            FROM text_state AS s
+            JOIN texts AS t ON t.id = s.text_id
+            WHERE s.text_id = ?
+        ''', (text_id,))
+        return cursor.fetchone() or (None, 0)
+
+    def save_position_async(self, text_id, position):
+        """Запоминание места остановки чтения"""
+        return self.write(self._save_position, text_id, position)
+
+    def _save_position(self, cursor, text_id, position):
+        cursor.execute('''
+            INSERT INTO text_state (text_id, position) VALUES (?, ?)
+            ON CONFLICT (text_id) DO UPDATE SET position = excluded.position
+        ''', (text_id, position))
+
+    def save_sentence_indexes(self, indexes):
+        """
+        Сохранение индексов предложений [(id текста, SentenceIndex.pack()),
+        ...], построенных для содержимого, которое сейчас в базе
+        """
+        return self.write(self._save_sentence_indexes, list(indexes)).result()
+
+    def _save_sentence_indexes(self, cursor, indexes):
+        for text_id, packed in indexes:
+            row = cursor.execute('SELECT content_hash FROM texts WHERE id = ?', (text_id,)).fetchone()
+            if row is None:
+                continue
+            digest = row[0]
+            if digest is None:
+                # Текст сохранён до появления хэшей
+                digest = text_digest(self.get_text_content(text_id, cursor.connection)[0])
+                cursor.execute('UPDATE texts SET content_hash = ? WHERE id = ?', (digest, text_id))
+            cursor.execute('''
+                INSERT INTO text_state (text_id, index_hash, sentence_index) VALUES (?, ?, ?)
+                ON CONFLICT (text_id) DO UPDATE
+                SET index_hash = excluded.index_hash, sentence_index = excluded.sentence_index
+            ''', (text_id, digest, packed))
+
+    def _write_chunks(self, cursor, text_id, content):
+        """
+        Запись текста частями: части в начале и в конце текста, хэш которых
+        совпадает с хэшем нового текста на тех же местах, остаются как есть,
+        изменённый участок между ними заново делится на части по содержимому
+        (content_chunks), как версии. Данные частей хранятся в blobs и общие
+        с версиями текста и одинаковыми текстами. Возвращает количество
+        записанных байт сжатых данных
+        """
+        cursor.execute('''
+            SELECT id, seq, length, digest FROM text_chunks WHERE text_id = ? ORDER BY seq
+        ''', (text_id,))
+        chunks = cursor.fetchall()
+        first, start = 0, 0
+        while (first < len(chunks) and start + chunks[first][2] <= len(content)
+               and text_digest(content[start:start + chunks[first][2]]) == chunks[first][3]):
+            start += chunks[first][2]
+            first += 1
+        last, end = len(chunks), len(content)
+        while (last > first and end - chunks[last - 1][2] >= start
+               and text_digest(content[end - chunks[last - 1][2]:end]) == chunks[last - 1][3]):
+            end -= chunks[last - 1][2]
+            last -= 1
+
+        if end - start < REVISION_CHUNK_MIN and last < len(chunks):
+            # Мелкий изменённый участок объединяется со следующей частью,
+            # чтобы правки не дробили текст на множество маленьких частей
+            end += chunks[last][2]
+            last += 1
+        bounds = [(start + left, start + right) for left, right in content_chunks(content[start:end])]
+        low = chunks[first - 1][1] if first > 0 else 0
+        if last < len(chunks) and chunks[last][1] - low <= len(bounds):
+            # Между соседними частями не осталось свободных номеров:
+            # переписывается весь хвост текста
+            last, end = len(chunks), len(content)
+            bounds = [(start + left, start + right) for left, right in content_chunks(content[start:end])]
+        high = chunks[last][1] if last < len(chunks) else low + (len(bounds) + 1) * CHUNK_SEQ_STEP
+
+        cursor.executemany('DELETE FROM text_chunks WHERE id = ?', ((chunk[0],) for chunk in chunks[first:last]))
+        written = 0
+        for number, (chunk_start, chunk_end) in enumerate(bounds, 1):
+            text = content[chunk_start:chunk_end]
+            digest = text_digest(text)
+            blob_id, codec, size = self._store_blob(cursor, text, digest)
+            cursor.execute('''
+                INSERT INTO text_chunks (text_id, seq, length, digest, codec, data, blob_id)
+                VALUES (?, ?, ?, ?, ?, x'', ?)
+            ''', (text_id, low + (high - low) * number // (len(bounds) + 1), len(text),
+                  digest, codec, blob_id))
+            cursor.execute('INSERT INTO chunks_fts (rowid, content) VALUES (?, ?)',
+                           (cursor.lastrowid, fold_for_search(text)))
+            written += size
+        return written
+
+    # Методы для работы со словарями произношений
+    def get_pronunciation_dictionaries(self):
+        """Словари: список (id, название, включён, количество записей)"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT d.id, d.name, d.enabled,
+                   (SELECT COUNT(*) FROM pronunciation_entries AS e WHERE e.dictionary_id = d.id)
+            FROM pronunciation_dictionaries AS d
+            ORDER BY d.id
+        ''')
+        return cursor.fetchall()
+
+    def add_pronunciation_dictionary(self, name):
+        return self.write(self._add_pronunciation_dictionary, name).result()
+
+    def _add_pronunciation_dictionary(self, cursor, name):
+        cursor.execute('INSERT INTO pronunciation_dictionaries (name) VALUES (?)', (name,))
         return cursor.lastrowid
 
-    def update_text(self, text_id, title, content):
+    def delete_pronunciation_dictionary(self, dictionary_id):
+        return self.write(lambda cursor: cursor.execute(
+            'DELETE FROM pronunciation_dictionaries WHERE id = ?', (dictionary_id,))).result()
+
+    def set_pronunciation_dictionary_enabled(self, dictionary_id, enabled):
+        return self.write(lambda cursor: cursor.execute(
+            'UPDATE pronunciation_dictionaries SET enabled = ? WHERE id = ?',
+            (1 if enabled else 0, dictionary_id))).result()
+
+    def get_pronunciation_entries(self, dictionary_id, search="", limit=500):
+        """Записи словаря (термин, замена, фонемы), термины которых начинаются с search"""
         cursor = self.conn.cursor()
         cursor.execute('''
-            UPDATE texts
-            SET title = ?, content = ?, updated_at = (datetime('now', 'localtime'))
-            WHERE id = ?
-        ''', (title, content, text_id))
-        self.conn.commit()
+            SELECT term, replacement, phoneme FROM pronunciation_entries
+            WHERE dictionary_id = ? AND term >= ? AND term < ? || char(1114111)
+            ORDER BY term
+            LIMIT ?
+        ''', (dictionary_id, search, search, limit))
+        return cursor.fetchall()
 
-    def update_sort_indexes(self, indexes):
+    def save_pronunciation_entries(self, dictionary_id, entries):
+        """
+        Добавление или замена записей [(термин, замена, фонемы), ...] одной
+        транзакцией; возвращает количество записей
+        """
+        return self.write(self._save_pronunciation_entries, dictionary_id, list(entries)).result()
+
+    def _save_pronunciation_entries(self, cursor, dictionary_id, entries):
+        cursor.executemany('''
+            INSERT INTO pronunciation_entries (dictionary_id, term, replacement, phoneme) VALUES (?, ?, ?, ?)
+            ON CONFLICT (dictionary_id, term) DO UPDATE
+            SET replacement = excluded.replacement, phoneme = excluded.phoneme
+        ''', [(dictionary_id, term, replacement, 1 if phoneme else 0) for term, replacement, phoneme in entries])
+        cursor.execute('UPDATE pronunciation_dictionaries SET version = version + 1 WHERE id = ?', (dictionary_id,))
+        return len(entries)
+
+    def delete_pronunciation_entry(self, dictionary_id, term):
+        return self.write(self._delete_pronunciation_entry, dictionary_id, term).result()
+
+    def _delete_pronunciation_entry(self, cursor, dictionary_id, term):
+        cursor.execute('DELETE FROM pronunciation_entries WHERE dictionary_id = ? AND term = ?',
+                       (dictionary_id, term))
+        cursor.execute('UPDATE pronunciation_dictionaries SET version = version + 1 WHERE id = ?', (dictionary_id,))
+
+    def get_pronunciation_versions(self):
+        """Включённые словари: список (id, версия)"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT id, version FROM pronunciation_dictionaries WHERE enabled = 1 ORDER BY id')
+        return cursor.fetchall()
+
+    def iter_pronunciation_entries(self):
+        """
+        Записи (термин, замена, фонемы) включённых словарей; записи словаря,
+        добавленного позже, идут после и заменяют совпадающие термины
+        """
         cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT e.term, e.replacement, e.phoneme
+            FROM pronunciation_entries AS e
+            JOIN pronunciation_dictionaries AS d ON d.id = e.dictionary_id
+            WHERE d.enabled = 1
+            ORDER BY e.dictionary_id
+        ''')
+        yield from cursor
+
+    def get_pronunciation_cache(self, fingerprint):
+        """Сохранённый словарь (PronunciationLexicon.pack) для отпечатка или None"""
+        row = self.conn.execute('SELECT data FROM pronunciation_cache WHERE id = 1 AND fingerprint = ?',
+                                (fingerprint,)).fetchone()
+        return row[0] if row is not None else None
+
+    def save_pronunciation_cache_async(self, fingerprint, data):
+        return self.write(lambda cursor: cursor.execute('''
+            INSERT INTO pronunciation_cache (id, fingerprint, data) VALUES (1, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET fingerprint = excluded.fingerprint, data = excluded.data
+        ''', (fingerprint, data)))
+
+    def update_sort_indexes(self, indexes):
+        return self.update_sort_indexes_async(indexes).result()
+
+    def update_sort_indexes_async(self, indexes):
+        return self.write(self._update_sort_indexes, list(indexes))
+
+    def _update_sort_indexes(self, cursor, indexes):
         cursor.executemany('''
             UPDATE texts
             SET sort_index = ?
             WHERE id = ?
         ''', indexes)
-        self.conn.commit()
 
     def close(self):
-        self.conn.close()
+        """Выполнение поставленных в очередь записей и закрытие всех соединений"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
 
 
 class Category:
@@ -0,0 +1,339 @@
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ElementTree
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+try:
+    from charset_normalizer import from_bytes
+except ImportError:  # без charset-normalizer пробуются UTF-8 и cp1251
+    from_bytes = None
+
+from text_storage import text_digest
+
+
+EXTENSIONS = (".txt", ".fb2", ".epub", ".html", ".htm", ".xhtml")
+
+# Файлов в одном задании процесса: меньше обмена между процессами
+FILES_PER_TASK = 32
+# Текстов (или мегабайт текста) в одной записи в базу
+BATCH_TEXTS = 1000
+BATCH_CHARS = 32 * 1024 * 1024
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+def find_files(root):
+    """
+    Файлы поддерживаемых форматов в папке root и вложенных папках:
+    список (путь, категория). Категория - путь папки относительно root
+    ("Автор / Серия"), для файлов самой root - имя root
+    """
+    root = os.path.abspath(root)
+    files = []
+    for folder, folders, names in os.walk(root):
+        folders.sort()
+        relative = os.path.relpath(folder, root)
+        category = os.path.basename(root) if relative == "." else " / ".join(relative.split(os.sep))
+        for name in sorted(names):
+            if name.lower().endswith(EXTENSIONS):
+                files.append((os.path.join(folder, name), category))
+    return files
+
+
+def decode_bytes(data):
+    """Текст из байтов неизвестной кодировки"""
+    if data.startswith(b"\xef\xbb\xbf"):
+        return data[3:].decode("utf-8")
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return data.decode("utf-16")
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        pass
+    if from_bytes is not None:
+        best = from_bytes(data).best()
+        if best is not None:
+            return str(best)
+    # Русские тексты не в UTF-8 чаще всего в cp1251
+    return data.decode("cp1251", errors="replace")
+
+
+# Абзацы HTML идут с новой строки, заголовки и разделы отделяются пустой строкой
+_BLOCK_TAGS = {"p", "div", "br", "li", "tr", "blockquote", "pre", "dd", "dt"}
+_SECTION_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "hr"}
+_SKIP_TAGS = {"script", "style", "head", "title", "svg"}
+
+
+class _HtmlText(HTMLParser):
+    """Текст HTML по абзацам; заголовок страницы - в title"""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.title = ""
+        self._skip = 0
+        self._in_title = False
+        self._break = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+            self._in_title = tag == "title"
+        else:
+            self._line_break(tag)
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+            self._in_title = False
+        elif tag != "br":
+            self._line_break(tag)
+
+    def _line_break(self, tag):
+        if tag in _SECTION_TAGS:
+            self._break = 2
+        elif tag in _BLOCK_TAGS:
+            self._break = max(self._break, 1)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            if self._break:
+                # Пробелы между блоками не нужны
+                if not data.strip():
+                    return
+                if self.parts:
+                    self.parts.append("\n" * self._break)
+                self._break = 0
+                data = data.lstrip()
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    """(заголовок, текст) страницы HTML"""
+    parser = _HtmlText()
+    parser.feed(html)
+    parser.close()
+    return parser.title.strip(), "".join(parser.parts)
+
+
+def _html_bytes_to_text(data):
+    match = re.search(rb"""<meta[^>]+charset=["']?([\w-]+)""", data[:4096], re.IGNORECASE)
+    if match:
+        try:
+            return html_to_text(data.decode(match.group(1).decode("ascii")))
+        except (LookupError, UnicodeDecodeError):
+            pass
+    return html_to_text(decode_bytes(data))
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _fb2_to_text(data):
+    """
+    (заголовок, текст) книги FB2. Кодировку указывает заголовок XML;
+    картинки (binary) пропускаются без разбора
+    """
+    title = ""
+    paragraphs = []
+    root = ElementTree.fromstring(data)
+    for element in root:
+        name = _local_name(element.tag)
+        if name == "description":
+            for child in element.iter():
+                if _local_name(child.tag) == "book-title" and child.text:
+                    title = child.text.strip()
+                    break
+        elif name == "body":
+            for child in element.iter():
+                if _local_name(child.tag) in ("p", "v", "subtitle", "text-author"):
+                    paragraphs.append("".join(child.itertext()).strip())
+                elif _local_name(child.tag) in ("section", "title", "stanza", "empty-line"):
+                    # Разделы и заголовки отделяются пустой строкой
+                    if paragraphs and paragraphs[-1]:
+                        paragraphs.append("")
+    return title, "\n".join(paragraphs)
+
+
+def _epub_to_text(path):
+    """(заголовок, текст) книги EPUB: документы в порядке spine из OPF"""
+    with zipfile.ZipFile(path) as book:
+        container = ElementTree.fromstring(book.read("META-INF/container.xml"))
+        opf_path = next(element.get("full-path") for element in container.iter()
+                        if _local_name(element.tag) == "rootfile")
+        opf = ElementTree.fromstring(book.read(opf_path))
+        base = posixpath.dirname(opf_path)
+        title = ""
+        manifest = {}
+        spine = []
+        for element in opf.iter():
+            name = _local_name(element.tag)
+            if name == "title" and not title and element.text:
+                title = element.text.strip()
+            elif name == "item":
+                manifest[element.get("id")] = element.get("href")
+            elif name == "itemref":
+                spine.append(element.get("idref"))
+        parts = []
+        for item_id in spine:
+            href = manifest.get(item_id)
+            if href is None:
+                continue
+            data = book.read(posixpath.normpath(posixpath.join(base, href)))
+            parts.append(_html_bytes_to_text(data)[1])
+    return title, "\n\n".join(parts)
+
+
+_BLANK_LINES_RE = re.compile(r"\n[ \t]*(?:\n[ \t]*){2,}")
+
+
+def normalize_text(text):
+    """Единые переводы строк, без пробелов в концах строк и лишних пустых строк"""
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\xa0", " ")
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", text).strip("\n")
+
+
+def extract_text(path):
+    """(заголовок, текст) файла; заголовок по умолчанию - имя файла"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".epub":
+        title, content = _epub_to_text(path)
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+        if extension == ".fb2":
+            title, content = _fb2_to_text(data)
+        elif extension in (".html", ".htm", ".xhtml"):
+            title, content = _html_bytes_to_text(data)
+        else:
+            title, content = "", decode_bytes(data)
+    return title or os.path.splitext(os.path.basename(path))[0], normalize_text(content)
+
+
+def extract_files(paths):
+    """
+    Разбор группы файлов в процессе пула: список (заголовок, текст, хэш,
+    ошибка). Хэш текста для поиска повторов считается здесь же
+    """
+    results = []
+    for path in paths:
+        try:
+            title, content = extract_text(path)
+            results.append((title, content, text_digest(content), None))
+        except Exception as e:
+            results.append((None, None, None, f"{os.path.basename(path)}: {str(e)}"))
+    return results
+
+
+class BulkImporter:
+    """
+    Импорт папки с текстами (txt, fb2, epub, html) в базу по категориям.
+
+    Файлы разбираются в процессах (extract_files) группами по
+    FILES_PER_TASK, вперёд разбирается не больше workers * 2 групп.
+    Готовые тексты записываются пачками (DatabaseManager.import_texts_async)
+    одной транзакцией; пока пачка записывается, разбираются следующие
+    файлы. Тексты, совпадающие по хэшу с уже имеющимися в базе или в этом
+    импорте, пропускаются.
+
+    progress(done, total, path) вызывается из потока импорта. После
+    import_folder() imported - количество добавленных текстов, duplicates -
+    пропущенных повторов, failed - список ошибок.
+    """
+
+    def __init__(self, db, workers=None, progress=None):
+        self.db = db
+        self.workers = workers or os.cpu_count() or 2
+        self.progress = progress
+        self.imported = 0
+        self.duplicates = 0
+        self.failed = []
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def import_folder(self, root):
+        files = find_files(root)
+        if not files:
+            return
+        # Тексты, сохранённые до появления хэшей, тоже участвуют в поиске повторов
+        self.db.fill_content_hashes()
+        groups = [files[i:i + FILES_PER_TASK] for i in range(0, len(files), FILES_PER_TASK)]
+        window = self.workers * 2
+        pending = deque()
+        writes = deque()
+        batch = []
+        batch_chars = 0
+        done = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                groups = iter(groups)
+                for group in groups:
+                    pending.append((group, executor.submit(extract_files, [path for path, _ in group])))
+                    if len(pending) >= window:
+                        break
+                while pending:
+                    if self._cancelled:
+                        raise ImportCancelled()
+                    group, future = pending.popleft()
+                    following = next(groups, None)
+                    if following is not None:
+                        pending.append((following, executor.submit(extract_files,
+                                                                   [path for path, _ in following])))
+                    for (path, category), (title, content, digest, error) in zip(group, future.result()):
+                        done += 1
+                        if error is not None:
+                            self.failed.append(error)
+                        else:
+                            batch.append((category, title, content, digest))
+                            batch_chars += len(content)
+                        if self.progress is not None:
+                            self.progress(done, len(files), path)
+                    if len(batch) >= BATCH_TEXTS or batch_chars >= BATCH_CHARS:
+                        self._write(writes, batch)
+                        batch, batch_chars = [], 0
+                if batch:
+                    self._write(writes, batch)
+                while writes:
+                    self._written(writes.popleft())
+            except BaseException:
+                for _, future in pending:
+                    future.cancel()
+                # Пачки, которые поток записи уже взял, всё равно сохраняются:
+                # дожидаемся их, чтобы imported и duplicates совпадали с базой
+                while writes:
+                    future = writes.popleft()
+                    if future.cancel():
+                        continue
+                    try:
+                        self._written(future)
+                    except Exception as e:
+                        self.failed.append(f"Ошибка записи: {str(e)}")
+                raise
+
+    def _write(self, writes, batch):
+        # Не больше двух пачек в очереди записи: память не растёт, если
+        # разбор идёт быстрее записи
+        while len(writes) >= 2:
+            self._written(writes.popleft())
+        writes.append(self.db.import_texts_async(batch))
+
+    def _written(self, future):
+        imported, duplicates = future.result()
+        self.imported += imported
+        self.duplicates += duplicates
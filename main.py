@@ -1,14 +1,29 @@
+import multiprocessing
 import os.path
 import sys
-import win32com.client
+import threading
+import time
 from PyQt6 import QtWidgets
 from PyQt6.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox, QDialog, QVBoxLayout, QLabel, \
-    QPushButton, QHBoxLayout, QInputDialog, QLineEdit, QTextEdit
-from PyQt6.QtCore import Qt, QTimer, QUrl
-from PyQt6.QtGui import QTextCursor, QTextCharFormat, QColor, QFont, QDesktopServices, QStandardItem, QStandardItemModel
+    QPushButton, QHBoxLayout, QInputDialog, QLineEdit, QTextEdit, QProgressDialog, QListWidget
+from PyQt6.QtCore import Qt, QUrl, QObject, QTimer, pyqtSignal
+from PyQt6.QtGui import QTextCursor, QTextCharFormat, QColor, QFont, QDesktopServices, QGuiApplication
 from ui.MainWindow import Ui_MainWindow
 from version import VERSION, VERSION_NAME, BUILD_DATE, AUTHOR, GITHUB_URL
 from database import DatabaseManager, Category, Text
+from segmenter import split_text_into_sentences, SentenceIndex, chunk_sizes
+from normalizer import SpokenSentences
+from pronunciation import load_lexicon, parse_entries
+from tts_engine import create_engine
+from audio_output import BufferedEngine, QAudioSink, create_sink
+from playback import SentenceQueue, WordTracker
+from render_cache import RenderCache
+from renderer import RenderPool
+from text_list_model import TextListModel, NEW_TEXT_ID
+from autosave import AutosaveService, AUTOSAVE_DELAY_MS, AUTOSAVE_MAX_DELAY_MS
+from audio_export import AudioExporter, ExportCancelled, FORMATS, safe_file_name
+from text_export import TextExporter, TEXT_FORMATS
+from importer import BulkImporter, ImportCancelled, decode_bytes
 
 
 class AboutDialog(QDialog):
@@ -117,6 +132,361 @@ class AboutDialog(QDialog):
         QDesktopServices.openUrl(QUrl(GITHUB_URL))
 
 
+class SearchDialog(QDialog):
+    """
+    Поиск по всем текстам базы. Выбранное совпадение передаётся окну
+    сигналом result_chosen(id текста, id категории, позиция в тексте)
+    """
+    result_chosen = pyqtSignal(int, int, int)
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.results = []
+        self.setWindowTitle("Поиск по текстам")
+        self.resize(600, 400)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("Слова для поиска...")
+        layout.addWidget(self.query_edit)
+
+        self.results_list = QListWidget()
+        self.results_list.setWordWrap(True)
+        layout.addWidget(self.results_list)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+        # Поиск после паузы в наборе, а не на каждую букву
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.run_search)
+
+        self.query_edit.textChanged.connect(self.search_timer.start)
+        self.query_edit.returnPressed.connect(self.open_current_result)
+        self.results_list.itemActivated.connect(self.open_current_result)
+
+    def run_search(self):
+        """Поиск по введённым словам"""
+        self.search_timer.stop()
+        self.results_list.clear()
+        self.results = []
+        query = self.query_edit.text().strip()
+        if not query:
+            self.status_label.clear()
+            return
+        try:
+            started = time.perf_counter()
+            self.results = self.db.search_texts(query, limit=50, marks=("«", "»"))
+            elapsed = time.perf_counter() - started
+        except Exception as e:
+            self.status_label.setText(f"Ошибка поиска: {str(e)}")
+            return
+        for _, _, title, snippet, _ in self.results:
+            self.results_list.addItem(f"{title}\n{snippet}")
+        if self.results:
+            self.results_list.setCurrentRow(0)
+        self.status_label.setText(f"Найдено: {len(self.results)} ({elapsed * 1000:.0f} мс)")
+
+    def open_current_result(self):
+        """Открытие выбранного совпадения (Enter в строке поиска - первого)"""
+        if self.search_timer.isActive():
+            self.run_search()
+        row = self.results_list.currentRow()
+        if 0 <= row < len(self.results):
+            text_id, category_id, _, _, offsets = self.results[row]
+            self.result_chosen.emit(text_id, category_id, offsets[0][0] if offsets else 0)
+
+
+class HistoryDialog(QDialog):
+    """
+    История версий текста. Выбранная версия передаётся окну сигналом
+    revision_chosen(id версии)
+    """
+    revision_chosen = pyqtSignal(int)
+
+    def __init__(self, db, text_id, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.text_id = text_id
+        self.revisions = []
+        self.setWindowTitle("История версий")
+        self.resize(500, 400)
+        self.setup_ui()
+        self.load_revisions()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        self.revisions_list = QListWidget()
+        layout.addWidget(self.revisions_list)
+
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+
+        buttons = QHBoxLayout()
+        self.restore_button = QPushButton("Восстановить")
+        self.restore_button.clicked.connect(self.restore_current_revision)
+        buttons.addWidget(self.restore_button)
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.close)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+        self.revisions_list.itemActivated.connect(self.restore_current_revision)
+
+    def load_revisions(self):
+        """Версии текста и место, сэкономленное общими частями"""
+        self.revisions_list.clear()
+        try:
+            self.revisions = self.db.get_revisions(self.text_id)
+            revisions, blobs, history, stored, _, _ = self.db.storage_stats()
+        except Exception as e:
+            self.status_label.setText(f"Ошибка загрузки истории: {str(e)}")
+            return
+        for _, title, content_length, created_at in self.revisions:
+            self.revisions_list.addItem(f"{created_at}  {title} ({content_length} символов)")
+        if self.revisions:
+            self.revisions_list.setCurrentRow(0)
+        else:
+            self.status_label.setText("У текста пока нет правок")
+            return
+        self.status_label.setText(
+            f"Всего версий: {revisions}, без общих частей и сжатия они заняли бы {history / 2 ** 20:.1f} МБ, "
+            f"хранится {stored / 2 ** 20:.1f} МБ"
+        )
+        self.restore_button.setEnabled(len(self.revisions) > 1)
+
+    def restore_current_revision(self):
+        """Возврат к выбранной версии (первая в списке - текущая)"""
+        row = self.revisions_list.currentRow()
+        if 0 < row < len(self.revisions):
+            self.revision_chosen.emit(self.revisions[row][0])
+            self.close()
+
+
+class PronunciationDialog(QDialog):
+    """
+    Словари произношений: включение, пополнение и импорт из файла. После
+    закрытия modified показывает, нужно ли пересобрать словарь окна
+    """
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.dictionaries = []
+        self.entries = []
+        self.modified = False
+        self.setWindowTitle("Словари произношений")
+        self.resize(600, 500)
+        self.setup_ui()
+        self.load_dictionaries()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        self.dictionaries_list = QListWidget()
+        self.dictionaries_list.setMaximumHeight(120)
+        layout.addWidget(self.dictionaries_list)
+
+        dictionary_buttons = QHBoxLayout()
+        add_dictionary_button = QPushButton("Новый словарь")
+        add_dictionary_button.clicked.connect(self.add_dictionary)
+        dictionary_buttons.addWidget(add_dictionary_button)
+        import_button = QPushButton("Импорт из файла")
+        import_button.clicked.connect(self.import_entries)
+        dictionary_buttons.addWidget(import_button)
+        delete_dictionary_button = QPushButton("Удалить словарь")
+        delete_dictionary_button.clicked.connect(self.delete_dictionary)
+        dictionary_buttons.addWidget(delete_dictionary_button)
+        layout.addLayout(dictionary_buttons)
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Начало термина...")
+        layout.addWidget(self.filter_edit)
+
+        self.entries_list = QListWidget()
+        layout.addWidget(self.entries_list)
+
+        entry_buttons = QHBoxLayout()
+        self.entry_edit = QLineEdit()
+        self.entry_edit.setPlaceholderText("термин = произношение или термин = /фонемы IPA/")
+        entry_buttons.addWidget(self.entry_edit)
+        add_entry_button = QPushButton("Добавить")
+        add_entry_button.clicked.connect(self.add_entry)
+        entry_buttons.addWidget(add_entry_button)
+        delete_entry_button = QPushButton("Удалить запись")
+        delete_entry_button.clicked.connect(self.delete_entry)
+        entry_buttons.addWidget(delete_entry_button)
+        layout.addLayout(entry_buttons)
+
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+        self.dictionaries_list.currentRowChanged.connect(self.load_entries)
+        self.dictionaries_list.itemChanged.connect(self.toggle_dictionary)
+        self.filter_edit.textChanged.connect(self.load_entries)
+        self.entry_edit.returnPressed.connect(self.add_entry)
+
+    def current_dictionary_id(self):
+        row = self.dictionaries_list.currentRow()
+        return self.dictionaries[row][0] if 0 <= row < len(self.dictionaries) else None
+
+    def load_dictionaries(self, select_id=None):
+        """Список словарей; флажок - словарь включён"""
+        self.dictionaries_list.blockSignals(True)
+        self.dictionaries_list.clear()
+        try:
+            self.dictionaries = self.db.get_pronunciation_dictionaries()
+        except Exception as e:
+            self.dictionaries = []
+            self.status_label.setText(f"Ошибка загрузки словарей: {str(e)}")
+        for dictionary_id, name, enabled, count in self.dictionaries:
+            item = QtWidgets.QListWidgetItem(f"{name} ({count} записей)")
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked if enabled else Qt.CheckState.Unchecked)
+            self.dictionaries_list.addItem(item)
+        self.dictionaries_list.blockSignals(False)
+        rows = [i for i, dictionary in enumerate(self.dictionaries) if dictionary[0] == select_id]
+        self.dictionaries_list.setCurrentRow(rows[0] if rows else 0 if self.dictionaries else -1)
+        self.load_entries()
+
+    def load_entries(self):
+        """Записи выбранного словаря, начинающиеся с введённого текста (первые 500)"""
+        self.entries_list.clear()
+        dictionary_id = self.current_dictionary_id()
+        if dictionary_id is None:
+            self.entries = []
+            return
+        try:
+            self.entries = self.db.get_pronunciation_entries(dictionary_id, self.filter_edit.text().strip())
+        except Exception as e:
+            self.status_label.setText(f"Ошибка загрузки словаря: {str(e)}")
+            return
+        for term, replacement, phoneme in self.entries:
+            self.entries_list.addItem(f"{term} = /{replacement}/" if phoneme else f"{term} = {replacement}")
+
+    def add_dictionary(self):
+        name, ok = QInputDialog.getText(self, "Новый словарь", "Название словаря:")
+        if ok and name.strip():
+            try:
+                dictionary_id = self.db.add_pronunciation_dictionary(name.strip())
+            except Exception as e:
+                self.status_label.setText(f"Ошибка создания словаря: {str(e)}")
+                return
+            self.load_dictionaries(dictionary_id)
+
+    def delete_dictionary(self):
+        dictionary_id = self.current_dictionary_id()
+        if dictionary_id is None:
+            return
+        reply = QMessageBox.question(self, "Удаление словаря", "Удалить словарь со всеми записями?")
+        if reply == QMessageBox.StandardButton.Yes:
+            try:
+                self.db.delete_pronunciation_dictionary(dictionary_id)
+                self.modified = True
+            except Exception as e:
+                self.status_label.setText(f"Ошибка удаления словаря: {str(e)}")
+            self.load_dictionaries()
+
+    def toggle_dictionary(self, item):
+        row = self.dictionaries_list.row(item)
+        if 0 <= row < len(self.dictionaries):
+            try:
+                self.db.set_pronunciation_dictionary_enabled(self.dictionaries[row][0],
+                                                             item.checkState() == Qt.CheckState.Checked)
+                self.modified = True
+            except Exception as e:
+                self.status_label.setText(f"Ошибка изменения словаря: {str(e)}")
+
+    def import_entries(self):
+        """Записи из текстового файла: строки "термин = произношение" или через табуляцию"""
+        dictionary_id = self.current_dictionary_id()
+        if dictionary_id is None:
+            self.status_label.setText("Сначала создайте словарь")
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Импорт словаря", "",
+                                              "Текстовые файлы (*.txt *.tsv *.dic);;Все файлы (*)")
+        if not path:
+            return
+        try:
+            with open(path, "rb") as f:
+                lines = decode_bytes(f.read()).splitlines()
+            count = self.db.save_pronunciation_entries(dictionary_id, parse_entries(lines))
+            self.modified = True
+            self.status_label.setText(f"Импортировано записей: {count}")
+        except Exception as e:
+            self.status_label.setText(f"Ошибка импорта словаря: {str(e)}")
+        self.load_dictionaries(dictionary_id)
+
+    def add_entry(self):
+        dictionary_id = self.current_dictionary_id()
+        if dictionary_id is None:
+            self.status_label.setText("Сначала создайте словарь")
+            return
+        entries = list(parse_entries([self.entry_edit.text()]))
+        if not entries:
+            self.status_label.setText("Запись вводится как: термин = произношение")
+            return
+        try:
+            self.db.save_pronunciation_entries(dictionary_id, entries)
+            self.modified = True
+            self.entry_edit.clear()
+        except Exception as e:
+            self.status_label.setText(f"Ошибка сохранения записи: {str(e)}")
+        self.load_dictionaries(dictionary_id)
+
+    def delete_entry(self):
+        dictionary_id = self.current_dictionary_id()
+        row = self.entries_list.currentRow()
+        if dictionary_id is None or not 0 <= row < len(self.entries):
+            return
+        try:
+            self.db.delete_pronunciation_entry(dictionary_id, self.entries[row][0])
+            self.modified = True
+        except Exception as e:
+            self.status_label.setText(f"Ошибка удаления записи: {str(e)}")
+        self.load_dictionaries(dictionary_id)
+
+
+class EngineSignals(QObject):
+    """
+    Сигналы движка синтеза речи. Обработчики движка могут вызываться не из
+    потока GUI, сигналы доставляют события в поток окна.
+    """
+    start_stream = pyqtSignal(int)
+    end_stream = pyqtSignal(int)
+    word = pyqtSignal(int, int, int)
+    sentence = pyqtSignal(int, int, int)
+
+
+class AutosaveSignals(QObject):
+    """
+    Сигналы фонового автосохранения: количество сохранённых текстов и ошибки
+    """
+    saved = pyqtSignal(int)
+    error = pyqtSignal(str)
+
+
+class ExportSignals(QObject):
+    """
+    Сигналы фоновых задач (экспорт, импорт): ход работы и итоговое
+    сообщение
+    """
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(str)
+
+
 class MainWindow(QMainWindow, Ui_MainWindow):
     def __init__(self):
         super().__init__()
@@ -126,7 +496,33 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.setFixedSize(800, 600)
 
         self.voice_list = []
-        self.speaker = None
+        self.engine = None
+        self.engine_signals = EngineSignals()
+        # Предложения, заранее поставленные в очередь движка, и кэш
+        # синтезированной речи для повторного чтения тех же текстов
+        self.sentence_queue = None
+        self.render_cache = RenderCache()
+        # Фоновый синтез следующих предложений в кэш
+        self.render_pool = None
+        # Фоновый экспорт категории в аудиофайлы
+        self.audio_exporter = None
+        self.export_progress = None
+        self.export_signals = ExportSignals()
+        # Фоновый экспорт категории в текстовые файлы или архив
+        self.text_exporter = None
+        self.text_export_signals = ExportSignals()
+        self.importer = None
+        self.import_progress = None
+        self.import_signals = ExportSignals()
+        self.search_dialog = None
+        # Фоновое сохранение правок: снимок документа берётся после паузы в
+        # наборе, запись идёт в потоке AutosaveService
+        self.autosave = None
+        self.autosave_signals = AutosaveSignals()
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setSingleShot(True)
+        self.dirty_since = None
+        self.saved_revision = None
         self.is_playing = False
         self.is_pause = False
         
@@ -134,18 +530,35 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.sentences = []
         self.sentence_positions = []  # Позиции предложений в тексте
         self.current_sentence_index = 0
-        self.current_text = ""
-        self.playback_timer = QTimer()
-        self.playback_timer.timeout.connect(self.check_playback_status)
-        
-        # Форматы для выделения текста
+        # Индекс предложений документа, обновляется при каждой правке текста.
+        # Предложения объединяются и делятся во фрагменты по 2-15 секунд
+        # звучания (segmenter.chunk_sizes) для скорости, с которой начато
+        # чтение (apply_chunk_sizes)
+        self.sentence_index = SentenceIndex(chunk_sizes=chunk_sizes())
+        # Предложения в том виде, в каком их произносит движок: числа,
+        # даты и сокращения словами (normalizer)
+        self.spoken_sentences = SpokenSentences(self.sentence_index.sentences)
+        # Звучащее слово: события слов движка только запоминаются,
+        # выделение перерисовывается таймером не чаще обновления экрана
+        self.word_tracker = WordTracker(self.spoken_sentences)
+        self.word_timer = QTimer(self)
+        self.word_timer.setInterval(self.frame_interval())
+        # Документ заполняется текстом: правки в индекс не передаются
+        self.loading_text = False
+        # Ревизия документа, для которой индекс сохранён в базе
+        self.index_revision = None
+        # Место остановки чтения: с него начинается следующее воспроизведение
+        self.resume_position = 0
+
+        # Формат выделения текста. Выделение рисуется поверх документа через
+        # extra selections и не меняет форматирование самого текста
         self.highlight_format = QTextCharFormat()
         self.highlight_format.setBackground(QColor(0, 255, 255, 100))  # Полупрозрачный голубой
         self.highlight_format.setForeground(QColor(0, 0, 0))  # Черный текст
-        
-        self.normal_format = QTextCharFormat()
-        self.normal_format.setBackground(QColor(0, 0, 0, 0))  # Прозрачный фон
-        self.normal_format.setForeground(QColor(255, 255, 255))  # Белый текст
+        # Звучащее слово - поверх выделения предложения
+        self.word_format = QTextCharFormat()
+        self.word_format.setBackground(QColor(255, 200, 0, 160))  # Полупрозрачный оранжевый
+        self.word_format.setForeground(QColor(0, 0, 0))
 
         # Инициализация объектов
         self.setup_voices()
@@ -160,35 +573,172 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.statusbar.showMessage(str(e), 10000)
             self.db = DatabaseManager()
 
-        # Загрузка категорий
-        self.load_categories()
+        self.autosave = AutosaveService(self.db,
+                                        on_saved=self.autosave_signals.saved.emit,
+                                        on_error=self.autosave_signals.error.emit)
+        self.load_lexicon()
 
         self.textBrowser.setAcceptRichText(False)
-        self.textBrowser.focusOutEvent = self.save_current_text
         self.current_text_id = None
+        self.current_text_title = None
+
+        # Загрузка категорий
+        self.load_categories()
 
-    def save_current_text(self, event):
-        """Сохранение текста при потере фокуса"""
+    def on_text_edited(self):
+        """
+        Правка текста: сохранение откладывается, пока идёт набор
+        """
         if self.current_text_id is None:
             return
+        now = time.monotonic()
+        if self.dirty_since is None:
+            self.dirty_since = now
+        waited_ms = (now - self.dirty_since) * 1000
+        self.autosave_timer.start(int(max(0, min(AUTOSAVE_DELAY_MS, AUTOSAVE_MAX_DELAY_MS - waited_ms))))
 
-        current_content = self.textBrowser.toPlainText()
+    def save_current_text(self):
+        """
+        Передача текущего текста на фоновое сохранение, если документ
+        изменился после загрузки или прошлого сохранения
+        """
+        self.autosave_timer.stop()
+        self.dirty_since = None
+        if self.current_text_id is None or self.autosave is None:
+            return
+        document = self.textBrowser.document()
+        if document.revision() == self.saved_revision:
+            return
         try:
-            # Получаем заголовок из списка
-            title = self.textsList.model().itemFromIndex(self.textsList.currentIndex()).text()
-            self.db.update_text(self.current_text_id, title, current_content)
-            self.statusbar.showMessage("Текст успешно сохранён", 3000)
+            self.autosave.submit(self.current_text_id, self.current_text_title, self.textBrowser.toPlainText())
+            self.saved_revision = document.revision()
         except Exception as e:
             self.statusbar.showMessage(f"Ошибка сохранения текста: {str(e)}", 5000)
 
-        # Вызываем оригинальный обработчик события
-        super(QTextEdit, self.textBrowser).focusOutEvent(event)
+    def set_current_text(self, text_id, title, pieces, state=(None, 0)):
+        """
+        Показ текста в редакторе; загруженная версия считается сохранённой.
+        pieces - содержимое по частям (DatabaseManager.iter_text_content):
+        большой текст вставляется в документ частями одной правкой, без
+        промежуточной строки со всем текстом. state - (индекс предложений,
+        место остановки) из DatabaseManager.get_text_state: с сохранённым
+        индексом текст не разбивается на предложения заново
+        """
+        self.current_text_id = text_id
+        self.current_text_title = title
+        document = self.textBrowser.document()
+        self.loading_text = True
+        try:
+            self.textBrowser.clear()
+            cursor = QTextCursor(document)
+            cursor.beginEditBlock()
+            count = 0
+            content = ""
+            for piece in pieces:
+                cursor.insertText(piece)
+                count += 1
+                content = piece
+            cursor.endEditBlock()
+        finally:
+            self.loading_text = False
+        document.clearUndoRedoStacks()
+        self.autosave_timer.stop()
+        self.dirty_since = None
+        self.saved_revision = document.revision()
+        # Текст из нескольких частей автосохранение целиком не запоминает
+        self.autosave.track(text_id, title, content if count <= 1 else None)
+
+        packed, position = state
+        length = document.characterCount() - 1
+        # Текст разбивается с размерами фрагментов для текущей скорости;
+        # индекс, сохранённый с другими, не загружается
+        self.sentence_index.chunk_sizes = self.current_chunk_sizes()
+        if packed is not None and self.sentence_index.load(packed, self.get_document_text, length):
+            self.index_revision = document.revision()
+        else:
+            self.sentence_index.reset(self.get_document_text(0, length))
+            self.index_revision = None
+            self.save_text_state(save_position=False)
+
+        # Продолжение с места, где чтение остановилось
+        self.resume_position = min(position, length)
+        cursor.setPosition(self.resume_position)
+        self.textBrowser.setTextCursor(cursor)
+        self.textBrowser.ensureCursorVisible()
+
+    def reading_position(self):
+        """Начало читаемого предложения или место остановки"""
+        if (self.is_playing or self.is_pause) and self.current_sentence_index < len(self.sentence_index):
+            return self.sentence_index.position(self.current_sentence_index)[0]
+        return self.resume_position
+
+    def save_text_state(self, save_position=True, save_index=True):
+        """
+        Фоновое сохранение места остановки и индекса предложений текущего
+        текста. Индекс сохраняется только для версии, переданной на
+        сохранение, и только если он изменился
+        """
+        if self.current_text_id is None or self.autosave is None:
+            return
+        try:
+            if save_position:
+                self.resume_position = self.reading_position()
+                self.db.save_position_async(self.current_text_id, self.resume_position)
+            revision = self.textBrowser.document().revision()
+            if (save_index and revision == self.saved_revision and revision != self.index_revision
+                    and self.sentence_index):
+                self.autosave.submit_index(self.current_text_id, self.sentence_index.pack())
+                self.index_revision = revision
+        except Exception as e:
+            self.statusbar.showMessage(f"Ошибка сохранения позиции чтения: {str(e)}", 5000)
+
+    def on_autosave_saved(self, count):
+        self.statusbar.showMessage("Текст успешно сохранён", 2000)
+
+    def on_autosave_error(self, message):
+        self.statusbar.showMessage(message, 5000)
+
+    def closeEvent(self, event):
+        """Запись несохранённых правок перед закрытием окна"""
+        self.save_current_text()
+        self.save_text_state()
+        if self.text_exporter is not None:
+            self.text_exporter.cancel()
+        if self.autosave is not None:
+            self.autosave.close()
+        if isinstance(self.engine, BufferedEngine):
+            self.engine.close()
+        # Поток записи выполняет оставшиеся записи
+        self.db.close()
+        super().closeEvent(event)
+
+    def on_contents_change(self, position, removed, added):
+        """
+        Обновление индекса предложений: переразбиваются только затронутые абзацы
+        """
+        if self.loading_text:
+            return
+        self.sentence_index.apply_change(position, removed, added, self.get_document_text)
+
+    def get_document_text(self, start, end):
+        """
+        Фрагмент текста документа без копирования всего текста
+        """
+        document = self.textBrowser.document()
+        end = min(end, document.characterCount() - 1)
+        cursor = QTextCursor(document)
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        # Qt возвращает разделитель абзацев U+2029 вместо перевода строки
+        return cursor.selectedText().replace('\u2029', '\n')
 
     def update_button_states(self):
         """
         Обновление состояния кнопок в зависимости от статуса воспроизведения
         """
-        has_text = bool(self.textBrowser.toPlainText().strip())
+        # Непустой индекс предложений - то же, что непробельный текст,
+        # но без копирования всего документа
+        has_text = bool(self.sentence_index)
         can_control = has_text and (self.is_playing or self.is_pause)
         
         # Кнопка остановки активна только при наличии текста и активном воспроизведении/паузе
@@ -207,21 +757,43 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
     def setup_voices(self):
         """
-        Получение голосов из SAPI и добавление их в список
+        Создание движка синтеза речи, получение голосов и добавление их в список
         """
         try:
-            self.speaker = win32com.client.Dispatch("SAPI.SpVoice")
-            voices = self.speaker.GetVoices()
+            # Движок можно выбрать переменной окружения TTS_ENGINE (sapi, espeak, fake)
+            engine_choice = os.environ.get("TTS_ENGINE")
+            # Вывод звука (TTS_OUTPUT): qt - через свой буфер и QtMultimedia
+            # (пауза без повторного синтеза), null - без звука, путь - в
+            # WAV-файл, engine - средствами движка
+            output = os.environ.get("TTS_OUTPUT", "qt" if QAudioSink is not None else "engine")
+            if output == "engine":
+                self.engine = create_engine(engine_choice)
+            else:
+                self.engine = BufferedEngine(lambda: create_engine(engine_choice), create_sink(output))
+            self.engine.on_start_stream = self.engine_signals.start_stream.emit
+            self.engine.on_end_stream = self.engine_signals.end_stream.emit
+            self.engine.on_word = self.engine_signals.word.emit
+            self.engine.on_sentence = self.engine_signals.sentence.emit
+            engine_name = self.engine.name
+            self.render_pool = RenderPool(lambda: create_engine(engine_name), self.render_cache)
+            self.spoken_sentences.ssml = self.engine.supports_ssml
+            self.sentence_queue = SentenceQueue(self.engine, self.spoken_sentences,
+                                                cache=self.render_cache, renderer=self.render_pool)
+            voices = self.engine.list_voices()
 
             self.voice_list.clear()
             self.VoicesList.clear()
 
-            for i in voices:
-                voice_name = i.GetDescription()
-                # Проверка на русские символы в имени голоса
-                if any(keyword in voice_name.lower() for keyword in ["рус", "russian", "rus"]):
-                    self.VoicesList.addItem(voice_name)
-                    self.voice_list.append(i)
+            for voice in voices:
+                # Проверка языка и русских символов в имени голоса
+                is_russian = voice.language.lower() in ("419", "ru") or any(
+                    keyword in voice.name.lower() for keyword in ["рус", "russian", "rus"])
+                if is_russian:
+                    self.VoicesList.addItem(voice.name)
+                    self.voice_list.append(voice)
+
+            if not self.voice_list:
+                self.VoicesList.addItem("Не найдено русских голосов")
 
         except Exception as e:
             print(f"Ошибка при получении голосов: {e}")
@@ -232,7 +804,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         Получение выбранного голоса из списка
         """
         ind = self.VoicesList.currentIndex()
-        if 0 <= ind <= len(self.voice_list):
+        if 0 <= ind < len(self.voice_list):
             return self.voice_list[ind]
         return None
 
@@ -275,65 +847,265 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.BtnNext.clicked.connect(self.next_phrase)
 
         self.newCat.clicked.connect(self.add_new_category)
+        self.textsList.clicked.connect(self.on_text_selected)
+
+        # События движка: переход к следующему предложению по окончании
+        # потока, выделение слов
+        self.engine_signals.end_stream.connect(self.on_engine_end_stream)
+        self.engine_signals.start_stream.connect(self.on_engine_start_stream)
+        self.engine_signals.word.connect(self.on_engine_word)
+        self.word_timer.timeout.connect(self.highlight_current_word)
         
         # Обработчик изменения текста
         self.textBrowser.textChanged.connect(self.update_button_states)
+        self.textBrowser.textChanged.connect(self.on_text_edited)
+        self.autosave_timer.timeout.connect(self.save_current_text)
+        self.autosave_signals.saved.connect(self.on_autosave_saved)
+        self.autosave_signals.error.connect(self.on_autosave_error)
+        self.textBrowser.document().contentsChange.connect(self.on_contents_change)
         
         # Подключение действий меню
         self.ActAbout.triggered.connect(self.show_about_dialog)
+        self.ActOpen.triggered.connect(self.import_folder)
         self.ActExport.triggered.connect(self.export_category_texts)
+        self.ActExportAudio.triggered.connect(self.export_category_audio)
+        self.ActSearch.triggered.connect(self.show_search_dialog)
+        self.ActHistory.triggered.connect(self.show_history_dialog)
+        self.ActPronunciation.triggered.connect(self.show_pronunciation_dialog)
+        self.export_signals.progress.connect(self.on_audio_export_progress)
+        self.export_signals.finished.connect(self.on_audio_export_finished)
+        self.text_export_signals.progress.connect(self.on_text_export_progress)
+        self.text_export_signals.finished.connect(self.on_text_export_finished)
+        self.import_signals.progress.connect(self.on_import_progress)
+        self.import_signals.finished.connect(self.on_import_finished)
 
     def export_category_texts(self):
-        """Экспорт всех текстов категории в файлы"""
+        """Экспорт всех текстов категории в файлы или архив в фоновом потоке"""
+        if self.text_exporter is not None:
+            QMessageBox.information(self, "Информация", "Экспорт текстов уже выполняется")
+            return
+        category_index = self.catList.currentIndex()
+        if category_index == -1:
+            QMessageBox.warning(self, "Ошибка", "Сначала выберете категорию!")
+            return
+        category_id = self.catList.itemData(category_index)
+        category_name = self.catList.currentText()
+
+        # Запрашиваем папку для сохранения
+        folder_path = QFileDialog.getExistingDirectory(
+            self,
+            "Выберите папку для экспорта",
+            "",
+            QFileDialog.Option.ShowDirsOnly
+        )
+        if not folder_path:
+            return
+
+        modes = ["Файлы TXT в папке", "Архив ZIP", "Архив TAR"]
+        mode, ok = QInputDialog.getItem(self, "Экспорт текстов", "Формат:", modes, 0, False)
+        if not ok:
+            return
+
         try:
-            category_index = self.catList.currentIndex()
-            if category_index == -1:
-                QMessageBox.warning(self, "Ошибка", "Сначала выберете категорию!")
-                return
-            category_id = self.catList.itemData(category_index)
+            count = self.db.count_texts(category_id)
+        except Exception as e:
+            self.statusbar.showMessage(f"Ошибка экспорта: {str(e)}", 5000)
+            return
+        if not count:
+            QMessageBox.information(self, "Информация", "В категории нет текстов для экспорта")
+            return
 
-            # Запрашиваем папку для сохранения
-            folder_path = QFileDialog.getExistingDirectory(
-                self,
-                "Выберите папку для экспорта",
-                "",
-                QFileDialog.Option.ShowDirsOnly
-            )
+        # Тексты читает и записывает поток экспорта, ход виден в строке состояния
+        self.text_exporter = TextExporter(self.db, TEXT_FORMATS[modes.index(mode)],
+                                          progress=self.text_export_signals.progress.emit)
+        thread = threading.Thread(
+            target=self.run_text_export,
+            args=(self.text_exporter, category_id, folder_path, safe_file_name(category_name)),
+            daemon=True
+        )
+        thread.start()
 
-            if not folder_path:
-                return
+    def run_text_export(self, exporter, category_id, folder_path, name):
+        """Экспорт текстов в фоновом потоке, итог передаётся в поток окна сигналом"""
+        try:
+            path = exporter.export(category_id, folder_path, name)
+            message = f"Экспортировано текстов: {exporter.written}, в {path}"
+        except ExportCancelled:
+            message = "Экспорт текстов отменён"
+        except Exception as e:
+            message = f"Ошибка экспорта: {str(e)}"
+        if exporter.failed:
+            message += f", с ошибками {len(exporter.failed)}"
+            for error in exporter.failed:
+                print(f"Ошибка сохранения {error}")
+        self.text_export_signals.finished.emit(message)
+
+    def on_text_export_progress(self, done, total, title):
+        """Ход экспорта текстов в строке состояния"""
+        self.statusbar.showMessage(f"Экспорт текстов: {done} из {total} ({title})")
+
+    def on_text_export_finished(self, message):
+        self.text_exporter = None
+        self.statusbar.showMessage(message, 10000)
+
+    def export_category_audio(self):
+        """Экспорт всех текстов категории в аудиофайлы в фоновом потоке"""
+        if self.audio_exporter is not None:
+            QMessageBox.information(self, "Информация", "Экспорт в аудио уже выполняется")
+            return
+        if self.engine is None:
+            QMessageBox.warning(self, "Ошибка", "Движок синтеза речи недоступен")
+            return
+        category_index = self.catList.currentIndex()
+        if category_index == -1:
+            QMessageBox.warning(self, "Ошибка", "Сначала выберете категорию!")
+            return
+        category_id = self.catList.itemData(category_index)
+        category_name = self.catList.currentText()
+
+        folder_path = QFileDialog.getExistingDirectory(
+            self,
+            "Выберите папку для экспорта",
+            "",
+            QFileDialog.Option.ShowDirsOnly
+        )
+        if not folder_path:
+            return
+
+        # Сначала файлы по текстам, затем те же форматы одним файлом с главами
+        modes = [name.upper() for name in FORMATS] + \
+                [f"Один файл {name.upper()} с главами" for name in FORMATS]
+        mode, ok = QInputDialog.getItem(self, "Экспорт в аудио", "Формат:", modes, 0, False)
+        if not ok:
+            return
+        mode_index = modes.index(mode)
+
+        try:
+            # Сами тексты читает поток экспорта своим соединением
+            count = self.db.count_texts(category_id)
+        except Exception as e:
+            self.statusbar.showMessage(f"Ошибка экспорта: {str(e)}", 5000)
+            return
+        if not count:
+            QMessageBox.information(self, "Информация", "В категории нет текстов для экспорта")
+            return
 
-            # Получаем все тексты категории
+        selected_voice = self.get_selected_voice()
+        engine_name = self.engine.name
+        self.audio_exporter = AudioExporter(
+            lambda: create_engine(engine_name),
+            self.render_cache,
+            workers=os.cpu_count() or 2,
+            audio_format=FORMATS[mode_index % len(FORMATS)],
+            voice_id=selected_voice.id if selected_voice else None,
+            speed=self.ValueSpeed.value() / 10,
+            progress=self.export_signals.progress.emit,
+            lexicon=self.spoken_sentences.lexicon
+        )
+        single_file = safe_file_name(category_name) if mode_index >= len(FORMATS) else None
+
+        self.export_progress = QProgressDialog("Экспорт в аудио...", "Отмена", 0, count, self)
+        self.export_progress.setWindowTitle("Экспорт в аудио")
+        self.export_progress.setMinimumDuration(0)
+        self.export_progress.setValue(0)
+        self.export_progress.canceled.connect(self.audio_exporter.cancel)
+
+        thread = threading.Thread(
+            target=self.run_audio_export,
+            args=(self.audio_exporter, category_id, os.path.join(folder_path, category_name), single_file),
+            daemon=True
+        )
+        thread.start()
+
+    def run_audio_export(self, exporter, category_id, folder_path, single_file):
+        """Экспорт в фоновом потоке, итог передаётся в поток окна сигналом"""
+        try:
             texts = self.db.get_texts_by_category(category_id)
-            if not texts:
-                QMessageBox.information(self, "Информация", "В категории нет текстов для экспорта")
-                return
+            exporter.export(texts, folder_path, single_file)
+            message = (f"Экспорт в аудио завершён: записано {len(exporter.written)}, "
+                       f"пропущено готовых {exporter.skipped}")
+            if exporter.failed:
+                message += f", с ошибками {len(exporter.failed)}"
+        except ExportCancelled:
+            message = "Экспорт в аудио отменён, повторный экспорт в ту же папку продолжит его"
+        except Exception as e:
+            message = f"Ошибка экспорта в аудио: {str(e)}"
+        self.export_signals.finished.emit(message)
+
+    def on_audio_export_progress(self, done, total, title):
+        """Обновление хода экспорта в аудио"""
+        if self.export_progress is not None:
+            self.export_progress.setMaximum(total)
+            self.export_progress.setValue(done)
+            self.export_progress.setLabelText(f"Готово: {title}")
+
+    def on_audio_export_finished(self, message):
+        """Завершение экспорта в аудио"""
+        if self.export_progress is not None:
+            self.export_progress.canceled.disconnect()
+            self.export_progress.close()
+            self.export_progress = None
+        self.audio_exporter = None
+        self.statusbar.showMessage(message, 10000)
+
+    def import_folder(self):
+        """
+        Импорт папки с текстами (txt, fb2, epub, html) в фоновом потоке:
+        каждая вложенная папка становится категорией
+        """
+        if self.importer is not None:
+            QMessageBox.information(self, "Информация", "Импорт уже выполняется")
+            return
+        folder_path = QFileDialog.getExistingDirectory(
+            self,
+            "Выберите папку с текстами",
+            "",
+            QFileDialog.Option.ShowDirsOnly
+        )
+        if not folder_path:
+            return
 
-            folder_path += '/' + self.catList.currentText()
-            if not os.path.isdir(folder_path):
-                os.mkdir(folder_path)
-
-            # Сохраняем каждый текст в отдельный файл
-            for text in texts:
-                text_id, _, title, content = text
-
-                # Формируем безопасное имя
-                safe_title = "".join(i if i.isalnum() else "_" for i in title).rstrip("_")
-                file_path = f"{folder_path}/{safe_title}.txt"
-
-                try:
-                    with open(file_path, "w", encoding="utf-8") as f:
-                        f.write(content)
-                except Exception as e:
-                    self.statusbar.showMessage(f"Ошибка сохранения {title}: {str(e)}", 5000)
-            self.statusbar.showMessage(f"Успешно экспортировано {self.catList.currentText()}", 5000)
-            QMessageBox.information(
-                self, "Экспорт завершен",
-                f"Успешно сохранено {self.catList.currentText()} из {len(texts)} текстов\n"
-                f"в папку: {folder_path}"
-            )
+        self.importer = BulkImporter(self.db, progress=self.import_signals.progress.emit)
+        self.import_progress = QProgressDialog("Импорт текстов...", "Отмена", 0, 0, self)
+        self.import_progress.setWindowTitle("Импорт")
+        self.import_progress.setMinimumDuration(0)
+        self.import_progress.canceled.connect(self.importer.cancel)
+
+        thread = threading.Thread(target=self.run_import, args=(self.importer, folder_path), daemon=True)
+        thread.start()
+
+    def run_import(self, importer, folder_path):
+        """Импорт в фоновом потоке, итог передаётся в поток окна сигналом"""
+        try:
+            importer.import_folder(folder_path)
+            message = f"Импорт завершён: добавлено {importer.imported}, повторов пропущено {importer.duplicates}"
+        except ImportCancelled:
+            message = (f"Импорт отменён: добавлено {importer.imported}, "
+                       f"повторный импорт пропустит уже добавленные тексты")
         except Exception as e:
-            self.statusbar.showMessage(self, f"Ошибка экспорта: {str(e)}", 5000)
+            message = f"Ошибка импорта: {str(e)}"
+        if importer.failed:
+            message += f", не прочитано файлов {len(importer.failed)}"
+            for error in importer.failed:
+                print(f"Ошибка импорта {error}")
+        self.import_signals.finished.emit(message)
+
+    def on_import_progress(self, done, total, path):
+        """Обновление хода импорта"""
+        if self.import_progress is not None:
+            self.import_progress.setMaximum(total)
+            self.import_progress.setValue(done)
+            self.import_progress.setLabelText(f"Прочитан: {os.path.basename(path)}")
+
+    def on_import_finished(self, message):
+        """Завершение импорта: новые категории и тексты появляются в списках"""
+        if self.import_progress is not None:
+            self.import_progress.canceled.disconnect()
+            self.import_progress.close()
+            self.import_progress = None
+        self.importer = None
+        self.load_categories()
+        self.statusbar.showMessage(message, 10000)
 
     def update_speed_label(self):
         """
@@ -342,43 +1114,35 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         speed_value = self.ValueSpeed.value() / 10
         self.PrintValueSpeed.setText(f"{speed_value:.1f}")
 
-        if self.speaker:
+        if self.engine:
             try:
-                self.speaker.Rate = int((speed_value - 1) * 10)
+                self.engine.set_rate(speed_value)
             except Exception as e:
                 print(f"Ошибка: {e}")
 
+    def current_chunk_sizes(self):
+        return chunk_sizes(self.ValueSpeed.value() / 10)
+
+    def apply_chunk_sizes(self):
+        """
+        Переразбиение документа на фрагменты для текущей скорости перед
+        началом чтения. Во время чтения и паузы размеры не меняются, чтобы
+        не сдвигалась нумерация фрагментов в очереди движка
+        """
+        if self.is_playing or self.is_pause:
+            return
+        sizes = self.current_chunk_sizes()
+        if sizes != self.sentence_index.chunk_sizes:
+            length = self.textBrowser.document().characterCount() - 1
+            self.sentence_index.set_chunk_sizes(sizes, self.get_document_text(0, length))
+            # Новый индекс сохраняется вместе с позицией
+            self.index_revision = None
+
     def split_text_into_sentences(self, text):
         """
         Разбиение текста на предложения с отслеживанием позиций
         """
-        sentences = []
-        positions = []
-        current_sentence = ""
-        current_start = 0
-        
-        for i, char in enumerate(text):
-            current_sentence += char
-            if char in '.!?\n:;':
-                sentences.append(current_sentence.strip())
-                positions.append((current_start, i + 1))
-                current_sentence = ""
-                current_start = i + 1
-        
-        # Добавляем оставшийся текст, если он есть
-        if current_sentence.strip():
-            sentences.append(current_sentence.strip())
-            positions.append((current_start, len(text)))
-        
-        # Убираем пустые строки
-        filtered_sentences = []
-        filtered_positions = []
-        for sentence, pos in zip(sentences, positions):
-            if sentence:
-                filtered_sentences.append(sentence)
-                filtered_positions.append(pos)
-        
-        return filtered_sentences, filtered_positions
+        return split_text_into_sentences(text)
 
     def highlight_current_sentence(self):
         """
@@ -386,33 +1150,85 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         """
         if not self.sentences or self.current_sentence_index >= len(self.sentence_positions):
             return
-            
-        # Сначала убираем все выделения
-        self.clear_highlights()
-        
-        # Выделяем текущее предложение
+
         start_pos, end_pos = self.sentence_positions[self.current_sentence_index]
-        
-        cursor = self.textBrowser.textCursor()
-        cursor.setPosition(start_pos)
-        cursor.setPosition(end_pos, QTextCursor.MoveMode.KeepAnchor)
-        
-        # Применяем формат выделения
-        cursor.mergeCharFormat(self.highlight_format)
-        
+        document = self.textBrowser.document()
+        self.set_highlight(start_pos, end_pos)
+
         # Прокручиваем к выделенному тексту
-        self.textBrowser.setTextCursor(cursor)
+        view_cursor = QTextCursor(document)
+        view_cursor.setPosition(start_pos)
+        self.textBrowser.setTextCursor(view_cursor)
         self.textBrowser.ensureCursorVisible()
 
+    def set_highlight(self, start_pos, end_pos, word=None):
+        """
+        Выделение предложения [start_pos, end_pos) и звучащего слова word
+        (начало, конец) без прокрутки
+        """
+        spans = [(start_pos, end_pos, self.highlight_format)]
+        if word is not None:
+            spans.append((word[0], word[1], self.word_format))
+        selections = []
+        for start, end, text_format in spans:
+            cursor = QTextCursor(self.textBrowser.document())
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = cursor
+            selection.format = text_format
+            selections.append(selection)
+        # Заменяем выделение: Qt перерисует только прежний и новый диапазоны
+        self.textBrowser.setExtraSelections(selections)
+
+    def frame_interval(self):
+        """Период обновления экрана в миллисекундах (для таймера выделения слов)"""
+        screen = QGuiApplication.primaryScreen()
+        refresh_rate = screen.refreshRate() if screen is not None else 0
+        return max(1, round(1000 / refresh_rate)) if refresh_rate > 0 else 16
+
+    def on_engine_start_stream(self, stream_number):
+        """
+        Начало потока движка: таблица смещений звучащего предложения для
+        перевода событий слов в позиции документа
+        """
+        index = self.sentence_queue.index_of(stream_number)
+        if not self.is_playing or index is None or index >= len(self.sentence_positions):
+            return
+        try:
+            start_pos, end_pos = self.sentence_positions[index]
+            # Предложение в индексе - без пробелов по краям
+            text = self.get_document_text(start_pos, end_pos)
+            base = start_pos + len(text) - len(text.lstrip())
+            self.word_tracker.start(index, base, self.sentence_queue.audio_duration(stream_number))
+        except Exception as e:
+            self.word_tracker.reset()
+            print(f"Ошибка выделения слов: {e}")
+
+    def on_engine_word(self, stream_number, char_position, length):
+        """Событие слова движка: только запоминается до следующего кадра"""
+        self.word_tracker.word(self.sentence_queue.index_of(stream_number), char_position, length)
+
+    def highlight_current_word(self):
+        """
+        Перерисовка выделения звучащего слова (по таймеру word_timer), если
+        слово сменилось
+        """
+        word = self.word_tracker.take()
+        if word is None or not self.is_playing or self.current_sentence_index >= len(self.sentence_positions):
+            return
+        start_pos, end_pos = self.sentence_positions[self.current_sentence_index]
+        if start_pos <= word[0] and word[1] <= end_pos:
+            self.set_highlight(start_pos, end_pos, word)
+
     def clear_highlights(self):
         """
-        Убирает все выделения из текста
+        Убирает выделение из текста
         """
-        cursor = self.textBrowser.textCursor()
-        cursor.select(QTextCursor.SelectionType.Document)
-        cursor.mergeCharFormat(self.normal_format)
-        
+        self.textBrowser.setExtraSelections([])
+
         # Возвращаем курсор в начало
+        cursor = self.textBrowser.textCursor()
         cursor.setPosition(0)
         self.textBrowser.setTextCursor(cursor)
 
@@ -420,12 +1236,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         """
         Переключение воспроизведения/паузы
         """
-        if not self.speaker:
-            print("SAPI не инициализирован")
+        if not self.engine:
+            print("Движок синтеза речи не инициализирован")
             return
         try:
             if not self.is_playing and not self.is_pause:
-                self.start_playback()
+                self.apply_chunk_sizes()
+                self.start_playback(self.sentence_index.find(self.resume_position))
             elif self.is_playing:
                 self.pause_playback()
             elif self.is_pause:
@@ -433,44 +1250,34 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         except Exception as e:
             print(f"Ошибка при воспроизведении: {e}")
 
-    def start_playback(self):
+    def start_playback(self, start_index=0):
         """
-        Воспроизведение текста
+        Воспроизведение текста с предложения start_index
         """
         try:
-            text = self.textBrowser.toPlainText().strip()
-
-            if not text:
-                print("Нет текста для воспроизведения")
-                return
-
             selected_voice = self.get_selected_voice()
             if not selected_voice:
                 print("Голос не выбран")
                 return
 
-            # Разбиваем текст на предложения с позициями
-            self.sentences, self.sentence_positions = self.split_text_into_sentences(text)
-            self.current_sentence_index = 0
-            self.current_text = text
+            # Предложения берём из индекса, который уже актуален после правок
+            self.sentences = self.sentence_index.sentences
+            self.sentence_positions = self.sentence_index.positions
 
             if not self.sentences:
-                print("Нет предложений для воспроизведения")
+                print("Нет текста для воспроизведения")
                 return
+            self.current_sentence_index = min(start_index, len(self.sentences) - 1)
 
-            self.speaker.Voice = selected_voice
-            speed_value = self.ValueSpeed.value() / 10
-            self.speaker.Rate = int((speed_value - 1) * 10)
+            self.engine.set_voice(selected_voice.id)
+            self.engine.set_rate(self.ValueSpeed.value() / 10)
 
-            # Начинаем воспроизведение с первого предложения
+            # Начинаем воспроизведение с выбранного предложения
             self.play_current_sentence()
 
             self.is_playing = True
             self.BtnPausePlay.setText("⏸️")
-            
-            # Запускаем таймер для отслеживания статуса воспроизведения
-            self.playback_timer.start(100)  # Проверяем каждые 100мс
-            
+
             # Обновляем состояние кнопок
             self.update_button_states()
 
@@ -482,45 +1289,62 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         Воспроизведение текущего предложения
         """
         if 0 <= self.current_sentence_index < len(self.sentences):
-            sentence = self.sentences[self.current_sentence_index]
-            self.speaker.Speak(sentence, 1)
+            # Ставим в движок текущее предложение и несколько следующих
+            self.word_tracker.reset()
+            self.sentence_queue.start(self.current_sentence_index)
+            self.word_timer.start()
             # Выделяем текущее предложение
             self.highlight_current_sentence()
 
-    def check_playback_status(self):
+    def stop_speaking(self):
         """
-        Проверка статуса воспроизведения и переход к следующему предложению
+        Прерывание воспроизведения и сброс очереди предложений движка
         """
-        if self.is_playing and not self.is_pause:
-            try:
-                # Проверяем, завершилось ли воспроизведение текущего предложения
-                status = self.speaker.Status
-                if hasattr(status, 'RunningState') and status.RunningState == 1:  # 1 = не воспроизводится
-                    # Переходим к следующему предложению
-                    self.current_sentence_index += 1
-                    
-                    if self.current_sentence_index < len(self.sentences):
-                        # Воспроизводим следующее предложение
-                        self.play_current_sentence()
-                    else:
-                        # Воспроизведение завершено
-                        self.stop_playback()
-                        
-            except Exception as e:
-                print(f"Ошибка при проверке статуса: {e}")
+        self.word_timer.stop()
+        self.sentence_queue.purge()
+        self.word_tracker.reset()
+        if self.is_pause:
+            # Очередь пуста: снимаем паузу движка для следующего чтения
+            self.engine.resume()
+
+    def on_engine_end_stream(self, stream_number):
+        """
+        Окончание потока движка: следующее предложение уже стоит в очереди,
+        переносим на него выделение
+        """
+        if not self.is_playing or not self.sentence_queue.finish(stream_number):
+            return
+        try:
+            index = self.sentence_queue.current_index
+            if index is not None:
+                self.current_sentence_index = index
+                self.highlight_current_sentence()
+                self.update_button_states()
+                self.save_text_state(save_index=False)
+            else:
+                # Воспроизведение завершено
+                self.stop_playback()
+
+        except Exception as e:
+            print(f"Ошибка при переходе к следующему предложению: {e}")
 
     def pause_playback(self):
         """
         Пауза при воспроизведении
         """
         try:
-            if self.speaker and self.is_playing:
-                self.speaker.Speak("", 3)  # Останавливаем текущее воспроизведение
+            if self.engine and self.is_playing:
+                # Движок останавливается на текущем звуке, очередь
+                # предложений сохраняется
+                self.engine.pause()
+                self.word_timer.stop()
+                self.word_tracker.pause()
                 self.is_playing = False
                 self.is_pause = True
                 self.BtnPausePlay.setText("▶️")
                 # Обновляем состояние кнопок
                 self.update_button_states()
+                self.save_text_state(save_index=False)
         except Exception as e:
             print(f"Ошибка паузы: {e}")
 
@@ -529,8 +1353,16 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         Возобновление воспроизведения с того места, где остановились
         """
         try:
-            if self.speaker and self.is_pause:
-                if self.current_sentence_index < len(self.sentences):
+            if self.engine and self.is_pause:
+                if self.sentence_queue.current_index is not None:
+                    # Продолжаем с места паузы без повторного синтеза
+                    self.engine.resume()
+                    self.word_tracker.resume()
+                    self.word_timer.start()
+                    self.is_playing = True
+                    self.is_pause = False
+                    self.BtnPausePlay.setText("⏸️")
+                elif self.current_sentence_index < len(self.sentences):
                     # Возобновляем с текущего предложения
                     self.play_current_sentence()
                     self.is_playing = True
@@ -548,18 +1380,22 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         except Exception as e:
             print(f"Ошибка возобновления воспроизведения: {e}")
 
-    def stop_playback(self):
+    def stop_playback(self, rewind=True):
         """
-        Остановка воспроизведения
+        Остановка воспроизведения. rewind=False - место остановки
+        запоминается (переключение на другой текст), иначе следующее чтение
+        начнётся с начала текста
         """
         try:
-            if self.speaker:
-                self.speaker.Speak("", 3)
+            if self.engine:
+                position = self.reading_position()
+                self.stop_speaking()
                 self.is_playing = False
                 self.is_pause = False
                 self.current_sentence_index = 0
                 self.BtnPausePlay.setText("⏯️")
-                self.playback_timer.stop()
+                self.resume_position = 0 if rewind else position
+                self.save_text_state(save_index=False)
                 # Убираем выделение
                 self.clear_highlights()
                 # Обновляем состояние кнопок
@@ -575,8 +1411,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             return
             
         # Останавливаем текущее воспроизведение
-        if self.speaker and self.is_playing:
-            self.speaker.Speak("", 3)
+        if self.engine and (self.is_playing or self.is_pause):
+            self.stop_speaking()
         
         # Переходим к предыдущему предложению
         self.current_sentence_index -= 1
@@ -603,8 +1439,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             return
             
         # Останавливаем текущее воспроизведение
-        if self.speaker and self.is_playing:
-            self.speaker.Speak("", 3)
+        if self.engine and (self.is_playing or self.is_pause):
+            self.stop_speaking()
         
         # Переходим к следующему предложению
         self.current_sentence_index += 1
@@ -623,6 +1459,104 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         # Обновляем состояние кнопок
         self.update_button_states()
 
+    def show_search_dialog(self):
+        """
+        Показывает окно поиска по текстам
+        """
+        if self.search_dialog is None:
+            self.search_dialog = SearchDialog(self.db, self)
+            self.search_dialog.result_chosen.connect(self.open_search_result)
+        self.search_dialog.show()
+        self.search_dialog.raise_()
+        self.search_dialog.activateWindow()
+
+    def open_search_result(self, text_id, category_id, position):
+        """
+        Открытие найденного текста и воспроизведение с предложения,
+        в котором найдено совпадение
+        """
+        try:
+            if self.is_playing or self.is_pause:
+                self.stop_playback()
+
+            category_index = self.catList.findData(category_id)
+            if category_index == -1:
+                return
+            if category_index != self.catList.currentIndex():
+                self.catList.setCurrentIndex(category_index)
+
+            model = self.textsList.model()
+            row = model.row_of(text_id)
+            if row == -1:
+                self.statusbar.showMessage("Текст не найден в категории", 5000)
+                return
+            index = model.index(row, 0)
+            self.textsList.setCurrentIndex(index)
+            if self.current_text_id != text_id:
+                self.on_text_selected(index)
+
+            # Перемещаемся к найденному месту и читаем с его предложения
+            cursor = QTextCursor(self.textBrowser.document())
+            cursor.setPosition(min(position, self.textBrowser.document().characterCount() - 1))
+            self.textBrowser.setTextCursor(cursor)
+            self.textBrowser.ensureCursorVisible()
+            self.apply_chunk_sizes()
+            self.start_playback(self.sentence_index.find(position))
+        except Exception as e:
+            self.statusbar.showMessage(f"Ошибка открытия найденного текста: {str(e)}", 5000)
+
+    def show_history_dialog(self):
+        """
+        Показывает историю версий текущего текста
+        """
+        if self.current_text_id is None:
+            QMessageBox.information(self, "Информация", "Сначала выберите текст")
+            return
+        # В истории должна быть и последняя правка
+        self.save_current_text()
+        self.autosave.flush()
+        dialog = HistoryDialog(self.db, self.current_text_id, self)
+        dialog.revision_chosen.connect(self.restore_revision)
+        dialog.exec()
+
+    def restore_revision(self, revision_id):
+        """Возврат текущего текста к версии из истории"""
+        try:
+            self.save_text_state()
+            if self.is_playing or self.is_pause:
+                self.stop_playback(rewind=False)
+            self.autosave.flush()
+            text_id = self.db.restore_revision(revision_id)
+            title = self.db.get_revisions(text_id)[0][1]
+            self.set_current_text(text_id, title, self.db.iter_text_content(text_id),
+                                  self.db.get_text_state(text_id))
+            # Заголовок мог измениться
+            category_id = self.catList.itemData(self.catList.currentIndex())
+            self.load_texts_for_category(category_id)
+            model = self.textsList.model()
+            self.textsList.setCurrentIndex(model.index(model.row_of(text_id), 0))
+            self.statusbar.showMessage("Версия текста восстановлена", 5000)
+        except Exception as e:
+            self.statusbar.showMessage(f"Ошибка восстановления версии: {str(e)}", 5000)
+
+    def load_lexicon(self):
+        """Словарь произношений из включённых словарей базы"""
+        try:
+            self.spoken_sentences.lexicon = load_lexicon(self.db)
+        except Exception as e:
+            self.spoken_sentences.lexicon = None
+            print(f"Ошибка загрузки словаря произношений: {str(e)}")
+
+    def show_pronunciation_dialog(self):
+        """
+        Показывает словари произношений; после изменений словарь
+        пересобирается, новые произношения действуют со следующих предложений
+        """
+        dialog = PronunciationDialog(self.db, self)
+        dialog.exec()
+        if dialog.modified:
+            self.load_lexicon()
+
     def show_about_dialog(self):
         """
         Показывает диалог "О программе"
@@ -649,26 +1583,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def load_texts_for_category(self, category_id):
         """Загрузка текстов для выбранной категории"""
         try:
-            texts = self.db.get_texts_by_category(category_id)
-            model = QStandardItemModel()
-            # Добавляем существующие тексты
-            for text_id, _, title, _ in texts:
-                item = QStandardItem(title)
-                item.setData(text_id, Qt.ItemDataRole.UserRole)
-                item.setEditable(False)
-                model.appendRow(item)
-            
-            # Добавляем специальный элемент для создания нового текста
-            new_item = QStandardItem("🖊️ Новый текст")
-            new_item.setData(-1, Qt.ItemDataRole.UserRole)
-            new_item.setForeground(QColor(0, 255, 255))  # Голубой цвет
-            model.appendRow(new_item)
-
+            # Модель читает из базы только заголовки и подгружает их по страницам,
+            # последний пункт - создание нового текста
+            model = TextListModel(self.db, category_id, parent=self.textsList)
+            model.fetchMore()
             self.textsList.setModel(model)
             self.textsList.setSizeAdjustPolicy(QtWidgets.QAbstractScrollArea.SizeAdjustPolicy.AdjustToContents)
             self.textsList.scheduleDelayedItemsLayout()
-
-            self.textsList.clicked.connect(self.on_text_selected)
         except Exception as e:
             self.statusbar.showMessage(f"Ошибка загрузки текстов: {str(e)}", 5000)
 
@@ -677,8 +1598,15 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         try:
             model = self.textsList.model()
             text_id = model.data(index, Qt.ItemDataRole.UserRole)
-
-            if text_id == -1:
+            # Правки предыдущего текста уходят на сохранение до переключения
+            self.save_current_text()
+            self.save_text_state()
+            if self.is_playing or self.is_pause:
+                # Очередь движка и выделение ссылаются на индекс предложений,
+                # который сейчас перейдёт к другому тексту
+                self.stop_playback(rewind=False)
+
+            if text_id == NEW_TEXT_ID:
                 text, ok = QInputDialog.getText(
                     self,
                     "Новый текст",
@@ -694,25 +1622,35 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
                         # Создаём новый текст в БД
                         new_id = self.db.save_text(category_id, text, "")
-                        self.current_text_id = new_id
+                        self.set_current_text(new_id, text, [])
                         # Обновляем список текстов
                         self.load_texts_for_category(category_id)
                         # Выбираем новый текст в списке
-                        self.textsList.setCurrentIndex(model.index(model.rowCount() - 2, 0))
+                        model = self.textsList.model()
+                        self.textsList.setCurrentIndex(model.index(model.row_of(new_id), 0))
                         self.textBrowser.setFocus()
                     except Exception as e:
                         self.statusbar.showMessage(f"Ошибка создания текста: {str(e)}", 5000)
                 return
 
-            text_content = self.db.get_text_content(text_id)[0]
-            self.current_text_id = text_id
-            self.textBrowser.setPlainText(text_content)
+            title = model.data(index)
+            # Версия, ещё не записанная фоновым сохранением, новее версии в базе
+            pending = self.autosave.latest(text_id)
+            packed, position = self.db.get_text_state(text_id)
+            if pending is not None:
+                # Сохранённый индекс построен для версии из базы
+                title, text_content = pending
+                self.set_current_text(text_id, title, [text_content], (None, position))
+            else:
+                self.set_current_text(text_id, title, self.db.iter_text_content(text_id), (packed, position))
             self.textBrowser.setFocus()
         except Exception as e:
             self.statusbar.showMessage(f"Ошибка загрузки текста: {str(e)}", 5000)
 
 
 if __name__ == "__main__":
+    # Процессы импорта в собранном exe запускают тот же файл
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
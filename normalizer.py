@@ -0,0 +1,607 @@
+import re
+from bisect import bisect_right
+from functools import lru_cache
+
+
+# Версия правил: входит в отпечатки экспорта в аудио, чтобы после смены
+# правил файлы синтезировались заново
+NORMALIZER_VERSION = 3
+
+_UNITS = ["ноль", "один", "два", "три", "четыре", "пять", "шесть", "семь", "восемь", "девять"]
+_UNITS_FEMININE = {1: "одна", 2: "две"}
+_UNITS_NEUTER = {1: "одно"}
+_UNITS_ACCUSATIVE = {1: "одну", 2: "две"}
+_TEENS = ["десять", "одиннадцать", "двенадцать", "тринадцать", "четырнадцать", "пятнадцать",
+          "шестнадцать", "семнадцать", "восемнадцать", "девятнадцать"]
+_TENS = ["", "", "двадцать", "тридцать", "сорок", "пятьдесят", "шестьдесят", "семьдесят", "восемьдесят",
+         "девяносто"]
+_HUNDREDS = ["", "сто", "двести", "триста", "четыреста", "пятьсот", "шестьсот", "семьсот", "восемьсот",
+             "девятьсот"]
+# Разряды: формы для 1, 2-4 и 5-0 и род
+_SCALES = [
+    (10 ** 9, ("миллиард", "миллиарда", "миллиардов"), "m"),
+    (10 ** 6, ("миллион", "миллиона", "миллионов"), "m"),
+    (10 ** 3, ("тысяча", "тысячи", "тысяч"), "f"),
+]
+
+# Родительный падеж числительных для сложных порядковых ("двухтысячный")
+_UNITS_GENITIVE = ["", "одно", "двух", "трёх", "четырёх", "пяти", "шести", "семи", "восьми", "девяти"]
+_TENS_GENITIVE = ["", "", "двадцати", "тридцати", "сорока", "пятидесяти", "шестидесяти", "семидесяти",
+                  "восьмидесяти", "девяноста"]
+_HUNDREDS_GENITIVE = ["", "сто", "двухсот", "трёхсот", "четырёхсот", "пятисот", "шестисот", "семисот",
+                      "восьмисот", "девятисот"]
+# Окончания после дефиса, которые бывают у количественных в родительном
+# падеже: "2-х" - "двух", "5-ти" - "пяти", "7-ми" - "семи"
+_CARDINAL_SUFFIXES = ("х", "ти", "ми")
+
+# Порядковые: основа и тип окончания
+_UNITS_ORDINAL = [("нулев", "ой"), ("перв", "ый"), ("втор", "ой"), ("трет", "ий"), ("четвёрт", "ый"),
+                  ("пят", "ый"), ("шест", "ой"), ("седьм", "ой"), ("восьм", "ой"), ("девят", "ый")]
+_TEENS_ORDINAL = [(word[:-1], "ый") for word in _TEENS]
+_TENS_ORDINAL = [None, None, ("двадцат", "ый"), ("тридцат", "ый"), ("сороков", "ой"), ("пятидесят", "ый"),
+                 ("шестидесят", "ый"), ("семидесят", "ый"), ("восьмидесят", "ой"), ("девяност", "ый")]
+_HUNDREDS_ORDINAL = [None, ("сот", "ый")] + [(word, "ый") for word in _HUNDREDS_GENITIVE[2:]]
+_SCALES_ORDINAL = {10 ** 9: "миллиардн", 10 ** 6: "миллионн", 10 ** 3: "тысячн"}
+
+# Окончания порядковых по падежам: nom - мужской род, nom_f, nom_n,
+# gen - родительный, dat - дательный, prep - предложный, gen_pl -
+# родительный множественного
+_ORDINAL_ENDINGS = {
+    "ый": {"nom": "ый", "nom_f": "ая", "nom_n": "ое", "gen": "ого", "dat": "ому", "prep": "ом", "gen_pl": "ых"},
+    "ой": {"nom": "ой", "nom_f": "ая", "nom_n": "ое", "gen": "ого", "dat": "ому", "prep": "ом", "gen_pl": "ых"},
+    "ий": {"nom": "ий", "nom_f": "ья", "nom_n": "ье", "gen": "ьего", "dat": "ьему", "prep": "ьем",
+           "gen_pl": "ьих"},
+}
+# Падеж порядкового по окончанию после дефиса: "1-й", "2-го", "90-х"
+_SUFFIX_CASES = {
+    "й": "nom", "ый": "nom", "ий": "nom", "ой": "nom", "я": "nom_f", "ая": "nom_f", "е": "nom_n", "ое": "nom_n",
+    "го": "gen", "ого": "gen", "му": "dat", "ому": "dat", "м": "prep", "ом": "prep", "х": "gen_pl", "ых": "gen_pl",
+}
+# Падеж даты и года по предлогу перед ней; без предлога - именительный
+_PREPOSITION_CASES = {
+    "в": "prep", "во": "prep", "о": "prep", "об": "prep",
+    "до": "gen", "с": "gen", "со": "gen", "от": "gen", "после": "gen", "около": "gen", "из": "gen",
+    "к": "dat", "ко": "dat", "по": "dat",
+}
+_YEAR_WORDS = {"nom": "год", "gen": "года", "dat": "году", "prep": "году"}
+# Диапазон лет "1990-1995 гг.": оба конца в одном падеже, "годов" без предлога
+_YEARS_WORDS = {"nom": "годов", "gen": "годов", "dat": "годам", "prep": "годах"}
+# Слова, перед которыми число - порядковое ("в 21 веке", "5 числа"), и их падеж
+_ORDINAL_NOUNS = {"век": "nom", "века": "gen", "веку": "dat", "веке": "prep", "году": "prep", "числа": "gen"}
+_YEAR_WORD_CASES = {"год": "nom", "года": "gen", "году": "prep", "годом": "prep"}
+
+_MONTHS = ["января", "февраля", "марта", "апреля", "мая", "июня", "июля", "августа", "сентября", "октября",
+           "ноября", "декабря"]
+_MONTHS_RE = "|".join(_MONTHS)
+_FRACTIONS = {1: ("десятая", "десятых"), 2: ("сотая", "сотых"), 3: ("тысячная", "тысячных")}
+
+# Единицы после числа: формы для 1, 2-4, 5-0 и род
+_UNIT_FORMS = {
+    "%": ("процент", "процента", "процентов", "m"),
+    "км/ч": ("километр в час", "километра в час", "километров в час", "m"),
+    "м/с": ("метр в секунду", "метра в секунду", "метров в секунду", "m"),
+    "км": ("километр", "километра", "километров", "m"),
+    "м": ("метр", "метра", "метров", "m"),
+    "см": ("сантиметр", "сантиметра", "сантиметров", "m"),
+    "мм": ("миллиметр", "миллиметра", "миллиметров", "m"),
+    "кг": ("килограмм", "килограмма", "килограммов", "m"),
+    "г": ("грамм", "грамма", "граммов", "m"),
+    "мг": ("миллиграмм", "миллиграмма", "миллиграммов", "m"),
+    "т": ("тонна", "тонны", "тонн", "f"),
+    "л": ("литр", "литра", "литров", "m"),
+    "мл": ("миллилитр", "миллилитра", "миллилитров", "m"),
+    "ч": ("час", "часа", "часов", "m"),
+    "мин": ("минута", "минуты", "минут", "f"),
+    "сек": ("секунда", "секунды", "секунд", "f"),
+    "°C": ("градус Цельсия", "градуса Цельсия", "градусов Цельсия", "m"),
+    "°": ("градус", "градуса", "градусов", "m"),
+    "руб.": ("рубль", "рубля", "рублей", "m"),
+    "руб": ("рубль", "рубля", "рублей", "m"),
+    "₽": ("рубль", "рубля", "рублей", "m"),
+    "коп.": ("копейка", "копейки", "копеек", "f"),
+    "$": ("доллар", "доллара", "долларов", "m"),
+    "€": ("евро", "евро", "евро", "n"),
+    "тыс.": ("тысяча", "тысячи", "тысяч", "f"),
+    "млн": ("миллион", "миллиона", "миллионов", "m"),
+    "млрд": ("миллиард", "миллиарда", "миллиардов", "m"),
+}
+_CURRENCIES = "$€₽"
+
+# Сокращения: полная форма по сокращению без пробелов
+_ABBREVIATIONS = {
+    "т.е.": "то есть",
+    "т.д.": "так далее",
+    "т.п.": "тому подобное",
+    "т.к.": "так как",
+    "н.э.": "нашей эры",
+    "и.о.": "исполняющий обязанности",
+    "см.": "смотри",
+    "стр.": "страница",
+    "рис.": "рисунок",
+    "др.": "другие",
+    "пр.": "прочее",
+    "напр.": "например",
+    "ул.": "улица",
+    "им.": "имени",
+    "г.": "город",
+    "д.": "дом",
+}
+_SYMBOLS = {"№": "номер", "§": "параграф"}
+
+
+def _alternatives(words):
+    # Длинные варианты первыми, иначе "м" перехватит "мм"
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+_NUMBER = r"\d{1,3}(?:[  ]\d{3})+(?!\d)|\d+"
+# Все правила одним выражением. Выражение применяется только там, где
+# может начинаться правило (_TRIGGER_RE): поиск одного класса символов
+# намного быстрее поиска по выражению, ветви которого начинаются с
+# проверок соседних символов
+_RULES_RE = re.compile(rf"""
+    (?P<date>(?<!\d)\d{{1,2}}\.\d{{1,2}}\.(?:\d{{4}}|\d{{2}})(?![\d.]\d))
+  | (?P<time>(?<![\d:])(?:[01]?\d|2[0-3]):[0-5]\d(?![\d:]))
+  | (?P<years>(?<!\d)\d{{3,4}}\s?[-–—]\s?\d{{3,4}}\s?(?:гг\.|год(?:ов|ах|ам)(?!\w)))
+  | (?P<year>(?<!\d)(?:\d{{4}}\s?гг?\.|\d{{3,4}}\s(?:год(?:у|а|ом)?)(?!\w)))
+  | (?P<counted>(?<!\d)\d{{1,4}}\s(?:{_alternatives(_ORDINAL_NOUNS)})(?!\w))
+  | (?P<day>(?<![\d.])\d{{1,2}}(?=(?:\s(?:по|до|и|или)\s\d{{1,2}}|\s?[-–—]\s?\d{{1,2}})?\s(?:{_MONTHS_RE})(?!\w)))
+  | (?P<dotted>(?<![\d.])\d+(?:\.\d+){{2,}}(?!\.?\d))
+  | (?P<ordinal>(?<!\d)\d+-(?:[а-я]{{1,3}})(?!\w))
+  | (?P<compound>(?<!\d)\d{{1,3}}-(?=[а-я]{{4,}}))
+  | (?P<money>[{_CURRENCIES}]\s?(?:{_NUMBER})(?:[.,]\d+)?)
+  | (?P<number>(?:(?<!\S)[-−](?=\d))?(?:{_NUMBER})(?:[.,]\d+(?![.,]?\d))?(?:\s?(?:{_alternatives(_UNIT_FORMS)})(?![\w/]))?)
+  | (?P<abbr>(?<!\w)(?:(?i:[тни]\.\s?[едпкэо]\.|(?:см|стр|рис|др|пр|напр|ул|им)\.)|г\.(?=\s?[А-ЯЁ])|д\.(?=\s?\d)))
+  | (?P<symbol>[№§])
+""", re.VERBOSE)
+
+_TRIGGER_RE = re.compile(rf"[\d{_CURRENCIES}№§\-−.]")
+# Начало сокращения перед точкой
+_ABBREVIATION_START_RE = re.compile(r"(?<!\w)(?i:[тни]|см|стр|рис|др|пр|напр|ул|им|г|д)\Z")
+# Последние буквы начал сокращений: точка после другой буквы (обычно конец
+# предложения) не проверяется выражением
+_ABBREVIATION_LAST = frozenset("тнимрслгдТНИМРСЛГД")
+_NUMBER_RE = re.compile(rf"([-−])?({_NUMBER})(?:[.,](\d+))?\s?(.*)", re.DOTALL)
+_PREVIOUS_WORD_RE = re.compile(r"(\w+)\W*$")
+_NEXT_WORD_RE = re.compile(r"\s+\w*?(\w)\b")
+
+
+def _plural(number, forms):
+    """Форма слова для числа: forms - (1, 2-4, 5-0)"""
+    if 11 <= number % 100 <= 14:
+        return forms[2]
+    if number % 10 == 1:
+        return forms[0]
+    if 2 <= number % 10 <= 4:
+        return forms[1]
+    return forms[2]
+
+
+def _triple(number, gender):
+    words = []
+    hundreds, rest = divmod(number, 100)
+    if hundreds:
+        words.append(_HUNDREDS[hundreds])
+    if 10 <= rest < 20:
+        words.append(_TEENS[rest - 10])
+    else:
+        tens, units = divmod(rest, 10)
+        if tens:
+            words.append(_TENS[tens])
+        if units:
+            if gender == "f":
+                words.append(_UNITS_FEMININE.get(units, _UNITS[units]))
+            elif gender == "a":
+                words.append(_UNITS_ACCUSATIVE.get(units, _UNITS[units]))
+            elif gender == "n":
+                words.append(_UNITS_NEUTER.get(units, _UNITS[units]))
+            else:
+                words.append(_UNITS[units])
+    return words
+
+
+@lru_cache(maxsize=4096)
+def cardinal(number, gender="m"):
+    """
+    Количественное числительное (именительный падеж); gender - m, f, n
+    или a (женский род в винительном падеже: "одну")
+    """
+    if number == 0:
+        return _UNITS[0]
+    if number < 0:
+        return "минус " + cardinal(-number, gender)
+    words = []
+    for scale, forms, scale_gender in _SCALES:
+        count, number = divmod(number, scale)
+        if count:
+            if count >= 1000:
+                words.append(cardinal(count, scale_gender))
+            elif count > 1 or scale_gender != "f":
+                # "тысяча", а не "одна тысяча"
+                words.extend(_triple(count, scale_gender))
+            words.append(_plural(count, forms))
+    words.extend(_triple(number, gender))
+    return " ".join(words)
+
+
+def _genitive_prefix(number):
+    """Первая часть сложного порядкового: 2 -> "двух", 21 -> "двадцатиодно" """
+    hundreds, rest = divmod(number, 100)
+    prefix = _HUNDREDS_GENITIVE[hundreds]
+    if 10 <= rest < 20:
+        prefix += _TEENS[rest - 10][:-1] + "и"
+    else:
+        prefix += _TENS_GENITIVE[rest // 10] + _UNITS_GENITIVE[rest % 10]
+    return prefix
+
+
+def cardinal_genitive(number):
+    """Количественное числительное до 1000 в родительном падеже: 22 -> "двадцати двух" """
+    if number == 0:
+        return "нуля"
+    words = []
+    hundreds, rest = divmod(number, 100)
+    if hundreds:
+        words.append("ста" if hundreds == 1 else _HUNDREDS_GENITIVE[hundreds])
+    if 10 <= rest < 20:
+        words.append(_TEENS[rest - 10][:-1] + "и")
+    else:
+        tens, units = divmod(rest, 10)
+        if tens:
+            words.append(_TENS_GENITIVE[tens])
+        if units:
+            words.append("одного" if units == 1 else _UNITS_GENITIVE[units])
+    return " ".join(words)
+
+
+@lru_cache(maxsize=4096)
+def ordinal(number, case="nom"):
+    """
+    Порядковое числительное: case - nom, nom_f, nom_n, gen, dat, prep или
+    gen_pl. Склоняется последнее слово, остальные - количественные
+    """
+    if number == 0:
+        stem, ending = _UNITS_ORDINAL[0]
+        return stem + _ORDINAL_ENDINGS[ending][case]
+    for scale, stem in _SCALES_ORDINAL.items():
+        if number % scale == 0:
+            count = (number // scale) % 1000
+            higher = number - count * scale
+            words = [cardinal(higher)] if higher else []
+            words.append((_genitive_prefix(count) if count > 1 else "") + stem + _ORDINAL_ENDINGS["ый"][case])
+            return " ".join(words)
+    low = number % 1000
+    words = [cardinal(number - low)] if number >= 1000 else []
+    hundreds, rest = divmod(low, 100)
+    if rest == 0:
+        stem, ending = _HUNDREDS_ORDINAL[hundreds]
+    else:
+        if hundreds:
+            words.append(_HUNDREDS[hundreds])
+        if rest < 10:
+            stem, ending = _UNITS_ORDINAL[rest]
+        elif rest < 20:
+            stem, ending = _TEENS_ORDINAL[rest - 10]
+        elif rest % 10 == 0:
+            stem, ending = _TENS_ORDINAL[rest // 10]
+        else:
+            words.append(_TENS[rest // 10])
+            stem, ending = _UNITS_ORDINAL[rest % 10]
+    words.append(stem + _ORDINAL_ENDINGS[ending][case])
+    return " ".join(words)
+
+
+def _digits(digits):
+    """Длинное число или число с нулями в начале читается по цифрам"""
+    return " ".join(_UNITS[int(digit)] for digit in digits)
+
+
+def _number_words(integer, fraction, forms, gender="m"):
+    """Число (целая часть, дробная часть строкой) и единица в нужной форме"""
+    if forms:
+        gender = forms[3]
+    if fraction:
+        if len(fraction) > 3 or len(integer) > 12:
+            words = f"{_digits(integer)} запятая {_digits(fraction)}"
+        else:
+            whole, part = int(integer), int(fraction)
+            one, many = _FRACTIONS[len(fraction)]
+            words = (f"{cardinal(whole, 'f')} {_plural(whole, ('целая', 'целых', 'целых'))} "
+                     f"{cardinal(part, 'f')} {_plural(part, (one, many, many))}")
+        # С дробью единица стоит в родительном падеже единственного числа
+        return f"{words} {forms[1]}" if forms else words
+    if len(integer) > 12 or (len(integer) > 1 and integer.startswith("0")):
+        words = _digits(integer)
+        return f"{words} {forms[2]}" if forms else words
+    number = int(integer)
+    words = cardinal(number, gender)
+    return f"{words} {_plural(number, forms[:3])}" if forms else words
+
+
+@lru_cache(maxsize=8192)
+def _expand(kind, token, case):
+    """
+    Произносимая форма найденного места. Повторяющиеся числа, даты и
+    сокращения разбираются один раз
+    """
+    if kind == "number":
+        sign, integer, fraction, unit = _NUMBER_RE.match(token).groups()
+        integer = integer.replace(" ", "").replace(" ", "")
+        words = _number_words(integer, fraction, _UNIT_FORMS.get(unit), case)
+        return "минус " + words if sign else words
+    if kind == "money":
+        currency, rest = token[0], token[1:].lstrip()
+        _, integer, fraction, _ = _NUMBER_RE.match(rest).groups()
+        return _number_words(integer.replace(" ", "").replace(" ", ""), fraction, _UNIT_FORMS[currency])
+    if kind == "year":
+        digits = re.match(r"\d+", token).group()
+        word = token[len(digits):].strip()
+        if word.startswith("г") and word.endswith("."):
+            # "1799 г." - падеж по предлогу, "1990-1995 гг." - множественное
+            if word == "гг.":
+                return f"{ordinal(int(digits), 'gen_pl')} годов"
+            return f"{ordinal(int(digits), case)} {_YEAR_WORDS[case]}"
+        year_case = _YEAR_WORD_CASES[word]
+        if year_case == "prep" and case == "dat":
+            year_case = "dat"
+        return f"{ordinal(int(digits), year_case)} {word}"
+    if kind == "years":
+        first, second = re.findall(r"\d+", token)
+        word = re.search(r"[а-я]+\.?$", token).group()
+        years_case = {"годов": "gen", "годах": "prep", "годам": "dat"}.get(word, "gen" if case == "nom" else case)
+        return (f"{ordinal(int(first), years_case)} — {ordinal(int(second), years_case)} "
+                f"{_YEARS_WORDS[years_case]}")
+    if kind == "counted":
+        digits, word = token.split()
+        return f"{ordinal(int(digits), _ORDINAL_NOUNS[word])} {word}"
+    if kind == "day":
+        # "1 мая" - "первое мая", "с 1 по 10 мая" - "с первого по десятое"
+        if not 1 <= int(token) <= 31:
+            return cardinal(int(token))
+        return ordinal(int(token), "nom_n" if case in ("nom", "prep") else case)
+    if kind == "dotted":
+        # IP-адреса и номера версий: каждая группа - отдельное число
+        return " точка ".join(_number_words(group, None, None) for group in token.split("."))
+    if kind == "date":
+        day, month, year = token.split(".")
+        month = int(month)
+        if not 1 <= int(day) <= 31 or not 1 <= month <= 12:
+            return " точка ".join(cardinal(int(part)) for part in (day, month, year))
+        day_case = "nom_n" if case in ("nom", "prep") else case
+        if len(year) == 2:
+            year = "20" + year if int(year) < 50 else "19" + year
+        return f"{ordinal(int(day), day_case)} {_MONTHS[month - 1]} {ordinal(int(year), 'gen')} года"
+    if kind == "time":
+        hours, minutes = token.split(":")
+        if minutes == "00":
+            return f"{cardinal(int(hours))} ноль ноль"
+        if minutes.startswith("0"):
+            return f"{cardinal(int(hours))} ноль {cardinal(int(minutes))}"
+        return f"{cardinal(int(hours))} {cardinal(int(minutes))}"
+    if kind == "ordinal":
+        digits, suffix = token.split("-", 1)
+        number = int(digits)
+        if suffix in _CARDINAL_SUFFIXES and number < 1000:
+            # "2-х" - "двух", но "90-х" - "девяностых": у "девяноста" другое окончание
+            words = cardinal_genitive(number)
+            if suffix != "х" or words.endswith("х"):
+                return words
+        return ordinal(number, _SUFFIX_CASES.get(suffix, "nom"))
+    if kind == "compound":
+        # "100-летие" -> "столетие", "2-комнатная" -> "двухкомнатная"
+        number = int(token[:-1])
+        if not number:
+            raise ValueError(token)
+        return _genitive_prefix(number)
+    if kind == "abbr":
+        words = _ABBREVIATIONS[token.replace(" ", "").lower()]
+        return words[0].upper() + words[1:] if token[0].isupper() else words
+    return _SYMBOLS[token]
+
+
+def _gender_by_ending(digit, ending, preposition=False):
+    # После 1 слово в именительном или винительном падеже ("одна книга",
+    # "одну книгу", "одно окно"), после 2 - в родительном ("две книги", но
+    # "два окна"). После предлога слово в косвенном падеже и по окончанию
+    # различим только винительный ("в 1 комнату", "на 2 недели"): "в 21
+    # веке" читается в мужском роде, а не "двадцать одно веке"
+    if digit == "1":
+        if preposition:
+            return "a" if ending in "ую" else "m"
+        return "f" if ending in "ая" else "a" if ending in "ую" else "n" if ending in "оеё" else "m"
+    return "f" if ending in "ыи" else "m"
+
+
+class NormalizedText:
+    """
+    Текст для синтеза и соответствие его позиций позициям исходного текста.
+
+    Хранятся только заменённые места: начала в нормализованном и исходном
+    тексте и длины. to_original(position) переводит позицию (например, из
+    события слова движка) в исходный текст; позиция внутри замены
+    переводится в начало заменённого места.
+    """
+
+    __slots__ = ("text", "_starts", "_replacements")
+
+    def __init__(self, text, replacements=()):
+        self.text = text
+        # (начало в нормализованном, конец в нормализованном, начало в исходном, конец в исходном)
+        self._replacements = list(replacements)
+        self._starts = [replacement[0] for replacement in self._replacements]
+
+    def __str__(self):
+        return self.text
+
+    def to_original(self, position):
+        """Позиция исходного текста для позиции нормализованного"""
+        i = bisect_right(self._starts, position) - 1
+        if i < 0:
+            return position
+        start, end, original_start, original_end = self._replacements[i]
+        if position < end:
+            return original_start
+        return original_end + position - end
+
+    def original_span(self, position, length):
+        """(начало, длина) в исходном тексте для участка нормализованного"""
+        start = self.to_original(position)
+        if length <= 0:
+            return start, 0
+        i = bisect_right(self._starts, position + length - 1) - 1
+        if i >= 0 and position + length <= self._replacements[i][1]:
+            # Конец участка внутри замены: до конца заменённого места
+            end = self._replacements[i][3]
+        else:
+            end = self.to_original(position + length - 1) + 1
+        return start, end - start
+
+    def offsets(self):
+        """
+        Таблицы перевода всех позиций нормализованного текста (0..len):
+        starts[p] = to_original(p), ends[p] - конец в исходном тексте
+        участка, который заканчивается перед p. Участок [p, q) переводится в
+        [starts[p], ends[q]) без поиска по заменам
+        """
+        starts = []
+        ends = [0]
+        last = shift = 0
+        for start, end, original_start, original_end in self._replacements:
+            starts.extend(range(last + shift, start + shift))
+            starts.extend([original_start] * (end - start))
+            ends.extend(range(last + shift + 1, start + shift + 1))
+            ends.extend([original_end] * (end - start))
+            last = end
+            shift = original_end - end
+        length = len(self.text)
+        starts.extend(range(last + shift, length + shift + 1))
+        ends.extend(range(last + shift + 1, length + shift + 1))
+        return starts, ends
+
+
+def normalize(text):
+    """
+    Текст для синтеза речи: числа, даты, время, единицы измерения, знаки и
+    сокращения заменяются словами. Возвращает NormalizedText
+    """
+    pieces = []
+    replacements = []
+    last = 0
+    shift = 0
+    position = 0
+    # Методы выражений в локальных переменных: цикл проходит каждое место,
+    # где может начинаться правило
+    search_trigger = _TRIGGER_RE.search
+    match_rules = _RULES_RE.match
+    while True:
+        trigger = search_trigger(text, position)
+        if trigger is None:
+            break
+        start = position = trigger.start()
+        if text[start] == ".":
+            # Точка: правило может начинаться на несколько букв раньше
+            if text[start - 1:start] not in _ABBREVIATION_LAST:
+                position += 1
+                continue
+            previous = _ABBREVIATION_START_RE.search(text, max(last, start - 4), start)
+            if previous is None:
+                position += 1
+                continue
+            start = previous.start()
+        match = match_rules(text, start)
+        if match is None:
+            position += 1
+            continue
+        kind = match.lastgroup
+        end = position = match.end()
+        token = match.group()
+        case = "nom"
+        if kind in ("date", "year", "years", "day"):
+            previous = _PREVIOUS_WORD_RE.search(text, max(0, start - 16), start)
+            if previous is not None:
+                word = previous.group(1).lower()
+                # "по 10 мая" - винительный падеж, как именительный
+                case = "nom" if word == "по" and kind in ("date", "day") else _PREPOSITION_CASES.get(word, "nom")
+        elif kind == "number" and token[-1] in "12" and token[-2:-1] != "1":
+            # Род для "одна/одно/две" по окончанию следующего слова
+            following = _NEXT_WORD_RE.match(text, end)
+            if following is not None:
+                previous = _PREVIOUS_WORD_RE.search(text, max(0, start - 16), start)
+                preposition = previous is not None and previous.group(1).lower() in _PREPOSITION_CASES
+                case = _gender_by_ending(token[-1], following.group(1), preposition)
+        try:
+            words = _expand(kind, token, case)
+        except (KeyError, ValueError, IndexError):
+            # Неподходящее под правило место остаётся как есть
+            continue
+        if kind == "abbr" and (end == len(text) or text[end] == "\n"):
+            # Точка сокращения в конце предложения
+            words += "."
+        elif kind == "symbol" and end < len(text) and not text[end].isspace():
+            # "№7" - "номер семь", а не "номерсемь"
+            words += " "
+        pieces.append(text[last:start])
+        pieces.append(words)
+        normalized_start = start + shift
+        shift += len(words) - (end - start)
+        replacements.append((normalized_start, end + shift, start, end))
+        last = end
+    if not replacements:
+        return NormalizedText(text)
+    pieces.append(text[last:])
+    return NormalizedText("".join(pieces), replacements)
+
+
+class SpokenSentences:
+    """
+    Предложения для синтеза: ленивое представление списка предложений
+    (например, SentenceIndex.sentences), выдающее их нормализованный текст.
+    Если задан lexicon (pronunciation.PronunciationLexicon), после
+    нормализации подставляются произношения из словаря; ssml - движок
+    принимает SSML. mapping(i) - NormalizedText нормализации предложения,
+    original_span() переводит участок переданного движку текста в исходное
+    предложение, offset_table() - таблицы для всех позиций сразу. Последние
+    нормализованные предложения кэшируются, так как очередь и фоновый
+    синтез обращаются к ним повторно
+    """
+
+    def __init__(self, sentences, lexicon=None, ssml=False):
+        self.sentences = sentences
+        self.lexicon = lexicon
+        self.ssml = ssml
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __getitem__(self, i):
+        text = self.mapping(i).text
+        if self.lexicon:
+            text = self.lexicon.apply(text, self.ssml).text
+        return text
+
+    def mapping(self, i):
+        return _normalize_sentence(self.sentences[i])
+
+    def original_span(self, i, position, length):
+        """(начало, длина) в исходном предложении i для участка текста, переданного движку"""
+        normalized = self.mapping(i)
+        if self.lexicon:
+            position, length = self.lexicon.apply(normalized.text, self.ssml).original_span(position, length)
+        return normalized.original_span(position, length)
+
+    def offset_table(self, i):
+        """
+        Таблицы NormalizedText.offsets() для текста предложения i,
+        переданного движку: позиции сразу переводятся в исходное предложение
+        """
+        normalized = self.mapping(i)
+        starts, ends = normalized.offsets()
+        if not self.lexicon:
+            return starts, ends
+        spoken_starts, spoken_ends = self.lexicon.apply(normalized.text, self.ssml).offsets()
+        return [starts[p] for p in spoken_starts], [ends[p] for p in spoken_ends]
+
+
+@lru_cache(maxsize=256)
+def _normalize_sentence(sentence):
+    return normalize(sentence)
@@ -0,0 +1,211 @@
+import bisect
+import re
+import time
+
+from tts_engine import wav_duration
+
+
+class SentenceQueue:
+    """
+    Очередь предложений, заранее поставленных в движок синтеза.
+
+    Кроме текущего предложения в движке держится lookahead следующих, чтобы
+    между предложениями не было паузы на ожидание события и подготовку
+    синтеза. Номера потоков движка сопоставляются с номерами предложений,
+    поэтому выделение и переходы по предложениям продолжают работать.
+
+    С кэшем синтеза (RenderCache) предложения воспроизводятся из готового
+    звука. При промахе без фонового пула (RenderPool) предложение
+    синтезируется и сохраняется в кэш сразу; с пулом - произносится движком
+    напрямую, а пул заранее готовит следующие предложения, так что синтез
+    не задерживает воспроизведение.
+    """
+
+    def __init__(self, engine, sentences, lookahead=3, cache=None, renderer=None):
+        self.engine = engine
+        self.sentences = sentences
+        self.lookahead = lookahead
+        self.cache = cache
+        self.renderer = renderer
+        self._streams = {}  # номер потока -> номер предложения, в порядке постановки
+        self._durations = {}  # номер потока -> длительность готового звука
+        self._next_index = 0
+
+    @property
+    def current_index(self):
+        """Номер звучащего предложения или None, если очередь пуста"""
+        return next(iter(self._streams.values()), None)
+
+    def index_of(self, stream_number):
+        """Номер предложения для потока движка (None для чужих потоков)"""
+        return self._streams.get(stream_number)
+
+    def audio_duration(self, stream_number):
+        """
+        Длительность потока в секундах, если он звучит из готового звука
+        (событий слов у такого потока нет), иначе None
+        """
+        return self._durations.get(stream_number)
+
+    def start(self, index):
+        """Воспроизведение с предложения index (очередь должна быть пуста)"""
+        self._streams.clear()
+        self._durations.clear()
+        self._next_index = index
+        self.fill()
+
+    def fill(self):
+        """Досыпает предложения в движок до lookahead штук после текущего"""
+        while len(self._streams) <= self.lookahead and self._next_index < len(self.sentences):
+            stream_number, duration = self._speak(self.sentences[self._next_index])
+            self._streams[stream_number] = self._next_index
+            if duration is not None:
+                self._durations[stream_number] = duration
+            self._next_index += 1
+        if self.renderer is not None:
+            # Следующим понадобится предложение _next_index
+            self.renderer.schedule(self.sentences, self._next_index, self.engine)
+
+    def _speak(self, sentence):
+        if self.cache is not None:
+            try:
+                if self.renderer is None:
+                    audio = self.cache.get_or_render(self.engine, sentence)
+                else:
+                    audio = self.cache.get(self.cache.key_for(self.engine, sentence))
+                if audio is not None:
+                    return self.engine.speak_audio(audio), wav_duration(audio)
+            except Exception as e:
+                print(f"Ошибка кэша синтеза: {e}")
+        return self.engine.speak(sentence), None
+
+    def finish(self, stream_number):
+        """
+        Обработка окончания потока. Возвращает False для потоков, которых нет
+        в очереди (прерванных ранее), иначе снимает поток и досыпает очередь
+        """
+        if stream_number not in self._streams:
+            return False
+        # Потоки заканчиваются в порядке постановки; всё, что стояло раньше,
+        # тоже уже отзвучало
+        for stream in list(self._streams):
+            del self._streams[stream]
+            self._durations.pop(stream, None)
+            if stream == stream_number:
+                break
+        self.fill()
+        return True
+
+    def purge(self):
+        """Сброс очереди и остановка движка (при перемотке, паузе, остановке)"""
+        self._streams.clear()
+        self._durations.clear()
+        if self.renderer is not None:
+            self.renderer.cancel()
+        self.engine.purge()
+
+
+class WordTracker:
+    """
+    Звучащее слово в документе по событиям слов движка.
+
+    word() вызывается на каждое событие и только запоминает его; окно
+    забирает слово методом take() по таймеру с частотой обновления экрана.
+    Поэтому при быстрой речи события не приводят к лишним перерисовкам:
+    между кадрами рисуется только последнее слово.
+
+    При начале потока (start) для предложения один раз строится таблица
+    смещений (SpokenSentences.offset_table): позиция в тексте, переданном
+    движку (нормализованном, с произношениями и разметкой SSML), -> позиция
+    в документе. Перевод события - два обращения к таблице.
+
+    Поток, который звучит из готового звука (кэш синтеза), событий слов не
+    присылает: слово определяется по доле прошедшего времени потока, как
+    если бы символы произносились равномерно.
+    """
+
+    _WORD_RE = re.compile(r"\S+")
+
+    def __init__(self, sentences, clock=time.monotonic):
+        self.sentences = sentences
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self._index = None
+        self._base = 0
+        self._starts = self._ends = None
+        self._event = None
+        self._started = None
+        self._paused_at = None
+        self._duration = None
+        self._words = None
+        self._shown = None
+
+    def start(self, index, base, duration=None):
+        """
+        Начало потока предложения index; base - позиция начала предложения
+        в документе, duration - длительность готового звука или None
+        """
+        self._index = index
+        self._base = base
+        self._event = None
+        self._shown = None
+        self._started = self.clock()
+        self._paused_at = None
+        self._duration = duration
+        if duration:
+            text = self.sentences.sentences[index]
+            self._words = [(match.start(), match.end()) for match in self._WORD_RE.finditer(text)]
+            self._starts = self._ends = None
+        else:
+            self._words = None
+            self._starts, self._ends = self.sentences.offset_table(index)
+
+    def pause(self):
+        """Пауза чтения: оценка слова по времени останавливается"""
+        if self._started is not None and self._paused_at is None:
+            self._paused_at = self.clock()
+
+    def resume(self):
+        if self._paused_at is not None:
+            self._started += self.clock() - self._paused_at
+            self._paused_at = None
+
+    def word(self, index, position, length):
+        """Событие слова движка; события чужих предложений пропускаются"""
+        if index == self._index and self._starts is not None:
+            self._event = (position, length)
+
+    def current(self):
+        """(начало, конец) звучащего слова в документе или None"""
+        if self._words is not None:
+            return self._estimate()
+        if self._event is None:
+            return None
+        position, length = self._event
+        last = len(self._starts) - 1
+        start = self._starts[min(position, last)]
+        end = self._ends[min(position + length, last)]
+        if end <= start:
+            # Событие пришлось на разметку SSML
+            return None
+        return self._base + start, self._base + end
+
+    def take(self):
+        """Слово для перерисовки: current(), если оно изменилось с прошлого раза, иначе None"""
+        span = self.current()
+        if span is None or span == self._shown:
+            return None
+        self._shown = span
+        return span
+
+    def _estimate(self):
+        if not self._words:
+            return None
+        text_length = self._words[-1][1]
+        now = self._paused_at if self._paused_at is not None else self.clock()
+        position = (now - self._started) / self._duration * text_length
+        i = max(bisect.bisect_right(self._words, (position, text_length + 1)) - 1, 0)
+        start, end = self._words[i]
+        return self._base + start, self._base + end
@@ -0,0 +1,254 @@
+import hashlib
+import json
+import re
+from xml.sax.saxutils import escape, quoteattr
+
+from normalizer import NormalizedText
+
+
+# Версия формата сохранённого словаря: при смене сохранённая в базе копия
+# собирается заново
+LEXICON_VERSION = 2
+
+# Документ SSML для движков с поддержкой фонем (SAPI 5.3+)
+SSML_START = '<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="ru-RU">'
+SSML_END = "</speak>"
+
+# Слово или отдельный знак: термины словаря совпадают только целыми словами
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_XML_SPECIAL_RE = re.compile(r"[&<>]")
+# Ключ записи в узле дерева (слов с пустым ключом не бывает)
+_ENTRY = ""
+
+
+def _fold(token):
+    return token.lower().replace("ё", "е")
+
+
+def _term_keys(term):
+    """
+    Ключи слов термина в префиксном дереве. Слово, перед которым в термине
+    пробел, получает ключ с пробелом: "C++" и "C + +" - разные термины
+    """
+    keys = []
+    previous_end = None
+    for match in _TOKEN_RE.finditer(term):
+        key = _fold(match.group())
+        if previous_end is not None and match.start() > previous_end:
+            key = " " + key
+        keys.append(key)
+        previous_end = match.end()
+    return keys
+
+
+def parse_entries(lines):
+    """
+    Записи словаря из строк "термин = произношение": (термин, замена,
+    фонемы). Произношение в косых чертах ("/ˈzamək/") - фонемы IPA, иначе -
+    текст, который произносится вместо термина. Пустые строки и строки с #
+    пропускаются; разделителем может быть и табуляция
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        term, separator, replacement = line.partition("\t") if "\t" in line else line.partition("=")
+        term, replacement = term.strip(), replacement.strip()
+        if not separator or not term or not replacement:
+            continue
+        if len(replacement) > 2 and replacement.startswith("/") and replacement.endswith("/"):
+            yield term, replacement[1:-1], True
+        else:
+            yield term, replacement, False
+
+
+def lexicon_fingerprint(versions):
+    """Отпечаток набора включённых словарей [(id, версия), ...]"""
+    return hashlib.blake2b(repr((LEXICON_VERSION, sorted(versions))).encode("ascii"), digest_size=16).digest()
+
+
+class PronunciationLexicon:
+    """
+    Словарь произношений, собранный в префиксное дерево по словам.
+
+    apply() проходит предложение один раз: с каждого слова дерево
+    спускается по следующим словам, пока есть продолжение, и берётся самый
+    длинный термин. Время зависит от длины предложения, а не от размера
+    словаря. Регистр и ё/е не различаются.
+
+    Текстовая замена подставляется как есть. Фонемы передаются движку с
+    поддержкой SSML элементом <phoneme>, остальные движки произносят термин
+    как написан. Результат - NormalizedText: позиции текста с разметкой
+    переводятся в позиции предложения.
+    """
+
+    def __init__(self, root=None, size=0, fingerprint=None):
+        self._root = root if root is not None else {}
+        self.size = size
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return self.size
+
+    @classmethod
+    def build(cls, entries, fingerprint=None):
+        """Сборка из записей (термин, замена, фонемы); повторный термин заменяет прежний"""
+        root = {}
+        size = 0
+        for term, replacement, phoneme in entries:
+            keys = _term_keys(term)
+            if not keys:
+                continue
+            node = root
+            for key in keys:
+                child = node.get(key)
+                if child is None:
+                    child = node[key] = {}
+                node = child
+            if _ENTRY not in node:
+                size += 1
+            node[_ENTRY] = (replacement, bool(phoneme))
+        return cls(root, size, fingerprint)
+
+    def entries(self):
+        """
+        Записи словаря (термин, замена, фонемы) без повторов. Термин
+        собирается из ключей дерева: в нижнем регистре, с е вместо ё
+        """
+        stack = [("", self._root)]
+        while stack:
+            term, node = stack.pop()
+            for key, child in node.items():
+                if key == _ENTRY:
+                    yield term, child[0], child[1]
+                else:
+                    stack.append((term + key, child))
+
+    def pack(self):
+        """
+        Записи словаря в JSON. Сохраняются только данные, а не объекты
+        Python: дерево собирается заново при загрузке
+        """
+        return json.dumps([LEXICON_VERSION, list(self.entries())], ensure_ascii=False,
+                          separators=(",", ":")).encode("utf-8")
+
+    @classmethod
+    def unpack(cls, data, fingerprint=None):
+        """Словарь из pack() или None, если данные другой версии или повреждены"""
+        try:
+            version, entries = json.loads(data)
+            if version != LEXICON_VERSION:
+                return None
+            return cls.build(entries, fingerprint)
+        except (ValueError, TypeError):
+            return None
+
+    def find(self, text):
+        """Найденные термины: список (начало, конец, замена, фонемы) без пересечений"""
+        found = []
+        root = self._root
+        if not root:
+            return found
+        tokens = [(match.start(), match.end(), _fold(match.group())) for match in _TOKEN_RE.finditer(text)]
+        count = len(tokens)
+        i = 0
+        while i < count:
+            node = root.get(tokens[i][2])
+            longest = None
+            j = i
+            while node is not None:
+                entry = node.get(_ENTRY)
+                if entry is not None:
+                    longest = (j, entry)
+                j += 1
+                if j == count:
+                    break
+                start, _, key = tokens[j]
+                if start > tokens[j - 1][1]:
+                    key = " " + key
+                node = node.get(key)
+            if longest is None:
+                i += 1
+                continue
+            j, (replacement, phoneme) = longest
+            found.append((tokens[i][0], tokens[j][1], replacement, phoneme))
+            i = j + 1
+        return found
+
+    def apply(self, text, ssml=False):
+        """
+        Текст для движка: термины заменены произношениями. ssml=True - движок
+        понимает SSML: если в предложении есть фонемы, оно передаётся
+        документом SSML, текст экранируется
+        """
+        found = self.find(text)
+        if ssml and any(phoneme for _, _, _, phoneme in found):
+            return self._ssml(text, found)
+        pieces = []
+        replacements = []
+        last = 0
+        shift = 0
+        for start, end, replacement, phoneme in found:
+            if phoneme:
+                continue
+            pieces.append(text[last:start])
+            pieces.append(replacement)
+            replacements.append((start + shift, start + shift + len(replacement), start, end))
+            shift += len(replacement) - (end - start)
+            last = end
+        if not replacements:
+            return NormalizedText(text)
+        pieces.append(text[last:])
+        return NormalizedText("".join(pieces), replacements)
+
+    @staticmethod
+    def _ssml(text, found):
+        pieces = [SSML_START]
+        # Начало документа соответствует началу предложения
+        replacements = [(0, len(SSML_START), 0, 0)]
+        length = len(SSML_START)
+
+        def add(piece, start, end):
+            nonlocal length
+            pieces.append(piece)
+            if piece != text[start:end]:
+                replacements.append((length, length + len(piece), start, end))
+            length += len(piece)
+
+        def add_plain(start, end):
+            last = start
+            for match in _XML_SPECIAL_RE.finditer(text, start, end):
+                add(text[last:match.start()], last, match.start())
+                add(escape(match.group()), match.start(), match.end())
+                last = match.end()
+            add(text[last:end], last, end)
+
+        last = 0
+        for start, end, replacement, phoneme in found:
+            add_plain(last, start)
+            if phoneme:
+                add(f'<phoneme alphabet="ipa" ph={quoteattr(replacement)}>{escape(text[start:end])}</phoneme>',
+                    start, end)
+            else:
+                add(escape(replacement), start, end)
+            last = end
+        add_plain(last, len(text))
+        pieces.append(SSML_END)
+        replacements.append((length, length + len(SSML_END), len(text), len(text)))
+        return NormalizedText("".join(pieces), replacements)
+
+
+def load_lexicon(db):
+    """
+    Словарь из включённых словарей базы. Записи всех включённых словарей
+    (без повторов терминов) хранятся в базе вместе с отпечатком словарей:
+    при неизменных словарях дерево собирается из них, без запроса записей
+    каждого словаря
+    """
+    fingerprint = lexicon_fingerprint(db.get_pronunciation_versions())
+    data = db.get_pronunciation_cache(fingerprint)
+    lexicon = PronunciationLexicon.unpack(data, fingerprint) if data is not None else None
+    if lexicon is None:
+        lexicon = PronunciationLexicon.build(db.iter_pronunciation_entries(), fingerprint)
+        db.save_pronunciation_cache_async(fingerprint, lexicon.pack())
+    return lexicon
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+class RenderCache:
+    """
+    Дисковый кэш синтезированной речи (WAV) по предложениям.
+
+    Ключ - хэш текста предложения вместе с движком, голосом и скоростью,
+    поэтому повторное чтение тех же текстов не требует синтеза. Размер кэша
+    ограничен max_bytes, при превышении удаляются давно не использованные
+    записи (LRU). Порядок использования восстанавливается при запуске по
+    времени изменения файлов. Методы потокобезопасны.
+    """
+
+    def __init__(self, directory="render_cache", max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # ключ -> размер файла, от старых к новым
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.bytes_written = 0
+        self.evictions = 0
+        self._load()
+
+    @staticmethod
+    def make_key(text, engine_name, voice_id, speed):
+        data = f"{engine_name}\0{voice_id}\0{speed:.2f}\0{text}".encode("utf-8")
+        return hashlib.sha256(data).hexdigest()
+
+    def key_for(self, engine, text):
+        return self.make_key(text, engine.name, engine.voice_id, engine.speed)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        """WAV по ключу или None"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+            except OSError:
+                self._forget(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_served += len(data)
+            return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self.bytes_written += len(data)
+            self._evict()
+
+    def get_or_render(self, engine, text):
+        """WAV предложения из кэша; при промахе - синтез движком и сохранение"""
+        key = self.key_for(engine, text)
+        data = self.get(key)
+        if data is None:
+            data = engine.synthesize(text)
+            self.put(key, data)
+        return data
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "bytes_served": self.bytes_served,
+                "bytes_written": self.bytes_written,
+                "entries": len(self._entries),
+                "size_bytes": self._total_bytes,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove_file(key)
+                self._forget(key)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".wav")
+
+    def _load(self):
+        """Восстановление списка записей и порядка LRU с диска"""
+        found = []
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if not name.endswith(".wav"):
+                        # Недописанные временные файлы
+                        if name.endswith(".tmp"):
+                            os.remove(path)
+                        continue
+                    stat = os.stat(path)
+                    found.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def _forget(self, key):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _remove_file(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self._remove_file(key)
+            self.evictions += 1
@@ -0,0 +1,92 @@
+import heapq
+import threading
+
+
+class RenderPool:
+    """
+    Пул фоновых потоков, заранее синтезирующих предложения в кэш.
+
+    schedule() задаёт окно из depth предложений, начиная с того, которое
+    понадобится следующим; ближайшие к нему синтезируются первыми. Новое
+    окно (в том числе после перемотки) отменяет ещё не начатые задачи
+    старого. Каждый поток работает со своим экземпляром движка, созданным
+    engine_factory (объекты COM нельзя делить между потоками).
+    """
+
+    def __init__(self, engine_factory, cache, workers=2, depth=8):
+        self.engine_factory = engine_factory
+        self.cache = cache
+        self.depth = depth
+        self._condition = threading.Condition()
+        # Куча задач: (приоритет, номер предложения, текст, ключ, голос, скорость)
+        self._tasks = []
+        self._in_progress = set()
+        self._closed = False
+        self.rendered = 0
+        self.cancelled = 0
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def schedule(self, sentences, start, engine):
+        """
+        Подготовка предложений start..start+depth-1 голосом и скоростью
+        движка engine (уже синтезированные пропускаются)
+        """
+        candidates = []
+        for index in range(start, min(start + self.depth, len(sentences))):
+            text = sentences[index]
+            key = self.cache.make_key(text, engine.name, engine.voice_id, engine.speed)
+            if key not in self.cache:
+                candidates.append((index - start, index, text, key, engine.voice_id, engine.speed))
+        with self._condition:
+            tasks = [task for task in candidates if task[3] not in self._in_progress]
+            kept = {task[3] for task in tasks}
+            self.cancelled += sum(1 for task in self._tasks if task[3] not in kept)
+            self._tasks = tasks
+            heapq.heapify(self._tasks)
+            self._condition.notify_all()
+
+    def cancel(self):
+        """Отмена всех ещё не начатых задач (при перемотке и остановке)"""
+        with self._condition:
+            self.cancelled += len(self._tasks)
+            self._tasks = []
+
+    def pending(self):
+        with self._condition:
+            return len(self._tasks) + len(self._in_progress)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._tasks = []
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        engine = None
+        while True:
+            with self._condition:
+                while not self._tasks and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                _, _, text, key, voice_id, speed = heapq.heappop(self._tasks)
+                self._in_progress.add(key)
+            try:
+                if engine is None:
+                    engine = self.engine_factory()
+                if voice_id is not None and engine.voice_id != voice_id:
+                    engine.set_voice(voice_id)
+                if engine.speed != speed:
+                    engine.set_rate(speed)
+                self.cache.put(key, engine.synthesize(text))
+                with self._condition:
+                    self.rendered += 1
+            except Exception as e:
+                print(f"Ошибка фонового синтеза: {e}")
+            finally:
+                with self._condition:
+                    self._in_progress.discard(key)
@@ -0,0 +1,557 @@
+import bisect
+import re
+import sys
+from array import array
+from itertools import accumulate
+
+
+# Сокращения, после точки в которых предложение не заканчивается
+ABBREVIATIONS = {
+    # русские
+    "г", "гг", "ул", "пр", "просп", "пер", "д", "кв", "корп", "стр", "обл",
+    "им", "проф", "акад", "доц", "ген", "полк", "св", "рис", "табл", "гл",
+    "см", "ср", "напр", "т", "тыс", "млн", "млрд", "руб", "коп", "изд",
+    "р", "н", "э", "вв", "в", "с", "ок", "прим", "ред", "пос", "дер",
+    # английские
+    "mr", "mrs", "ms", "dr", "prof", "st", "vs", "etc", "e", "i", "jr", "sr",
+}
+
+# Сокращения, которыми предложение может закончиться, если дальше идёт
+# заглавная буква («и т.д. Потом...», «Цена 3 руб. Это дорого.»)
+SENTENCE_END_ABBREVIATIONS = {"д", "п", "др", "пр", "etc", "руб", "коп", "тыс", "млн", "млрд", "г", "гг"}
+
+# «г.» и «гг.» заканчивают предложение только после числа (год):
+# «в 1990 г. Потом», но «г. Москва»
+_YEAR_ABBREVIATIONS = {"г", "гг"}
+
+# Точка после известного сокращения или одиночной буквы (инициалы, «т.е.»)
+# не может считаться однозначным концом предложения
+_ABBREVIATION_LOOKBEHIND = r'(?<!\b[^\W\d_]\.)' + ''.join(
+    r'(?<!\b(?i:%s)\.)' % re.escape(abbr) for abbr in sorted(ABBREVIATIONS) if len(abbr) > 1
+)
+
+# Кандидаты на границу. Первая альтернатива - однозначный конец
+# предложения: серия конечных знаков не после сокращения, за которой идёт
+# перевод строки, конец текста или заглавная буква/открывающая кавычка.
+# Вторая - неоднозначная серия, она проверяется в _is_sentence_end
+# (группы: знаки, кавычки, следующий непробельный символ строки).
+# Третья - разделители строки и частей предложения; двоеточие между
+# цифрами (12:30) границей не считается.
+_BOUNDARY_RE = re.compile(
+    r'(?=[.!?…\n;:])(?:'
+    r'(?:\.' + _ABBREVIATION_LOOKBEHIND + r'[.!?…]*|\.[.!?…]+|[!?…][.!?…]*)'
+    r'[»"”’)\]]*(?=[^\S\n]*(?:\n|$|[A-ZА-ЯЁ«"“„(\[]))'
+    r'|([.!?…]+)([»"”’)\]]*)(?=[^\S\n]*(\S?))'
+    r'|[\n;]|(?<!\d):|:(?!\d))'
+)
+
+# Короткое слово непосредственно перед точкой (кандидат в сокращения)
+_MAX_ABBREVIATION_LEN = 6
+_WORD_BEFORE_RE = re.compile(r'(?:^|[\W\d_])([^\W\d_]{1,%d})$' % _MAX_ABBREVIATION_LEN)
+
+_DASHES = '—–-'
+
+
+def _word_before(text, pos):
+    """Короткое слово, стоящее непосредственно перед pos, или None"""
+    match = _WORD_BEFORE_RE.search(text, max(0, pos - _MAX_ABBREVIATION_LEN - 1), pos)
+    return match.group(1) if match else None
+
+
+def _after_number(text, pos):
+    """Стоит ли перед pos (через пробелы) цифра"""
+    while pos and text[pos - 1] in ' \u00a0':
+        pos -= 1
+    return pos > 0 and text[pos - 1].isdigit()
+
+
+def _is_sentence_end(text, start, end, punct, quote, next_char):
+    """
+    Решает, является ли серия конечных знаков концом предложения.
+    next_char - первый непробельный символ после серии в той же строке
+    ('' если дальше перевод строки или конец текста)
+    """
+    if punct == '.':
+        # Десятичные числа и даты: 3.14, 01.02.2024
+        if not quote and start and text[start - 1].isdigit() and text[end:end + 1].isdigit():
+            return False
+
+        if start and text[start - 1].isalpha():
+            word = _word_before(text, start)
+            if word:
+                lower = word.lower()
+                # Инициалы: А. С. Пушкин
+                if len(word) == 1 and word.isupper() and next_char.isupper():
+                    return False
+                if lower in ABBREVIATIONS and not quote:
+                    if lower in SENTENCE_END_ABBREVIATIONS and next_char.isupper() and (
+                            lower not in _YEAR_ABBREVIATIONS or _after_number(text, start - len(word))):
+                        return True
+                    return not next_char
+
+    if not next_char:
+        return True
+
+    # Продолжение фразы со строчной буквы: многоточие в середине фразы,
+    # составные сокращения «т.е.», прямая речь «Привет!» — сказал он.
+    if next_char.islower() or next_char in ',;':
+        return False
+    if next_char in _DASHES and (quote or punct[-1] in '!?…'):
+        return False
+    return True
+
+
+def split_text_into_sentences(text):
+    """
+    Разбиение текста на предложения с отслеживанием позиций.
+
+    Один проход по тексту регулярным выражением без посимвольной
+    конкатенации строк. Возвращает (sentences, positions), где positions -
+    список пар (start, end) в исходном тексте; end включает знак конца
+    предложения, пустые фрагменты отбрасываются.
+    """
+    sentences = []
+    positions = []
+    add_sentence = sentences.append
+    add_position = positions.append
+    length = len(text)
+    current_start = 0
+
+    for match in _BOUNDARY_RE.finditer(text):
+        end = match.end()
+        if match.lastindex is not None:
+            punct, quote, next_char = match.groups()
+            if not _is_sentence_end(text, match.start(), end, punct, quote, next_char):
+                continue
+        sentence = text[current_start:end].strip()
+        if sentence:
+            add_sentence(sentence)
+            add_position((current_start, end))
+        current_start = end
+
+    # Добавляем оставшийся текст, если он есть
+    if current_start < length:
+        sentence = text[current_start:].strip()
+        if sentence:
+            sentences.append(sentence)
+            positions.append((current_start, length))
+
+    return sentences, positions
+
+
+# Фрагменты для синтеза. Каждый фрагмент - отдельный вызов движка, поэтому
+# короткие предложения и части предложений (после ":" и ";") в пределах
+# строки объединяются, а слишком длинные предложения делятся. Через
+# перевод строки объединяются только короткие строки (реплики диалога),
+# через пустую строку - никогда. Длительность оценивается по числу
+# символов: CHARS_PER_SECOND при обычной скорости
+CHARS_PER_SECOND = 15
+CHUNK_MIN_SECONDS = 2
+CHUNK_TARGET_SECONDS = 6
+CHUNK_MAX_SECONDS = 15
+
+# Разрыв длинного предложения: после запятой, скобки или кавычки, у тире,
+# а если их нет - на пробеле
+_PAUSE_BREAK_RE = re.compile(r'[,)»"”]\s+|\s[—–]\s+')
+_SPACE_BREAK_RE = re.compile(r'\s+')
+
+
+def chunk_sizes(speed=1.0):
+    """(наименьшая, желаемая, наибольшая) длина фрагмента в символах для скорости speed"""
+    rate = CHARS_PER_SECOND * speed
+    return (int(CHUNK_MIN_SECONDS * rate), int(CHUNK_TARGET_SECONDS * rate),
+            int(CHUNK_MAX_SECONDS * rate))
+
+
+def _split_long(text, start, end, sizes):
+    """
+    Границы частей слишком длинного участка: части примерно равны и
+    заканчиваются на ближайшем к середине допустимого окна месте паузы
+    """
+    minimum, _, maximum = sizes
+    bounds = []
+    while end - start > maximum:
+        count = -(-(end - start) // maximum)
+        goal = start + (end - start) // count
+        low, high = start + max(minimum, (goal - start) // 2), start + maximum
+        cuts = [match.end() for match in _PAUSE_BREAK_RE.finditer(text, low, high)]
+        if not cuts:
+            cuts = [match.end() for match in _SPACE_BREAK_RE.finditer(text, low, high)]
+        cut = min(cuts, key=lambda position: abs(position - goal)) if cuts else goal
+        bounds.append((start, cut))
+        start = cut
+    bounds.append((start, end))
+    return bounds
+
+
+def split_text_into_chunks(text, sizes=None):
+    """
+    Разбиение текста на фрагменты для синтеза (см. chunk_sizes):
+    предложения split_text_into_sentences объединяются, пока фрагмент
+    короче желаемого (или короче наименьшего, или следующий кусок совсем
+    короткий), предложения длиннее наибольшего делятся на месте паузы.
+    Через перевод строки фрагмент переходит, только если он сам или
+    следующая строка короче наименьшего; через пустую строку не переходит.
+    Возвращает (chunks, positions) в том же виде, что
+    split_text_into_sentences
+    """
+    minimum, target, maximum = sizes = sizes or chunk_sizes()
+    chunks = []
+    positions = []
+    current = None
+    for fragment_start, fragment_end in split_text_into_sentences(text)[1]:
+        if fragment_end - fragment_start > maximum:
+            pieces = _split_long(text, fragment_start, fragment_end, sizes)
+        else:
+            pieces = ((fragment_start, fragment_end),)
+        for start, end in pieces:
+            if current is not None:
+                merged = end - current[0]
+                short = current[1] - current[0] < minimum or end - start < minimum
+                # Переводы строк между фрагментами: пустые строки в разбиение не попадают
+                breaks = text.count("\n", current[1] - 1, start)
+                if merged <= maximum and (breaks == 0 and (merged <= target or short) or breaks == 1 and short):
+                    current = (current[0], end)
+                    continue
+                positions.append(current)
+            current = (start, end)
+    if current is not None:
+        positions.append(current)
+    for start, end in positions:
+        chunks.append(text[start:end].strip())
+    return chunks, positions
+
+
+class _FenwickTree:
+    """Дерево Фенвика: префиксные суммы и точечные изменения за O(log n)"""
+
+    def __init__(self, values):
+        self.size = len(values)
+        self.tree = [0] + list(values)
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+
+    def add(self, index, delta):
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, count):
+        """Сумма первых count элементов"""
+        total = 0
+        i = count
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, value):
+        """Индекс элемента, на который приходится накопленная сумма value
+        (наименьший index, у которого prefix_sum(index + 1) > value)"""
+        index = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = index + step
+            if nxt <= self.size and self.tree[nxt] <= value:
+                index = nxt
+                value -= self.tree[nxt]
+            step >>= 1
+        return index
+
+
+class _IndexView:
+    """Представление индекса предложений в виде последовательности"""
+
+    def __init__(self, getter, index):
+        self._getter = getter
+        self._index = index
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self._index)
+        if not 0 <= i < len(self._index):
+            raise IndexError(i)
+        return self._getter(i)
+
+    def __iter__(self):
+        for i in range(len(self._index)):
+            yield self._getter(i)
+
+
+class SentenceIndex:
+    """
+    Постоянный индекс предложений документа.
+
+    Текст хранится по абзацам (абзац заканчивается '\\n', через который
+    предложение перейти не может), для каждого абзаца - предложения и их
+    позиции относительно начала абзаца. Абзацы разложены по блокам до
+    2 * BLOCK_SIZE абзацев; внутри блока хранятся накопленные длины и
+    количества предложений, суммы по блокам лежат в деревьях Фенвика.
+    Поэтому абсолютная позиция предложения вычисляется за O(log n), а правка
+    сдвигает все последующие позиции без их перебора. При правке заново
+    разбивается только затронутый диапазон абзацев, а при изменении числа
+    абзацев перестраивается только затронутый блок (переполненный блок
+    делится) и, если меняется число блоков, суммы по блокам.
+
+    С chunk_sizes (см. chunk_sizes()) вместо предложений хранятся фрагменты
+    для синтеза (split_text_into_chunks), а абзацем считаются строки до
+    пустой строки, чтобы короткие строки объединялись. Размеры меняются
+    только вместе с переразбиением всего документа (set_chunk_sizes): в
+    индексе не бывает фрагментов разной длины. pack() сохраняет размеры,
+    load() не загружает индекс, разбитый с другими.
+    """
+
+    # Версия формата pack() и правил разбиения: индекс, сохранённый другой
+    # версией, не загружается
+    PACK_VERSION = 4
+    # Абзацев в блоке после деления переполненного блока
+    BLOCK_SIZE = 256
+
+    def __init__(self, text="", chunk_sizes=None):
+        self.sentences = _IndexView(self.sentence, self)
+        self.positions = _IndexView(self.position, self)
+        self.chunk_sizes = chunk_sizes
+        self._get_text = None
+        self.reset(text)
+
+    def reset(self, text):
+        """Полное переразбиение документа"""
+        self._set_paragraphs([self._segment_paragraph(p) for p in self._split_paragraphs(text)])
+
+    def set_chunk_sizes(self, chunk_sizes, text):
+        """Новые размеры фрагментов: документ text разбивается заново целиком"""
+        if chunk_sizes != self.chunk_sizes:
+            self.chunk_sizes = chunk_sizes
+            self.reset(text)
+
+    def _packed_sizes(self):
+        return tuple(self.chunk_sizes) if self.chunk_sizes is not None else (0, 0, 0)
+
+    def pack(self):
+        """
+        Индекс в виде байтов для хранения: массив uint32 из версии, размеров
+        фрагментов (нули без них), количества абзацев и для каждого абзаца -
+        длины, количества предложений и их границ. Тексты предложений не
+        сохраняются
+        """
+        count = sum(len(block) for block in self._blocks)
+        values = array('I', (self.PACK_VERSION,) + self._packed_sizes() + (count,))
+        for block in self._blocks:
+            for length, _, positions in block:
+                values.append(length)
+                values.append(len(positions))
+                for start, end in positions:
+                    values.append(start)
+                    values.append(end)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values.tobytes()
+
+    def load(self, data, get_text, length=None):
+        """
+        Восстановление индекса из pack() без разбиения текста. Тексты
+        предложений берутся из документа через get_text(start, end) при
+        первом обращении к абзацу. Возвращает False (индекс не меняется),
+        если данные другой версии, разбиты с другими размерами фрагментов,
+        повреждены или не подходят к документу длины length
+        """
+        values = array('I')
+        values.frombytes(data)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        if len(values) < 5 or values[0] != self.PACK_VERSION or tuple(values[1:4]) != self._packed_sizes():
+            return False
+        paragraphs = []
+        i = 5
+        for _ in range(values[4]):
+            size, count = values[i], values[i + 1]
+            bounds = values[i + 2:i + 2 + count * 2]
+            paragraphs.append((size, None, list(zip(bounds[::2], bounds[1::2]))))
+            i += 2 + count * 2
+        if i != len(values) or length is not None and sum(p[0] for p in paragraphs) != length:
+            return False
+        self._get_text = get_text
+        self._set_paragraphs(paragraphs)
+        return True
+
+    @property
+    def length(self):
+        """Длина проиндексированного текста"""
+        return self._lengths.prefix_sum(len(self._blocks))
+
+    def __len__(self):
+        return self._counts.prefix_sum(len(self._blocks))
+
+    def sentence(self, i):
+        block, local, sentence = self._locate_sentence(i)
+        length, sentences, positions = self._blocks[block][local]
+        if sentences is None:
+            # Абзац загружен из load(): тексты предложений по их границам
+            offset = self._paragraph_start(block, local)
+            text = self._get_text(offset, offset + length)
+            sentences = [text[start:end].strip() for start, end in positions]
+            self._blocks[block][local] = (length, sentences, positions)
+        return sentences[sentence]
+
+    def position(self, i):
+        block, local, sentence = self._locate_sentence(i)
+        offset = self._paragraph_start(block, local)
+        start, end = self._blocks[block][local][2][sentence]
+        return start + offset, end + offset
+
+    def find(self, position):
+        """Номер предложения, содержащего позицию документа (или ближайшего следующего)"""
+        block, local, start = self._paragraph_at(position)
+        if block >= len(self._blocks):
+            return max(len(self) - 1, 0)
+        local_pos = position - start
+        before = self._counts.prefix_sum(block) + (self._count_sums[block][local - 1] if local else 0)
+        positions = self._blocks[block][local][2]
+        for j, (_, end) in enumerate(positions):
+            if local_pos < end:
+                return before + j
+        return min(before + len(positions), max(len(self) - 1, 0))
+
+    def apply_change(self, position, removed, added, get_text):
+        """
+        Обновление индекса после правки документа (сигнал
+        QTextDocument.contentsChange). get_text(start, end) возвращает
+        фрагмент нового текста документа.
+        """
+        old_length = self.length
+        if not self._blocks or position + removed >= old_length and position == 0:
+            self.reset(get_text(0, old_length - removed + added))
+            return
+        removed = min(removed, old_length - position)
+
+        first = self._paragraph_at(min(position, old_length - 1))
+        last = self._paragraph_at(min(position + removed, old_length - 1))
+        if self.chunk_sizes is not None:
+            # Правка пустой строки в конце абзаца соединяет его со следующим
+            last = self._next_paragraph(last)
+        start = first[2]
+        old_end = last[2] + self._blocks[last[0]][last[1]][0]
+        new_end = old_end - removed + added
+
+        new_paragraphs = [self._segment_paragraph(p)
+                          for p in self._split_paragraphs(get_text(start, new_end))]
+        self._replace(first[0], first[1], last[0], last[1], new_paragraphs)
+
+    def _set_paragraphs(self, paragraphs):
+        size = self.BLOCK_SIZE
+        self._blocks = [paragraphs[i:i + size] for i in range(0, len(paragraphs), size)]
+        self._length_sums = [self._lengths_of(block) for block in self._blocks]
+        self._count_sums = [self._counts_of(block) for block in self._blocks]
+        self._rebuild_trees()
+
+    @staticmethod
+    def _lengths_of(block):
+        """Накопленные длины абзацев блока"""
+        return list(accumulate(p[0] for p in block))
+
+    @staticmethod
+    def _counts_of(block):
+        """Накопленные количества предложений абзацев блока"""
+        return list(accumulate(len(p[2]) for p in block))
+
+    def _rebuild_trees(self):
+        # Блоки не бывают пустыми
+        self._lengths = _FenwickTree([sums[-1] for sums in self._length_sums])
+        self._counts = _FenwickTree([sums[-1] for sums in self._count_sums])
+
+    def _replace(self, first_block, first, last_block, last, paragraphs):
+        """Замена абзацев от (first_block, first) до (last_block, last) включительно"""
+        if first_block == last_block and len(paragraphs) == last - first + 1:
+            # Число абзацев не изменилось: суммы одного блока
+            self._blocks[first_block][first:last + 1] = paragraphs
+            self._update_block(first_block)
+            return
+        merged = self._blocks[first_block][:first] + paragraphs + self._blocks[last_block][last + 1:]
+        size = self.BLOCK_SIZE
+        if len(merged) > 2 * size:
+            blocks = [merged[i:i + size] for i in range(0, len(merged), size)]
+        else:
+            blocks = [merged] if merged else []
+        self._blocks[first_block:last_block + 1] = blocks
+        if len(blocks) == last_block - first_block + 1:
+            for block in range(first_block, last_block + 1):
+                self._update_block(block)
+            return
+        # Изменилось число блоков: суммы по блокам строятся заново
+        self._length_sums[first_block:last_block + 1] = [self._lengths_of(block) for block in blocks]
+        self._count_sums[first_block:last_block + 1] = [self._counts_of(block) for block in blocks]
+        self._rebuild_trees()
+
+    def _update_block(self, block):
+        lengths = self._lengths_of(self._blocks[block])
+        counts = self._counts_of(self._blocks[block])
+        self._lengths.add(block, lengths[-1] - self._length_sums[block][-1])
+        self._counts.add(block, counts[-1] - self._count_sums[block][-1])
+        self._length_sums[block] = lengths
+        self._count_sums[block] = counts
+
+    def _paragraph_start(self, block, local):
+        return self._lengths.prefix_sum(block) + (self._length_sums[block][local - 1] if local else 0)
+
+    def _paragraph_at(self, position):
+        """
+        Абзац, содержащий позицию документа: (блок, номер в блоке, начало
+        абзаца); для позиции за концом текста - (число блоков, 0, длина)
+        """
+        block = self._lengths.find(position)
+        if block >= len(self._blocks):
+            return block, 0, self.length
+        before = self._lengths.prefix_sum(block)
+        sums = self._length_sums[block]
+        local = bisect.bisect_right(sums, position - before)
+        return block, local, before + (sums[local - 1] if local else 0)
+
+    def _next_paragraph(self, paragraph):
+        block, local, start = paragraph
+        start += self._blocks[block][local][0]
+        if local + 1 < len(self._blocks[block]):
+            return block, local + 1, start
+        if block + 1 < len(self._blocks):
+            return block + 1, 0, start
+        return paragraph
+
+    def _locate_sentence(self, i):
+        """(блок, номер абзаца в блоке, номер предложения в абзаце)"""
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        block = self._counts.find(i)
+        i -= self._counts.prefix_sum(block)
+        sums = self._count_sums[block]
+        local = bisect.bisect_right(sums, i)
+        return block, local, i - (sums[local - 1] if local else 0)
+
+    def _split_paragraphs(self, text):
+        parts = text.split('\n')
+        paragraphs = [part + '\n' for part in parts[:-1]]
+        if parts[-1]:
+            paragraphs.append(parts[-1])
+        if self.chunk_sizes is None:
+            return paragraphs
+        # Абзац фрагментов - строки до пустой строки включительно
+        blocks = []
+        start = 0
+        for i, line in enumerate(paragraphs):
+            if not line.strip():
+                blocks.append("".join(paragraphs[start:i + 1]))
+                start = i + 1
+        if start < len(paragraphs):
+            blocks.append("".join(paragraphs[start:]))
+        return blocks
+
+    def _segment_paragraph(self, paragraph):
+        if self.chunk_sizes is not None:
+            sentences, positions = split_text_into_chunks(paragraph, self.chunk_sizes)
+        else:
+            sentences, positions = split_text_into_sentences(paragraph)
+        return len(paragraph), sentences, positions
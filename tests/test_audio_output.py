@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+import wave
+
+from audio_output import BufferedEngine, FileSink, NullSink, RingBuffer
+from tts_engine import FakeEngine, SAMPLE_RATE, SAMPLE_WIDTH, pcm_to_wav, wav_to_pcm
+
+SENTENCES = ["Первое предложение для вывода.", "Второе.", "Третье, самое длинное предложение текста.",
+             "Четвёртое предложение."]
+
+
+class NoisyEngine(FakeEngine):
+    # Звук зависит от текста, чтобы совпадение проверялось по содержимому
+    calls = 0
+
+    def synthesize(self, text):
+        NoisyEngine.calls += 1
+        frames = int(self.duration(text) * SAMPLE_RATE)
+        return pcm_to_wav(random.Random(text).randbytes(frames * SAMPLE_WIDTH))
+
+
+def factory():
+    # Речь ускорена, чтобы звук длился доли секунды
+    return NoisyEngine(chars_per_second=300)
+
+
+def expected_pcm():
+    return b"".join(wav_to_pcm(factory().synthesize(sentence))[0] for sentence in SENTENCES)
+
+
+def play(engine):
+    """Постановка всех предложений; возвращает событие окончания последнего"""
+    finished = threading.Event()
+    engine.on_end_stream = lambda stream_number: stream_number == len(SENTENCES) and finished.set()
+    for sentence in SENTENCES:
+        engine.speak(sentence)
+    return finished
+
+
+def read_frames(path):
+    with wave.open(path, "rb") as wav:
+        return wav.readframes(wav.getnframes())
+
+
+def test_ring_buffer_wraparound():
+    buffer = RingBuffer(10)
+    assert buffer.write(b"abcdefgh") == 8
+    assert buffer.read(6) == b"abcdef"
+    # Запись переходит через конец массива, лишнее не берётся
+    assert buffer.write(b"123456789") == 8
+    assert len(buffer) == 10 and buffer.free() == 0
+    assert buffer.write(b"x") == 0
+    assert buffer.read(4) == b"gh12"
+    assert buffer.write(b"ABCD") == 4
+    assert buffer.read(100) == b"345678ABCD"
+    assert len(buffer) == 0
+    assert buffer.read(5) == b""
+    buffer.write(b"xyz")
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.free() == 10
+
+
+def test_ring_buffer_random_against_bytes():
+    rng = random.Random(5)
+    buffer = RingBuffer(37)
+    model = b""
+    for _ in range(2000):
+        if rng.random() < 0.5:
+            data = rng.randbytes(rng.randrange(50))
+            count = buffer.write(data)
+            assert count == min(len(data), 37 - len(model))
+            model += data[:count]
+        else:
+            size = rng.randrange(50)
+            assert buffer.read(size) == model[:size]
+            model = model[size:]
+        assert len(buffer) == len(model)
+
+
+def test_file_sink_gets_exact_audio(tmp_path):
+    path = str(tmp_path / "output.wav")
+    NoisyEngine.calls = 0
+    engine = BufferedEngine(factory, FileSink(path))
+    finished = play(engine)
+    assert finished.wait(5)
+    engine.close()
+    # Один синтез на предложение
+    assert NoisyEngine.calls == len(SENTENCES)
+    assert read_frames(path) == expected_pcm()
+
+
+def test_pause_resume_is_sample_exact(tmp_path):
+    path = str(tmp_path / "output.wav")
+    NoisyEngine.calls = 0
+    engine = BufferedEngine(factory, FileSink(path, buffer_ms=20, realtime=True))
+    total = sum(factory().duration(sentence) for sentence in SENTENCES)
+    finished = play(engine)
+    started = time.monotonic()
+    for point in (0.1, 0.35, 0.6):
+        time.sleep(max(0.0, started + point * total - time.monotonic()))
+        engine.pause()
+        time.sleep(0.05)
+        assert engine.is_speaking()
+        engine.resume()
+        started += 0.05
+    assert finished.wait(10)
+    engine.close()
+    # После паузы звук продолжается с того же отсчёта, без повторов и синтеза
+    assert NoisyEngine.calls == len(SENTENCES)
+    assert read_frames(path) == expected_pcm()
+
+
+def test_pause_stops_null_sink_clock():
+    clock = [0.0]
+    sink = NullSink(buffer_ms=100, clock=lambda: clock[0])
+    sink.open(SAMPLE_RATE, 1, SAMPLE_WIDTH)
+    assert sink.write(bytes(SAMPLE_RATE * SAMPLE_WIDTH)) == SAMPLE_RATE // 10 * SAMPLE_WIDTH
+    clock[0] = 0.05
+    half = SAMPLE_RATE // 20 * SAMPLE_WIDTH
+    assert sink.played() == half
+    sink.pause()
+    clock[0] = 1.0
+    assert sink.played() == half
+    sink.resume()
+    clock[0] = 1.02
+    assert sink.played() == half + int(0.02 * SAMPLE_RATE) * SAMPLE_WIDTH
+    sink.reset()
+    clock[0] = 2.0
+    assert sink.played() == half + int(0.02 * SAMPLE_RATE) * SAMPLE_WIDTH
+
+
+def test_purge_drops_queued_streams():
+    engine = BufferedEngine(factory, NullSink(buffer_ms=20))
+    ended = []
+    engine.on_end_stream = ended.append
+    long_wav = factory().synthesize("а" * 3000)
+    engine.speak_audio(long_wav)
+    engine.speak_audio(long_wav)
+    time.sleep(0.05)
+    engine.purge()
+    assert not engine.is_speaking()
+    finished = threading.Event()
+    engine.on_end_stream = lambda stream_number: (ended.append(stream_number), finished.set())
+    stream_number = engine.speak(SENTENCES[1])
+    assert finished.wait(5)
+    engine.close()
+    assert ended == [stream_number]
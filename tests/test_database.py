@@ -0,0 +1,139 @@
+import sqlite3
+
+import pytest
+
+from benchmark import make_corpus
+from database import MIGRATIONS, DatabaseManager, _migration_initial
+from text_storage import CHUNKED_THRESHOLD
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "texts.db"))
+    yield manager
+    manager.close()
+
+
+def large_text(seed=0):
+    # Больше CHUNKED_THRESHOLD символов (в UTF-8 кириллица - два байта)
+    text = make_corpus(CHUNKED_THRESHOLD * 2 + 300000, seed)
+    assert len(text) >= CHUNKED_THRESHOLD
+    return text
+
+
+def content(db, text_id):
+    return "".join(db.iter_text_content(text_id))
+
+
+def check_refcounts(db):
+    """refcount каждой части равен числу ссылок на неё, частей без ссылок нет"""
+    rows = db.conn.execute('''
+        SELECT b.refcount,
+               (SELECT count(*) FROM revision_blobs AS r WHERE r.blob_id = b.id)
+               + (SELECT count(*) FROM text_chunks AS c WHERE c.blob_id = b.id)
+        FROM blobs AS b
+    ''').fetchall()
+    for refcount, references in rows:
+        assert refcount == references > 0
+    return len(rows)
+
+
+def test_migrate_baseline_schema(tmp_path):
+    path = str(tmp_path / "texts.db")
+    # База прежней версии программы: исходные таблицы, user_version = 0
+    conn = sqlite3.connect(path)
+    _migration_initial(conn.cursor())
+    conn.execute("INSERT INTO categories (name) VALUES ('Книги')")
+    conn.execute("INSERT INTO texts (category_id, title, content) VALUES (1, 'Повесть', 'Старый текст о лесе.')")
+    conn.commit()
+    conn.close()
+
+    db = DatabaseManager(path)
+    try:
+        assert db.schema_version() == len(MIGRATIONS) == DatabaseManager.SCHEMA_VERSION
+        assert [row[:2] for row in db.get_text_list(1)] == [(1, "Повесть")]
+        assert content(db, 1) == "Старый текст о лесе."
+        assert [row[0] for row in db.search_texts("лес")] == [1]
+        # Прежние тексты можно править: появляется история и хэш
+        db.update_text(1, "Повесть", "Новый текст.")
+        assert content(db, 1) == "Новый текст."
+        assert len(db.get_revisions(1)) == 2
+    finally:
+        db.close()
+
+    # Повторное открытие ничего не мигрирует заново
+    db = DatabaseManager(path)
+    try:
+        assert db.schema_version() == len(MIGRATIONS)
+        assert content(db, 1) == "Новый текст."
+    finally:
+        db.close()
+
+
+def test_chunked_round_trip(db):
+    category_id = db.add_category("Книги")
+    text = large_text()
+    text_id = db.save_text(category_id, "Роман", "")
+    db.update_texts([(text_id, "Роман", text)])
+    assert content(db, text_id) == text
+    chunks = db.conn.execute('SELECT count(*) FROM text_chunks WHERE text_id = ?', (text_id,)).fetchone()[0]
+    assert chunks > 1
+
+    # Правка в середине переписывает только затронутые части
+    middle = len(text) // 2
+    edited = text[:middle] + " Вставка посередине. " + text[middle:]
+    written = db.update_texts([(text_id, "Роман", edited)])
+    assert content(db, text_id) == edited
+    assert 0 < written < len(edited.encode("utf-8")) // 10
+    check_refcounts(db)
+
+
+def test_search_finds_inflected_word(db):
+    category_id = db.add_category("Книги")
+    db.save_text(category_id, "Сказка", "На берегу стоял старый корабль.")
+    other = db.save_text(category_id, "Заметка", "Про горы и реки.")
+    text = large_text(1)
+    middle = len(text) // 2
+    chunked = db.save_text(category_id, "Роман", text[:middle] + " Ёжики смотрели на корабли. " + text[middle:])
+
+    found = {row[0]: row for row in db.search_texts("кораблями")}
+    assert other not in found
+    assert len(found) == 2
+    # Позиции указывают на слово в тексте, у текста частями - от начала текста
+    position, length = found[chunked][4][0]
+    assert content(db, chunked)[position:position + length] == "корабли"
+    assert "[" in found[chunked][3]
+    # "ё" ищется как "е"
+    assert [row[0] for row in db.search_texts("ежик")] == [chunked]
+
+
+def test_restore_revision(db):
+    category_id = db.add_category("Книги")
+    text = large_text(2)
+    text_id = db.save_text(category_id, "Роман", text)
+    first = check_refcounts(db)
+    middle = len(text) // 2
+    edited = text[:middle] + " Первая правка. " + text[middle + 5000:]
+    db.update_texts([(text_id, "Роман, вторая редакция", edited)])
+    revisions = db.get_revisions(text_id)
+    assert len(revisions) == 2
+    assert check_refcounts(db) > first
+
+    old_revision = revisions[-1][0]
+    assert "".join(db.iter_revision_content(old_revision)) == text
+    assert db.restore_revision(old_revision) == text_id
+    assert content(db, text_id) == text
+    assert db.get_text_list(category_id)[0][1] == "Роман"
+    # Восстановленный текст снова ссылается на прежние части
+    check_refcounts(db)
+
+    # Удаление версий освобождает части, на которые больше нет ссылок
+    def delete_history(cursor):
+        cursor.execute('DELETE FROM revisions WHERE text_id = ?', (text_id,))
+
+    db.write(delete_history).result()
+    assert check_refcounts(db) == first
+    assert content(db, text_id) == text
+
+    with pytest.raises(ValueError):
+        db.restore_revision(old_revision)
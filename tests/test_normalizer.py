@@ -0,0 +1,57 @@
+from normalizer import normalize
+
+
+def test_symbol_before_number():
+    normalized = normalize("Номер №7")
+    assert normalized.text == "Номер номер семь"
+    # Добавленный пробел входит в замену знака
+    assert normalized.original_span(len("Номер "), len("номер")) == (6, 1)
+    assert normalized.original_span(len("Номер номер "), len("семь")) == (7, 1)
+    assert normalize("§3 и § 12").text == "параграф три и параграф двенадцать"
+
+
+def test_cardinal_suffixes():
+    assert normalize("В 2-х томах").text == "В двух томах"
+    assert normalize("у 5-ти детей").text == "у пяти детей"
+    assert normalize("из 22-х глав").text == "из двадцати двух глав"
+    assert normalize("7-ми этажный").text == "семи этажный"
+    # Порядковые с тем же окончанием
+    assert normalize("в 90-х годах").text == "в девяностых годах"
+    assert normalize("в 5-х классах").text == "в пятых классах"
+    assert normalize("2-й том").text == "второй том"
+
+
+def test_gender_of_one_and_two():
+    assert normalize("В 21 веке").text == "В двадцать первом веке"
+    assert normalize("21 день").text == "двадцать один день"
+    assert normalize("21 книга").text == "двадцать одна книга"
+    assert normalize("1 окно").text == "одно окно"
+    assert normalize("на 1 неделю").text == "на одну неделю"
+    assert normalize("2 книги").text == "две книги"
+
+
+def test_ordinal_before_century_and_day():
+    assert normalize("21 век").text == "двадцать первый век"
+    assert normalize("до 20 века").text == "до двадцатого века"
+    assert normalize("с 5 числа").text == "с пятого числа"
+
+
+def test_dotted_groups():
+    assert normalize("IP 192.168.0.1").text == "IP сто девяносто два точка сто шестьдесят восемь точка ноль точка один"
+    assert normalize("версия 3.10.2").text == "версия три точка десять точка два"
+    # Дата и дробь читаются по-прежнему
+    assert normalize("12.03.1999").text == "двенадцатое марта тысяча девятьсот девяносто девятого года"
+    assert normalize("3.5 кг").text == "три целых пять десятых килограмма"
+
+
+def test_year_range():
+    assert normalize("Было 1990-1995 гг.").text == \
+        "Было тысяча девятьсот девяностого — тысяча девятьсот девяносто пятого годов"
+    assert normalize("в 1990–1995 годах").text == \
+        "в тысяча девятьсот девяностом — тысяча девятьсот девяносто пятом годах"
+
+
+def test_day_before_month():
+    assert normalize("С 1 по 10 мая").text == "С первого по десятое мая"
+    assert normalize("1 мая").text == "первое мая"
+    assert normalize("к 5 мая").text == "к пятому мая"
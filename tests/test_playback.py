@@ -0,0 +1,84 @@
+from playback import SentenceQueue
+from render_cache import RenderCache
+from tts_engine import FakeEngine
+
+SENTENCES = ["Первое предложение.", "Второе.", "Третье предложение подлиннее.",
+             "Четвёртое.", "Пятое предложение.", "Шестое."]
+
+
+def play(queue, engine, start=0):
+    """Воспроизведение до конца; возвращает номера предложений по событиям начала потока"""
+    started = []
+    queued = []
+
+    def on_start(stream_number):
+        started.append(queue.index_of(stream_number))
+        queued.append(len(engine.enqueued) - len(engine.spoken))
+
+    engine.on_start_stream = on_start
+    engine.on_end_stream = queue.finish
+    queue.start(start)
+    engine.run_until_idle()
+    return started, queued
+
+
+def test_enqueue_order_and_lookahead():
+    engine = FakeEngine()
+    queue = SentenceQueue(engine, SENTENCES, lookahead=2)
+    started, queued = play(queue, engine)
+    assert [text for _, text, _ in engine.enqueued] == SENTENCES
+    assert [text for _, text, _, _ in engine.spoken] == SENTENCES
+    # В движке не больше текущего и lookahead следующих предложений
+    assert max(queued) == 3
+    assert started == list(range(len(SENTENCES)))
+    # Следующее предложение начинается сразу по окончании предыдущего
+    for previous, following in zip(engine.spoken, engine.spoken[1:]):
+        assert following[2] == previous[3]
+    assert queue.current_index is None
+
+
+def test_stream_to_sentence_mapping_from_middle():
+    engine = FakeEngine()
+    queue = SentenceQueue(engine, SENTENCES, lookahead=1)
+    started, _ = play(queue, engine, start=3)
+    assert started == [3, 4, 5]
+    # Потоки нумеруются движком, предложения - с места начала
+    engine.on_end_stream = None
+    queue.start(2)
+    assert queue.current_index == 2
+    assert queue.index_of(4) == 2
+    assert queue.index_of(5) == 3
+    assert queue.index_of(6) is None
+    assert queue.index_of(1) is None
+
+
+def test_purge_ignores_interrupted_streams():
+    engine = FakeEngine()
+    queue = SentenceQueue(engine, SENTENCES, lookahead=2)
+    engine.on_end_stream = queue.finish
+    queue.start(0)
+    engine.advance(0.5)
+    queue.purge()
+    assert queue.current_index is None
+    # Прерванный поток и стоявшие за ним очередь не трогают
+    assert not queue.finish(1)
+    assert not queue.finish(2)
+    assert not engine.is_speaking()
+    queue.start(4)
+    engine.run_until_idle()
+    assert [text for _, text, _, _ in engine.spoken[1:]] == SENTENCES[4:]
+
+
+def test_cached_sentences_play_from_audio(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    engine = FakeEngine()
+    queue = SentenceQueue(engine, SENTENCES, lookahead=2, cache=cache)
+    started, _ = play(queue, engine)
+    assert started == list(range(len(SENTENCES)))
+    assert cache.stats()["entries"] == cache.misses == len(SENTENCES)
+    # Второй проход целиком из кэша, длительность известна заранее
+    stream_number = len(engine.enqueued) + 1
+    queue.start(0)
+    assert abs(queue.audio_duration(stream_number) - engine.duration(SENTENCES[0])) < 0.001
+    engine.run_until_idle()
+    assert cache.hits == len(SENTENCES)
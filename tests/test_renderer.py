@@ -0,0 +1,84 @@
+import threading
+import time
+
+from render_cache import RenderCache
+from renderer import RenderPool
+from tts_engine import FakeEngine
+
+SENTENCES = [f"Предложение номер {index}." for index in range(20)]
+
+
+class GatedEngine(FakeEngine):
+    # Синтез ждёт разрешения, чтобы задачи успевали накопиться в очереди
+    gate = threading.Event()
+    entered = threading.Event()
+    order = []
+
+    def synthesize(self, text):
+        self.entered.set()
+        self.gate.wait(5)
+        self.order.append(SENTENCES.index(text))
+        return super().synthesize(text)
+
+
+def make_pool(tmp_path, depth=8):
+    GatedEngine.gate.clear()
+    GatedEngine.entered.clear()
+    GatedEngine.order = []
+    return RenderPool(GatedEngine, RenderCache(str(tmp_path)), workers=1, depth=depth)
+
+
+def wait_idle(pool):
+    deadline = time.monotonic() + 5
+    while pool.pending() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert not pool.pending()
+
+
+def wait_started():
+    # Единственный поток взял первую задачу и ждёт на синтезе
+    assert GatedEngine.entered.wait(5)
+
+
+def test_nearest_sentences_first(tmp_path):
+    pool = make_pool(tmp_path)
+    engine = FakeEngine()
+    pool.schedule(SENTENCES, 0, engine)
+    wait_started()
+    # Перемотка: новое окно вытесняет не начатые задачи старого
+    pool.schedule(SENTENCES, 5, engine)
+    assert pool.cancelled == 4
+    GatedEngine.gate.set()
+    wait_idle(pool)
+    pool.close()
+    assert GatedEngine.order == [0] + list(range(5, 13))
+    assert pool.rendered == 9
+    for index, text in enumerate(SENTENCES[:13]):
+        assert (pool.cache.key_for(engine, text) in pool.cache) == (index == 0 or index >= 5)
+
+
+def test_cached_sentences_are_skipped(tmp_path):
+    pool = make_pool(tmp_path, depth=4)
+    engine = FakeEngine()
+    GatedEngine.gate.set()
+    pool.schedule(SENTENCES, 0, engine)
+    wait_idle(pool)
+    pool.schedule(SENTENCES, 2, engine)
+    wait_idle(pool)
+    pool.close()
+    assert GatedEngine.order == [0, 1, 2, 3, 4, 5]
+
+
+def test_cancel(tmp_path):
+    pool = make_pool(tmp_path)
+    engine = FakeEngine()
+    pool.schedule(SENTENCES, 0, engine)
+    wait_started()
+    pool.cancel()
+    assert pool.cancelled == 7
+    GatedEngine.gate.set()
+    wait_idle(pool)
+    pool.close()
+    # Начатая задача доводится до конца, остальные не синтезируются
+    assert GatedEngine.order == [0]
+    assert pool.rendered == 1
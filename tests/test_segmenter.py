@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from benchmark import make_corpus
+from segmenter import SentenceIndex, chunk_sizes, split_text_into_chunks, split_text_into_sentences
+
+EDITS = ["", "\n", "\n\n", "x", " Слово. ", "— Ага.\n", "  "]
+
+
+def make_text(seed):
+    # Корпус с диалогами и пустыми строками, в том числе из одних пробелов
+    rng = random.Random(seed)
+    lines = make_corpus(20000, seed).split("\n")
+    return "\n".join(line if rng.random() < 0.7 else "— Да.\n— Нет, " + line[:30] + "\n\n  \n"
+                     for line in lines)
+
+
+def assert_same_as_fresh(index, text, sizes):
+    fresh = SentenceIndex(text, chunk_sizes=sizes)
+    assert list(index.positions) == list(fresh.positions)
+    assert list(index.sentences) == list(fresh.sentences)
+    assert index.length == len(text)
+    if sizes is not None:
+        chunks = split_text_into_chunks(text, sizes)[1]
+        assert [sentence.strip() for sentence in index.sentences] == \
+            [text[start:end].strip() for start, end in chunks if text[start:end].strip()]
+
+
+@pytest.mark.parametrize("block_size", [SentenceIndex.BLOCK_SIZE, 2])
+@pytest.mark.parametrize("sizes", [None, chunk_sizes()], ids=["sentences", "chunks"])
+def test_random_edits_match_reset(sizes, block_size, monkeypatch):
+    # С маленькими блоками правки делят, объединяют и удаляют блоки
+    monkeypatch.setattr(SentenceIndex, "BLOCK_SIZE", block_size)
+    rng = random.Random(1)
+    text = make_text(1)
+    index = SentenceIndex(text, chunk_sizes=sizes)
+    assert_same_as_fresh(index, text, sizes)
+    for _ in range(300):
+        position = rng.randrange(len(text) + 1)
+        removed = min(rng.choice([0, 0, 1, 2, 5, 40, 300]), len(text) - position)
+        inserted = rng.choice(EDITS)
+        new_text = text[:position] + inserted + text[position + removed:]
+        index.apply_change(position, removed, len(inserted), lambda start, end: new_text[start:end])
+        text = new_text
+        assert_same_as_fresh(index, text, sizes)
+    # Упакованный индекс восстанавливается только с теми же размерами фрагментов
+    data = index.pack()
+    loaded = SentenceIndex(chunk_sizes=sizes)
+    assert loaded.load(data, lambda start, end: text[start:end], len(text))
+    assert list(loaded.positions) == list(index.positions)
+    if sizes is not None:
+        other = SentenceIndex(chunk_sizes=chunk_sizes(2.0))
+        assert not other.load(data, lambda start, end: text[start:end], len(text))
+
+
+def test_set_chunk_sizes_resegments():
+    text = make_text(2)
+    index = SentenceIndex(text, chunk_sizes=chunk_sizes())
+    index.set_chunk_sizes(chunk_sizes(2.0), text)
+    assert list(index.positions) == list(SentenceIndex(text, chunk_sizes=chunk_sizes(2.0)).positions)
+
+
+def test_abbreviations_before_capital_end_sentence():
+    assert split_text_into_sentences("Цена 3 руб. Это дорого.")[0] == ["Цена 3 руб.", "Это дорого."]
+    assert len(split_text_into_sentences("Было 5 тыс. Потом больше.")[0]) == 2
+    assert len(split_text_into_sentences("Итого 2 млрд. Хватит.")[0]) == 2
+    assert len(split_text_into_sentences("В 1990 г. Началась война.")[0]) == 2
+    assert len(split_text_into_sentences("1990-1995 гг. Было трудно.")[0]) == 2
+    # Перед строчной буквой и «г.» без числа (город) - не конец
+    assert len(split_text_into_sentences("20 коп. и 3 руб. в кассе.")[0]) == 1
+    assert len(split_text_into_sentences("Живу в г. Москва давно.")[0]) == 1
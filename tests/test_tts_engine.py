@@ -0,0 +1,55 @@
+from tts_engine import FakeEngine, SAMPLE_RATE, create_engine, wav_duration, wav_to_pcm
+
+
+def record(engine):
+    events = []
+    engine.on_start_stream = lambda stream_number: events.append(("start", stream_number, engine.clock))
+    engine.on_end_stream = lambda stream_number: events.append(("end", stream_number, engine.clock))
+    engine.on_word = lambda stream_number, position, length: events.append(("word", stream_number, position, length))
+    return events
+
+
+def test_events_in_order():
+    engine = FakeEngine(chars_per_second=10)
+    events = record(engine)
+    assert engine.speak("Один два") == 1
+    assert engine.speak("Три") == 2
+    assert engine.is_speaking()
+    engine.run_until_idle()
+    assert events == [("start", 1, 0.0), ("word", 1, 0, 4), ("word", 1, 5, 3), ("end", 1, 0.8),
+                      ("start", 2, 0.8), ("word", 2, 0, 3), ("end", 2, 0.8 + 0.3)]
+    assert not engine.is_speaking()
+
+
+def test_pause_shifts_events():
+    engine = FakeEngine(chars_per_second=10)
+    events = record(engine)
+    engine.speak("Один два")
+    engine.advance(0.2)
+    engine.pause()
+    engine.advance(1.0)
+    assert events[-1][0] == "word" and len(events) == 2
+    engine.resume()
+    engine.run_until_idle()
+    assert events[-1] == ("end", 1, 1.8)
+
+
+def test_purge_ends_current_stream_only():
+    engine = FakeEngine(chars_per_second=10)
+    events = record(engine)
+    engine.speak("Один два")
+    engine.speak("Три")
+    engine.advance(0.3)
+    engine.purge()
+    engine.run_until_idle()
+    assert [event[:2] for event in events if event[0] != "word"] == [("start", 1), ("end", 1)]
+    assert engine.spoken == [(1, "Один два", 0.0, 0.3)]
+
+
+def test_synthesized_audio_matches_duration():
+    engine = create_engine("fake")
+    wav = engine.synthesize("Десять букв")
+    assert abs(wav_duration(wav) - engine.duration("Десять букв")) < 1 / SAMPLE_RATE
+    wav, words = engine.synthesize_words("Десять букв")
+    assert [(position, length) for _, position, length in words] == [(0, 6), (7, 4)]
+    assert words[1][0] < len(wav_to_pcm(wav)[0])
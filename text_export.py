@@ -0,0 +1,130 @@
+import os
+import tarfile
+import tempfile
+import zipfile
+
+from audio_export import ExportCancelled, safe_file_name
+
+
+# Форматы экспорта: файлы в папке или один архив
+TEXT_FORMATS = ("txt", "zip", "tar")
+
+# Текст для tar собирается во временном файле (размер записи нужен заранее),
+# в памяти остаётся не больше SPOOL_SIZE байт
+SPOOL_SIZE = 1024 * 1024
+
+
+class TextExporter:
+    """
+    Экспорт текстов категории в txt-файлы или в один архив (zip, tar).
+
+    Тексты читаются из базы по одному (DatabaseManager.iter_texts_by_category)
+    и пишутся по частям, поэтому память не зависит ни от количества, ни от
+    размера текстов. Каждый файл (или архив целиком) пишется во временный
+    ".part" и переименовывается по готовности: при ошибке или отмене
+    недописанных файлов не остаётся. Тексты с одинаковыми заголовками
+    получают имена с номером.
+
+    progress(done, total, title) вызывается из потока экспорта после каждого
+    текста. После export() written - количество записанных текстов, failed -
+    список ошибок.
+    """
+
+    def __init__(self, db, text_format="txt", progress=None):
+        if text_format not in TEXT_FORMATS:
+            raise ValueError(f"Неизвестный формат: {text_format}")
+        self.db = db
+        self.text_format = text_format
+        self.progress = progress
+        self.written = 0
+        self.failed = []
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def export(self, category_id, folder, name):
+        """
+        Экспорт категории в папку folder: txt-файлы во вложенную папку name
+        или архив name.zip / name.tar. Возвращает путь папки или архива
+        """
+        os.makedirs(folder, exist_ok=True)
+        total = self.db.count_texts(category_id)
+        texts = self.db.iter_texts_by_category(category_id)
+        if self.text_format == "txt":
+            return self._export_files(texts, total, os.path.join(folder, name))
+        return self._export_archive(texts, total, os.path.join(folder, f"{name}.{self.text_format}"), name)
+
+    def _export_files(self, texts, total, folder):
+        os.makedirs(folder, exist_ok=True)
+        for done, (text_id, title, pieces, file_name) in enumerate(self._named(texts), 1):
+            path = os.path.join(folder, file_name)
+            try:
+                with open(path + ".part", "w", encoding="utf-8") as f:
+                    for piece in pieces:
+                        f.write(piece)
+                os.replace(path + ".part", path)
+                self.written += 1
+            except OSError as e:
+                self._remove(path + ".part")
+                self.failed.append(f"{title}: {str(e)}")
+            self._report(done, total, title)
+        return folder
+
+    def _export_archive(self, texts, total, path, root):
+        try:
+            if self.text_format == "zip":
+                with zipfile.ZipFile(path + ".part", "w", zipfile.ZIP_DEFLATED) as archive:
+                    for done, (text_id, title, pieces, file_name) in enumerate(self._named(texts), 1):
+                        # force_zip64: размер записи заранее не известен
+                        with archive.open(f"{root}/{file_name}", "w", force_zip64=True) as entry:
+                            for piece in pieces:
+                                entry.write(piece.encode("utf-8"))
+                        self.written += 1
+                        self._report(done, total, title)
+            else:
+                with tarfile.open(path + ".part", "w") as archive:
+                    for done, (text_id, title, pieces, file_name) in enumerate(self._named(texts), 1):
+                        with tempfile.SpooledTemporaryFile(SPOOL_SIZE) as spool:
+                            for piece in pieces:
+                                spool.write(piece.encode("utf-8"))
+                            info = tarfile.TarInfo(f"{root}/{file_name}")
+                            info.size = spool.tell()
+                            spool.seek(0)
+                            archive.addfile(info, spool)
+                        self.written += 1
+                        self._report(done, total, title)
+            os.replace(path + ".part", path)
+        except BaseException:
+            self._remove(path + ".part")
+            raise
+        return path
+
+    def _named(self, texts):
+        """Тексты с уникальными именами файлов; прерывается при отмене"""
+        used_names = set()
+        for text_id, title, pieces in texts:
+            if self._cancelled:
+                raise ExportCancelled()
+            name = safe_file_name(title)
+            suffix = 1
+            while name.lower() in used_names:
+                suffix += 1
+                name = f"{safe_file_name(title)}_{suffix}"
+            used_names.add(name.lower())
+            yield text_id, title, pieces, f"{name}.txt"
+
+    def _report(self, done, total, title):
+        if self.progress is not None:
+            self.progress(done, total, title)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,79 @@
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+from PyQt6.QtGui import QColor
+
+
+NEW_TEXT_ID = -1
+
+
+class TextListModel(QAbstractListModel):
+    """
+    Список текстов категории для textsList с подгрузкой по страницам.
+
+    Из базы читаются только метаданные (get_text_list), содержимое текста
+    загружается при выборе. Строки подгружаются по page_size, когда список
+    прокручивают до конца (canFetchMore/fetchMore), поэтому смена категории
+    не зависит ни от количества, ни от размера текстов. Последняя строка -
+    пункт "Новый текст" с номером NEW_TEXT_ID.
+    """
+
+    def __init__(self, db, category_id, page_size=200, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.category_id = category_id
+        self.page_size = page_size
+        self._rows = []  # (id, title, sort_index, content_length, updated_at)
+        self._exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows) + 1
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if row == len(self._rows):
+            if role == Qt.ItemDataRole.DisplayRole:
+                return "🖊️ Новый текст"
+            if role == Qt.ItemDataRole.UserRole:
+                return NEW_TEXT_ID
+            if role == Qt.ItemDataRole.ForegroundRole:
+                return QColor(0, 255, 255)  # Голубой цвет
+            return None
+        text_id, title, _, content_length, updated_at = self._rows[row]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return title
+        if role == Qt.ItemDataRole.UserRole:
+            return text_id
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{content_length} символов, изменён {updated_at}"
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        rows = self.db.get_text_list(self.category_id, self.page_size, len(self._rows))
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if rows:
+            # Новые строки встают перед пунктом "Новый текст"
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def row_of(self, text_id):
+        """Номер строки текста, при необходимости с подгрузкой страниц, или -1"""
+        start = 0
+        while True:
+            for row in range(start, len(self._rows)):
+                if self._rows[row][0] == text_id:
+                    return row
+            if self._exhausted:
+                return -1
+            start = len(self._rows)
+            self.fetchMore()
@@ -0,0 +1,173 @@
+import re
+
+
+# Стеммер Портера для русского языка (алгоритм Snowball). Окончания каждой
+# группы перечислены от длинных к коротким: отбрасывается самое длинное.
+# Окончания с флагом True отбрасываются только после "а" или "я"
+_VOWELS = "аеиоуыэюя"
+
+
+def _endings(after_a=(), other=()):
+    endings = [(ending, True) for ending in after_a] + [(ending, False) for ending in other]
+    return sorted(endings, key=lambda item: -len(item[0]))
+
+
+_PERFECTIVE_GERUND = _endings(("в", "вши", "вшись"), ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"))
+_REFLEXIVE = _endings(other=("ся", "сь"))
+_ADJECTIVE = _endings(other=(
+    "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом", "его",
+    "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею"))
+_PARTICIPLE = _endings(("ем", "нн", "вш", "ющ", "щ"), ("ивш", "ывш", "ующ"))
+_VERB = _endings(
+    ("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть", "ешь", "нно"),
+    ("ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл", "им", "ым", "ен",
+     "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю"))
+_NOUN = _endings(other=(
+    "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией", "ей", "ой", "ий", "й",
+    "иям", "ям", "ием", "ем", "ам", "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия",
+    "ья", "я"))
+_SUPERLATIVE = _endings(other=("ейше", "ейш"))
+_DERIVATIONAL = _endings(other=("ость", "ост"))
+
+
+def _remove_ending(word, endings):
+    """Слово без самого длинного подходящего окончания или None"""
+    for ending, after_a in endings:
+        if word.endswith(ending):
+            stem = word[:-len(ending)]
+            if after_a and not stem.endswith(("а", "я")):
+                return None
+            return stem
+    return None
+
+
+def _region_start(word, start=0):
+    """Начало области после первой согласной, следующей за гласной"""
+    for i in range(start + 1, len(word)):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            return i + 1
+    return len(word)
+
+
+def stem(word):
+    """Основа русского слова (строчными буквами, "ё" заменяется на "е")"""
+    word = word.lower().replace("ё", "е")
+    rv_start = next((i + 1 for i, char in enumerate(word) if char in _VOWELS), len(word))
+    r2_start = _region_start(word, _region_start(word))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1: деепричастие, иначе возвратная частица и прилагательное,
+    # глагол или существительное
+    result = _remove_ending(rv, _PERFECTIVE_GERUND)
+    if result is None:
+        result = _remove_ending(rv, _REFLEXIVE)
+        if result is not None:
+            rv = result
+        result = _remove_ending(rv, _ADJECTIVE)
+        if result is not None:
+            participle = _remove_ending(result, _PARTICIPLE)
+            if participle is not None:
+                result = participle
+        else:
+            result = _remove_ending(rv, _VERB)
+            if result is None:
+                result = _remove_ending(rv, _NOUN)
+    if result is not None:
+        rv = result
+
+    # Шаг 2
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразующий суффикс в области R2
+    result = _remove_ending(rv, _DERIVATIONAL)
+    if result is not None and rv_start + len(result) >= r2_start:
+        rv = result
+
+    # Шаг 4
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    else:
+        result = _remove_ending(rv, _SUPERLATIVE)
+        if result is not None:
+            rv = result[:-1] if result.endswith("нн") else result
+        elif rv.endswith("ь"):
+            rv = rv[:-1]
+    return prefix + rv
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _query_terms(query):
+    """Слова запроса для индекса: список (слово, как префикс)"""
+    words = _WORD_RE.findall(query)
+    # Однобуквенные слова (предлоги, союзы) есть почти в любом тексте
+    words = [word for word in words if len(word) > 1] or words
+    terms = []
+    for word in words:
+        base = stem(word)
+        if len(base) >= 3:
+            terms.append((base, True))
+        else:
+            terms.append((word.lower().replace("ё", "е"), False))
+    return terms
+
+
+def build_match_query(query):
+    """
+    Запрос FTS5 по словам пользователя: все слова должны встретиться в
+    тексте в любой форме. Каждое слово ищется по основе как префикс
+    ("книгами" -> книг*), короткие основы - как слово целиком
+    """
+    return " AND ".join(f'"{term}"*' if prefix else f'"{term}"' for term, prefix in _query_terms(query))
+
+
+def match_offsets(text, query):
+    """
+    Позиции слов text, совпадающих со словами запроса так же, как в
+    build_match_query: список (позиция, длина). Считается по одному тексту
+    вместо highlight() по всем найденным
+    """
+    terms = _query_terms(query)
+    if not terms:
+        return []
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(term) + (r"\w*" if prefix else r"\b")
+                                             for term, prefix in terms) + ")")
+    folded = text.lower().replace("ё", "е")
+    if len(folded) != len(text):
+        # Редкие символы меняют длину при смене регистра: по одному слову
+        return [(match.start(), match.end() - match.start()) for match in _WORD_RE.finditer(text)
+                if pattern.fullmatch(match.group().lower().replace("ё", "е"))]
+    return [(match.start(), match.end() - match.start()) for match in pattern.finditer(folded)]
+
+
+def make_snippet(text, offsets, marks=("[", "]"), words=16):
+    """
+    Фрагмент text вокруг первого найденного слова: до words слов, найденные
+    слова между marks, пропуски - "…" (как snippet() FTS5). Разбирается
+    только окрестность найденного слова
+    """
+    position = offsets[0][0] if offsets else 0
+    window_start = max(0, position - 20 * words)
+    spans = [match.span() for match in _WORD_RE.finditer(text, window_start, position + 40 * words)]
+    if not spans:
+        return ""
+    first = next((i for i, (start, end) in enumerate(spans) if end > position), 0)
+    # Найденное слово - ближе к началу фрагмента
+    first = max(0, min(first - words // 4, len(spans) - words))
+    if window_start and first == 0:
+        first = min(1, len(spans) - 1)
+    last = min(first + words, len(spans)) - 1
+    start, end = spans[first][0], spans[last][1]
+    pieces = ["…"] if start > 0 and (window_start or first) else []
+    cursor = start
+    for match_start, length in offsets:
+        if match_start < start or match_start + length > end:
+            continue
+        pieces.extend((text[cursor:match_start], marks[0], text[match_start:match_start + length], marks[1]))
+        cursor = match_start + length
+    pieces.append(text[cursor:end])
+    if end < len(text) and _WORD_RE.search(text, end):
+        pieces.append("…")
+    return "".join(pieces)
@@ -0,0 +1,130 @@
+import codecs
+import hashlib
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd необязателен, по умолчанию zlib
+    zstandard = None
+
+
+# Тексты длиннее CHUNKED_THRESHOLD символов хранятся в таблице text_chunks
+# сжатыми частями примерно по CHUNK_CHARS символов
+CHUNK_CHARS = 64 * 1024
+CHUNKED_THRESHOLD = 1024 * 1024
+
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+DEFAULT_CODEC = CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+# Размер порции при потоковом чтении сжатой части
+READ_SIZE = 64 * 1024
+
+
+def split_chunks(text, start=0, end=None, size=CHUNK_CHARS):
+    """
+    Границы частей участка text[start:end]: список (начало, конец). Участок
+    делится на части поровну (не больше size символов), часть
+    заканчивается после пробела или перевода строки во второй половине
+    своего размера, чтобы слова не разрывались (полнотекстовый индекс
+    строится по частям)
+    """
+    end = len(text) if end is None else end
+    bounds = []
+    while start < end:
+        count = -(-(end - start) // size)
+        target = -(-(end - start) // count)
+        stop = start + target
+        if stop < end:
+            cut = max(text.rfind(" ", start + target // 2, stop), text.rfind("\n", start + target // 2, stop))
+            if cut != -1:
+                stop = cut + 1
+        bounds.append((start, stop))
+        start = stop
+    return bounds
+
+
+# Части версий текста (история правок): от REVISION_CHUNK_MIN до
+# REVISION_CHUNK_MAX символов, граница - в среднем на каждой восьмой строке
+REVISION_CHUNK_MIN = 2 * 1024
+REVISION_CHUNK_MAX = 32 * 1024
+_REVISION_CUT_MASK = 7
+
+
+def content_chunks(text):
+    """
+    Границы частей версии текста: список (начало, конец). Часть
+    заканчивается после строки, crc32 которой делится на 8, если набралось
+    не меньше REVISION_CHUNK_MIN символов. Граница зависит от содержимого,
+    а не от позиции, поэтому после правки части дальше по тексту совпадают
+    с частями прежней версии и хранятся один раз. Строка длиннее
+    REVISION_CHUNK_MAX делится split_chunks
+    """
+    bounds = []
+    start = position = 0
+    for line in text.split("\n"):
+        end = min(position + len(line) + 1, len(text))
+        if end - position > REVISION_CHUNK_MAX:
+            if start < position:
+                bounds.append((start, position))
+            bounds.extend(split_chunks(text, position, end, REVISION_CHUNK_MAX))
+            start = end
+        else:
+            if end - start > REVISION_CHUNK_MAX:
+                bounds.append((start, position))
+                start = position
+            if end - start >= REVISION_CHUNK_MIN and not zlib.crc32(line.encode("utf-8")) & _REVISION_CUT_MASK:
+                bounds.append((start, end))
+                start = end
+        position = end
+    if start < len(text):
+        bounds.append((start, len(text)))
+    return bounds
+
+
+def text_digest(text):
+    """
+    Хэш текста или части: по нему находятся неизменившиеся части при
+    сохранении и повторяющиеся тексты при импорте
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def compress(text, codec=DEFAULT_CODEC):
+    data = text.encode("utf-8")
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+
+def decompressor(codec):
+    """Объект с методом decompress() для потокового распаковывания части"""
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Текст сжат zstd: установите модуль zstandard")
+        return zstandard.ZstdDecompressor().decompressobj()
+    return zlib.decompressobj()
+
+
+def iter_chunk(blob, codec):
+    """
+    Текст одной части по порциям: сжатые данные читаются из blob
+    (sqlite3.Blob) по READ_SIZE байт и распаковываются на ходу
+    """
+    unpacker = decompressor(codec)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while True:
+        data = blob.read(READ_SIZE)
+        if not data:
+            break
+        piece = decoder.decode(unpacker.decompress(data))
+        if piece:
+            yield piece
+    piece = decoder.decode(b"", final=True)
+    if piece:
+        yield piece
+
+
+def fold_for_search(text):
+    """Текст для полнотекстового индекса, как _FTS_FOLD в database.py"""
+    return text.replace("ё", "е").replace("Ё", "Е")
@@ -0,0 +1,204 @@
+"""
+Преобразование текста в речь из командной строки, без окна приложения
+(PyQt6 не импортируется).
+
+Запуск:
+    python -m tts_cli book.txt chapters/*.txt -o audio --format ogg --jobs 4
+    cat text.txt | python -m tts_cli --engine espeak > text.wav
+    python -m tts_cli --db texts.db --category "Категория" -o audio --single book
+    python -m tts_cli --list-voices
+"""
+import argparse
+import glob
+import os
+import shutil
+import struct
+import subprocess
+import sys
+
+from audio_export import AudioExporter, ExportCancelled, FORMATS
+from render_cache import RenderCache
+from segmenter import split_text_into_chunks, chunk_sizes
+from tts_engine import create_engine, wav_to_pcm, ENGINES, SAMPLE_RATE, SAMPLE_WIDTH, CHANNELS
+
+
+def log(message):
+    # stdout может быть занят звуком
+    print(message, file=sys.stderr)
+
+
+def read_inputs(patterns, encoding):
+    """
+    Тексты из файлов и шаблонов путей в виде строк get_texts_by_category
+    (id, category_id, title, content); "-" - стандартный ввод
+    """
+    texts = []
+    for pattern in patterns:
+        if pattern == "-":
+            texts.append((None, None, "stdin", sys.stdin.buffer.read().decode(encoding)))
+            continue
+        paths = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        if not paths:
+            log(f"Ошибка: нет файлов по шаблону {pattern}")
+        for path in paths:
+            if os.path.isdir(path):
+                continue
+            with open(path, encoding=encoding) as f:
+                title = os.path.splitext(os.path.basename(path))[0]
+                texts.append((None, None, title, f.read()))
+    return texts
+
+
+def read_category(db_path, category, text=None):
+    """
+    Тексты категории из базы (по названию или номеру), при необходимости
+    один текст, и словарь произношений базы: (тексты, словарь)
+    """
+    from database import DatabaseManager
+    from pronunciation import load_lexicon
+
+    if not os.path.exists(db_path):
+        # DatabaseManager создал бы пустую базу
+        raise RuntimeError(f"База {db_path} не найдена")
+    db = DatabaseManager(db_path)
+    try:
+        category_id = next((c[0] for c in db.get_all_categories() if category in (c[1], str(c[0]))), None)
+        if category_id is None:
+            raise RuntimeError(f"Категория {category} не найдена")
+        texts = db.get_texts_by_category(category_id)
+        lexicon = load_lexicon(db)
+    finally:
+        db.close()
+    if text is not None:
+        texts = [row for row in texts if text in (row[2], str(row[0]))]
+        if not texts:
+            raise RuntimeError(f"Текст {text} не найден в категории {category}")
+    return texts, lexicon
+
+
+def stream_to_stdout(exporter, texts, audio_format):
+    """
+    Синтез всех текстов одним потоком звука в stdout. Заголовок WAV пишется
+    с неизвестной длиной (0xFFFFFFFF), как это делают потоковые программы;
+    OGG и MP3 кодирует ffmpeg на лету
+    """
+    output = sys.stdout.buffer
+    encoder = None
+    if audio_format != "wav":
+        if shutil.which("ffmpeg") is None:
+            raise RuntimeError(f"Для вывода в {audio_format} нужен ffmpeg")
+        encoder = subprocess.Popen(
+            ["ffmpeg", "-loglevel", "error", "-f", "wav", "-i", "-", "-f", audio_format, "-"],
+            stdin=subprocess.PIPE, stdout=output)
+        output = encoder.stdin
+
+    def sentences():
+        for _, _, _, content in texts:
+            yield from split_text_into_chunks(content, chunk_sizes(exporter.speed))[0]
+
+    header_written = False
+    try:
+        for audio in exporter.stream(sentences()):
+            pcm, sample_rate, channels, sample_width = wav_to_pcm(audio)
+            if not header_written:
+                output.write(wav_stream_header(sample_rate, channels, sample_width))
+                header_written = True
+            output.write(pcm)
+            output.flush()
+        if not header_written:
+            output.write(wav_stream_header(SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH))
+    finally:
+        if encoder is not None:
+            encoder.stdin.close()
+            encoder.wait()
+
+
+def wav_stream_header(sample_rate, channels, sample_width):
+    block_align = channels * sample_width
+    return (b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE" +
+            b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate,
+                                  sample_rate * block_align, block_align, sample_width * 8) +
+            b"data" + struct.pack("<I", 0xFFFFFFFF))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tts_cli", description="Преобразование текста в речь")
+    parser.add_argument("inputs", nargs="*",
+                        help="Текстовые файлы или шаблоны (*.txt, **/*.txt); - или без аргументов - stdin")
+    parser.add_argument("-o", "--output", default="-",
+                        help="Папка для аудиофайлов; - (по умолчанию) - один поток звука в stdout")
+    parser.add_argument("--format", choices=FORMATS, default="wav", help="Формат звука (ogg и mp3 через ffmpeg)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 2, help="Потоков синтеза")
+    parser.add_argument("--single", metavar="NAME", help="Собрать все тексты в один файл NAME с главами")
+    parser.add_argument("--db", help="База текстов (texts.db) вместо файлов")
+    parser.add_argument("--category", help="Категория из базы (название или номер)")
+    parser.add_argument("--text", help="Только один текст категории (заголовок или номер)")
+    parser.add_argument("--encoding", default="utf-8", help="Кодировка текстовых файлов")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default=os.environ.get("TTS_ENGINE"),
+                        help="Движок синтеза (по умолчанию TTS_ENGINE или первый доступный)")
+    parser.add_argument("--voice", help="Голос движка")
+    parser.add_argument("--speed", type=float, default=1.0, help="Скорость речи (1.0 - обычная)")
+    parser.add_argument("--cache-dir", default="render_cache", help="Папка кэша синтеза")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш синтеза")
+    parser.add_argument("--list-voices", action="store_true", help="Показать голоса движка и выйти")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Не выводить ход работы")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.list_voices:
+            for voice in create_engine(args.engine).list_voices():
+                print(f"{voice.id}\t{voice.name}\t{voice.language}")
+            return 0
+
+        if args.db or args.category:
+            if not (args.db and args.category):
+                parser.error("--db и --category указываются вместе")
+            if args.inputs:
+                parser.error("файлы и --db нельзя указывать одновременно")
+            texts, lexicon = read_category(args.db, args.category, args.text)
+        else:
+            texts = read_inputs(args.inputs or ["-"], args.encoding)
+            lexicon = None
+        if not texts:
+            log("Ошибка: нет текстов для синтеза")
+            return 1
+
+        if args.output == "-" and sys.stdout.isatty():
+            parser.error("звук не выводится в терминал: укажите папку -o или перенаправьте вывод")
+        if args.output == "-" and args.single:
+            parser.error("--single записывает файл: укажите папку -o")
+
+        def progress(done, total, title):
+            if not args.quiet:
+                log(f"[{done}/{total}] {title}")
+
+        engine_name = args.engine
+        exporter = AudioExporter(lambda: create_engine(engine_name),
+                                 None if args.no_cache else RenderCache(args.cache_dir),
+                                 workers=args.jobs, audio_format=args.format, voice_id=args.voice,
+                                 speed=args.speed, progress=progress, lexicon=lexicon)
+        try:
+            if args.output == "-":
+                stream_to_stdout(exporter, texts, args.format)
+                return 0
+            exporter.export(texts, args.output, single_file=args.single, numbered=args.db is not None)
+        except KeyboardInterrupt:
+            exporter.cancel()
+            log("Прервано, повторный запуск продолжит с готовых файлов")
+            return 130
+        except BrokenPipeError:
+            # Читатель stdout закрыл канал (например, head)
+            return 0
+    except ExportCancelled:
+        return 130
+    except Exception as e:
+        log(f"Ошибка: {e}")
+        return 1
+
+    if not args.quiet:
+        log(f"Записано файлов: {len(exporter.written)}, пропущено готовых: {exporter.skipped}")
+    return 1 if exporter.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,602 @@
+import heapq
+import io
+import os
+import queue
+import re
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import wave
+
+try:
+    import pythoncom
+    import win32com.client
+except ImportError:  # не Windows: SAPI недоступен
+    pythoncom = None
+    win32com = None
+
+
+# Флаги SpeechVoiceSpeakFlags
+SVSF_DEFAULT = 0
+SVSF_ASYNC = 1
+SVSF_PURGE_BEFORE_SPEAK = 2
+SVSF_IS_XML = 8
+SVSF_IS_NOT_XML = 16
+
+# Флаги SpeechVoiceEvents
+SVE_START_INPUT_STREAM = 2
+SVE_END_INPUT_STREAM = 4
+SVE_WORD_BOUNDARY = 32
+SVE_SENTENCE_BOUNDARY = 128
+
+# SpeechRunState
+SRSE_DONE = 1
+
+# SpeechAudioFormatType: 22 кГц, 16 бит, моно
+SAFT_22KHZ_16BIT_MONO = 22
+
+SAMPLE_RATE = 22050
+SAMPLE_WIDTH = 2
+CHANNELS = 1
+
+
+def pcm_to_wav(pcm, sample_rate=SAMPLE_RATE, channels=CHANNELS, sample_width=SAMPLE_WIDTH):
+    """Упаковка PCM-данных в WAV"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(sample_width)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def wav_to_pcm(data):
+    """Распаковка WAV: (pcm, sample_rate, channels, sample_width)"""
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        return (wav.readframes(wav.getnframes()), wav.getframerate(),
+                wav.getnchannels(), wav.getsampwidth())
+
+
+def wav_duration(data):
+    """Длительность WAV в секундах (по заголовку, без распаковки звука)"""
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+class Voice:
+    def __init__(self, id, name, language=""):
+        self.id = id
+        self.name = name
+        self.language = language
+
+
+class TTSEngine:
+    """
+    Базовый класс (протокол) движка синтеза речи. Окно приложения работает
+    только через эти методы и не зависит от конкретного движка.
+
+    Речь синтезируется асинхронно: speak() ставит текст в очередь движка и
+    возвращает номер потока. О ходе воспроизведения движок сообщает через
+    обработчики, которые назначает владелец:
+
+    on_start_stream(stream_number)
+    on_end_stream(stream_number)
+    on_word(stream_number, char_position, length)
+    on_sentence(stream_number, char_position, length)
+
+    Обработчики могут вызываться из потока движка, поэтому GUI должен
+    передавать их в свой поток (например, через сигналы Qt).
+
+    Скорость задаётся множителем: 1.0 - обычная, 2.0 - в два раза быстрее.
+    Текущие голос и скорость доступны в voice_id и speed (по ним, например,
+    строится ключ кэша синтеза).
+
+    supports_ssml - движок принимает документы SSML (начинаются с <speak>),
+    например с фонемами из словаря произношений.
+    """
+
+    name = ""
+    supports_ssml = False
+
+    def __init__(self):
+        self.voice_id = None
+        self.speed = 1.0
+        self.on_start_stream = None
+        self.on_end_stream = None
+        self.on_word = None
+        self.on_sentence = None
+
+    def list_voices(self):
+        """Список доступных голосов (Voice)"""
+        raise NotImplementedError
+
+    def set_voice(self, voice_id):
+        raise NotImplementedError
+
+    def set_rate(self, speed):
+        raise NotImplementedError
+
+    def speak(self, text):
+        """Асинхронное воспроизведение текста, возвращает номер потока"""
+        raise NotImplementedError
+
+    def speak_audio(self, wav):
+        """
+        Асинхронное воспроизведение готового WAV (результата synthesize) в
+        общей очереди с speak(), возвращает номер потока
+        """
+        raise NotImplementedError
+
+    def purge(self):
+        """Остановка воспроизведения и очистка очереди"""
+        raise NotImplementedError
+
+    def pause(self):
+        raise NotImplementedError
+
+    def resume(self):
+        raise NotImplementedError
+
+    def is_speaking(self):
+        raise NotImplementedError
+
+    def synthesize(self, text):
+        """Синхронный синтез текста в WAV (bytes) без воспроизведения"""
+        raise NotImplementedError
+
+    def synthesize_words(self, text):
+        """
+        Синтез с границами слов: (WAV, [(смещение в байтах PCM, позиция
+        в тексте, длина), ...]). Движки без событий слов возвращают пустой
+        список
+        """
+        return self.synthesize(text), []
+
+    def _emit(self, handler, *args):
+        if handler is not None:
+            handler(*args)
+
+
+class _SapiEventSink:
+    """Приёмник COM-событий SpVoice (подключается через WithEvents)"""
+
+    engine = None
+
+    def OnStartStream(self, stream_number, stream_position):
+        self.engine._emit(self.engine.on_start_stream, stream_number)
+
+    def OnEndStream(self, stream_number, stream_position):
+        self.engine._emit(self.engine.on_end_stream, stream_number)
+
+    def OnWord(self, stream_number, stream_position, character_position, length):
+        self.engine._emit(self.engine.on_word, stream_number, character_position, length)
+
+    def OnSentence(self, stream_number, stream_position, character_position, length):
+        self.engine._emit(self.engine.on_sentence, stream_number, character_position, length)
+
+
+class _SapiWordCollector:
+    """Приёмник событий слов при синтезе в поток памяти"""
+
+    words = None
+
+    def OnWord(self, stream_number, stream_position, character_position, length):
+        self.words.append((int(stream_position), character_position, length))
+
+
+class SapiEngine(TTSEngine):
+    """
+    Движок Windows SAPI (SAPI.SpVoice).
+    События приходят через очередь сообщений COM потока, создавшего объект,
+    т.е. в потоке GUI при работающем цикле событий Qt. Объект можно создавать
+    и в фоновом потоке (для synthesize), COM инициализируется для потока.
+    """
+
+    name = "sapi"
+    supports_ssml = True
+
+    def __init__(self):
+        super().__init__()
+        if win32com is None:
+            raise RuntimeError("SAPI доступен только в Windows")
+        pythoncom.CoInitialize()
+        self.voice = win32com.client.Dispatch("SAPI.SpVoice")
+        self.voice.EventInterests = (SVE_START_INPUT_STREAM | SVE_END_INPUT_STREAM |
+                                     SVE_WORD_BOUNDARY | SVE_SENTENCE_BOUNDARY)
+        self._events = win32com.client.WithEvents(self.voice, _SapiEventSink)
+        self._events.engine = self
+        self._tokens = {}
+        self._synth_voice = None
+        self._synth_events = None
+
+    def list_voices(self):
+        voices = []
+        self._tokens.clear()
+        for token in self.voice.GetVoices():
+            self._tokens[token.Id] = token
+            try:
+                language = token.GetAttribute("Language")
+            except Exception:
+                language = ""
+            voices.append(Voice(token.Id, token.GetDescription(), language))
+        return voices
+
+    def set_voice(self, voice_id):
+        if not self._tokens:
+            self.list_voices()
+        self.voice.Voice = self._tokens[voice_id]
+        self.voice_id = voice_id
+
+    def set_rate(self, speed):
+        self.voice.Rate = max(-10, min(10, int((speed - 1) * 10)))
+        self.speed = speed
+
+    def speak(self, text):
+        return self.voice.Speak(text, SVSF_ASYNC | self._text_flags(text))
+
+    def speak_audio(self, wav):
+        pcm = wav_to_pcm(wav)[0]
+        stream = win32com.client.Dispatch("SAPI.SpMemoryStream")
+        stream.Format.Type = SAFT_22KHZ_16BIT_MONO
+        stream.SetData(pcm)
+        return self.voice.SpeakStream(stream, SVSF_ASYNC)
+
+    def purge(self):
+        self.voice.Speak("", SVSF_ASYNC | SVSF_PURGE_BEFORE_SPEAK)
+
+    def pause(self):
+        self.voice.Pause()
+
+    def resume(self):
+        self.voice.Resume()
+
+    def is_speaking(self):
+        return self.voice.Status.RunningState != SRSE_DONE
+
+    def synthesize(self, text):
+        return self._render(text)
+
+    def synthesize_words(self, text):
+        words = []
+        wav = self._render(text, words)
+        return wav, words
+
+    def _render(self, text, words=None):
+        # Отдельный SpVoice, чтобы не мешать воспроизведению
+        if self._synth_voice is None:
+            self._synth_voice = win32com.client.Dispatch("SAPI.SpVoice")
+            self._synth_events = win32com.client.WithEvents(self._synth_voice, _SapiWordCollector)
+        synth = self._synth_voice
+        synth.Voice = self.voice.Voice
+        synth.Rate = self.voice.Rate
+        synth.EventInterests = SVE_WORD_BOUNDARY if words is not None else 0
+        self._synth_events.words = words if words is not None else []
+        stream = win32com.client.Dispatch("SAPI.SpMemoryStream")
+        stream.Format.Type = SAFT_22KHZ_16BIT_MONO
+        synth.AudioOutputStream = stream
+        synth.Speak(text, SVSF_DEFAULT | self._text_flags(text))
+        if words is not None:
+            # События синхронного синтеза ждут в очереди сообщений потока;
+            # смещения в них - байты потока stream
+            pythoncom.PumpWaitingMessages()
+        return pcm_to_wav(bytes(stream.GetData()))
+
+    @staticmethod
+    def _text_flags(text):
+        # Разметка - только SSML от словаря произношений; знаки "<" и "&" в
+        # обычном тексте произносятся как есть
+        return SVSF_IS_XML if text.startswith("<speak") else SVSF_IS_NOT_XML
+
+
+class EspeakEngine(TTSEngine):
+    """
+    Локальный движок espeak-ng (Linux и другие системы без SAPI).
+    Фразы воспроизводятся по очереди отдельным процессом espeak-ng в
+    фоновом потоке. Событий границ слов утилита не сообщает, поэтому
+    приходят только начало/конец потока и начало предложения.
+    """
+
+    name = "espeak"
+    BASE_WORDS_PER_MINUTE = 175
+
+    def __init__(self, executable=None):
+        super().__init__()
+        self.executable = executable or shutil.which("espeak-ng") or shutil.which("espeak")
+        if not self.executable:
+            raise RuntimeError("espeak-ng не найден")
+        # Проигрыватель для готового WAV (speak_audio)
+        self.player = next(([path] + args for path, args in (
+            (shutil.which("aplay"), ["-q", "-"]),
+            (shutil.which("paplay"), []),
+            (shutil.which("ffplay"), ["-nodisp", "-autoexit", "-loglevel", "quiet", "-"]),
+        ) if path), None)
+        self.voice_id = "ru"
+        self.words_per_minute = self.BASE_WORDS_PER_MINUTE
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stream_number = 0
+        self._generation = 0
+        self._process = None
+        self._speaking = False
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def list_voices(self):
+        output = subprocess.run([self.executable, "--voices"], capture_output=True,
+                                text=True, encoding="utf-8").stdout
+        voices = []
+        # Pty Language Age/Gender VoiceName File Other Languages
+        for line in output.splitlines()[1:]:
+            parts = line.split()
+            if len(parts) >= 5:
+                voices.append(Voice(parts[4], f"{parts[3]} ({parts[1]})", parts[1]))
+        return voices
+
+    def set_voice(self, voice_id):
+        self.voice_id = voice_id
+
+    def set_rate(self, speed):
+        self.words_per_minute = int(self.BASE_WORDS_PER_MINUTE * speed)
+        self.speed = speed
+
+    def speak(self, text):
+        return self._enqueue(text, None)
+
+    def speak_audio(self, wav):
+        if self.player is None:
+            raise RuntimeError("Не найден проигрыватель WAV (aplay, paplay, ffplay)")
+        return self._enqueue(None, wav)
+
+    def _enqueue(self, text, wav):
+        with self._lock:
+            self._stream_number += 1
+            stream_number = self._stream_number
+            self._queue.put((self._generation, stream_number, text, wav))
+        return stream_number
+
+    def purge(self):
+        with self._lock:
+            self._generation += 1
+            process = self._process
+        if process is not None:
+            self._signal(process, getattr(signal, "SIGCONT", None))
+            process.kill()
+
+    def pause(self):
+        with self._lock:
+            process = self._process
+        if process is not None:
+            self._signal(process, getattr(signal, "SIGSTOP", None))
+
+    def resume(self):
+        with self._lock:
+            process = self._process
+        if process is not None:
+            self._signal(process, getattr(signal, "SIGCONT", None))
+
+    def is_speaking(self):
+        return self._speaking or not self._queue.empty()
+
+    def synthesize(self, text):
+        return subprocess.run(self._command(text) + ["--stdout"], capture_output=True, check=True).stdout
+
+    def _command(self, text):
+        return [self.executable, "-v", self.voice_id, "-s", str(self.words_per_minute), "--", text]
+
+    @staticmethod
+    def _signal(process, sig):
+        # SIGSTOP/SIGCONT есть только в POSIX
+        if sig is not None and hasattr(os, "kill"):
+            try:
+                os.kill(process.pid, sig)
+            except OSError:
+                pass
+
+    def _run(self):
+        while True:
+            generation, stream_number, text, wav = self._queue.get()
+            with self._lock:
+                if generation != self._generation:
+                    continue
+                self._speaking = True
+                command = self._command(text) if wav is None else self.player
+                self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                                 stderr=subprocess.DEVNULL)
+                process = self._process
+            self._emit(self.on_start_stream, stream_number)
+            if wav is None:
+                self._emit(self.on_sentence, stream_number, 0, len(text))
+            try:
+                process.communicate(wav)
+            except (BrokenPipeError, OSError):
+                process.wait()
+            with self._lock:
+                self._process = None
+                self._speaking = False
+            self._emit(self.on_end_stream, stream_number)
+
+
+class FakeEngine(TTSEngine):
+    """
+    Детерминированный движок для тестов и замеров без звука.
+
+    Время виртуальное: длительность фразы считается по количеству символов,
+    события срабатывают только при вызове advance()/run_until_idle().
+    synthesize() занимает реальное время synthesis_seconds_per_char на символ,
+    чтобы моделировать медленный синтез в фоновых потоках.
+    start_latency - задержка начала звука, если фраза поставлена в пустую
+    очередь (уже стоящие в очереди фразы движок готовит заранее).
+    Журнал enqueued хранит (номер потока, текст, время постановки), журнал
+    spoken - (номер потока, текст, начало, конец) для каждой фразы, дошедшей
+    до конца или прерванной.
+    """
+
+    name = "fake"
+    _WORD_RE = re.compile(r'\S+')
+
+    def __init__(self, chars_per_second=15.0, start_latency=0.0, synthesis_seconds_per_char=0.0):
+        super().__init__()
+        self.chars_per_second = chars_per_second
+        self.start_latency = start_latency
+        self.synthesis_seconds_per_char = synthesis_seconds_per_char
+        self.voice_id = "fake-ru"
+        self.speed = 1.0
+        self.clock = 0.0
+        self._paused_at = None
+        self.enqueued = []
+        self.spoken = []
+        self._stream_number = 0
+        self._queue = []
+        self._current = None
+        self._events = []
+        self._sequence = 0
+
+    def duration(self, text):
+        return len(text) / (self.chars_per_second * self.speed)
+
+    def list_voices(self):
+        return [Voice("fake-ru", "Fake Russian", "ru")]
+
+    def set_voice(self, voice_id):
+        self.voice_id = voice_id
+
+    def set_rate(self, speed):
+        self.speed = speed
+
+    def synthesize(self, text):
+        # Реальное время синтеза задаётся synthesis_seconds_per_char;
+        # результат - тишина длительностью, как у произнесённой фразы
+        if self.synthesis_seconds_per_char:
+            time.sleep(len(text) * self.synthesis_seconds_per_char)
+        frames = int(self.duration(text) * SAMPLE_RATE)
+        return pcm_to_wav(bytes(frames * SAMPLE_WIDTH * CHANNELS))
+
+    def synthesize_words(self, text):
+        wav = self.synthesize(text)
+        chars_per_second = self.chars_per_second * self.speed
+        return wav, [(int(match.start() / chars_per_second * SAMPLE_RATE) * SAMPLE_WIDTH * CHANNELS,
+                      match.start(), match.end() - match.start()) for match in self._WORD_RE.finditer(text)]
+
+    def pause(self):
+        if self._paused_at is None:
+            self._paused_at = self.clock
+
+    def resume(self):
+        if self._paused_at is None:
+            return
+        # Сдвигаем запланированные события на время паузы
+        shift = self.clock - self._paused_at
+        self._paused_at = None
+        self._events = [(when + shift, seq, handler, args) for when, seq, handler, args in self._events]
+        heapq.heapify(self._events)
+
+    def speak(self, text):
+        return self._enqueue(text, self.duration(text))
+
+    def speak_audio(self, wav):
+        pcm, sample_rate, channels, sample_width = wav_to_pcm(wav)
+        return self._enqueue("", len(pcm) / (sample_rate * channels * sample_width))
+
+    def _enqueue(self, text, duration):
+        self._stream_number += 1
+        self._queue.append((self._stream_number, text, duration))
+        self.enqueued.append((self._stream_number, text, self.clock))
+        if self._current is None:
+            self._start_next(self.start_latency)
+        return self._stream_number
+
+    def purge(self):
+        if self._current is not None:
+            stream_number, text, start = self._current
+            self.spoken.append((stream_number, text, start, self.clock))
+            self._current = None
+            self._events = []
+            self._emit(self.on_end_stream, stream_number)
+        self._queue.clear()
+
+    def is_speaking(self):
+        return self._current is not None
+
+    def next_event_time(self):
+        """Виртуальное время ближайшего события или None"""
+        return self._events[0][0] if self._events else None
+
+    def advance(self, seconds):
+        """Продвижение виртуального времени с обработкой событий"""
+        deadline = self.clock + seconds
+        while self._paused_at is None and self._events and self._events[0][0] <= deadline:
+            when, _, handler, args = heapq.heappop(self._events)
+            self.clock = when
+            handler(*args)
+        self.clock = deadline
+
+    def run_until_idle(self, limit=None):
+        """Обработка событий до опустошения очереди"""
+        while self._events and self._paused_at is None:
+            when = self._events[0][0]
+            if limit is not None and when > limit:
+                break
+            self.advance(when - self.clock)
+
+    def _schedule(self, when, handler, *args):
+        self._sequence += 1
+        heapq.heappush(self._events, (when, self._sequence, handler, args))
+
+    def _start_next(self, delay=0.0):
+        if not self._queue:
+            return
+        stream_number, text, duration = self._queue.pop(0)
+        start = self.clock + delay
+        self._current = (stream_number, text, start)
+        self._schedule(start, self._emit_start, stream_number)
+        if text:
+            chars_per_second = len(text) / duration
+            self._schedule(start, self._emit_sentence, stream_number, len(text))
+            for match in self._WORD_RE.finditer(text):
+                self._schedule(start + match.start() / chars_per_second, self._emit_word,
+                               stream_number, match.start(), match.end() - match.start())
+        self._schedule(start + duration, self._finish, stream_number)
+
+    def _emit_start(self, stream_number):
+        self._emit(self.on_start_stream, stream_number)
+
+    def _emit_sentence(self, stream_number, length):
+        self._emit(self.on_sentence, stream_number, 0, length)
+
+    def _emit_word(self, stream_number, position, length):
+        self._emit(self.on_word, stream_number, position, length)
+
+    def _finish(self, stream_number):
+        stream, text, start = self._current
+        self.spoken.append((stream, text, start, self.clock))
+        self._current = None
+        # Фразы, стоявшие в очереди заранее, начинаются без задержки; фраза,
+        # поставленная обработчиком в пустую очередь, - с задержкой старта
+        self._start_next()
+        self._emit(self.on_end_stream, stream_number)
+
+
+ENGINES = {
+    SapiEngine.name: SapiEngine,
+    EspeakEngine.name: EspeakEngine,
+    FakeEngine.name: FakeEngine,
+}
+
+
+def create_engine(name=None):
+    """
+    Создание движка по имени. Без имени выбирается первый доступный:
+    SAPI в Windows, затем espeak-ng
+    """
+    if name:
+        return ENGINES[name]()
+    errors = []
+    for engine_class in (SapiEngine, EspeakEngine):
+        try:
+            return engine_class()
+        except Exception as e:
+            errors.append(f"{engine_class.name}: {e}")
+    raise RuntimeError("Нет доступного движка синтеза речи (" + "; ".join(errors) + ")")
@@ -390,11 +390,24 @@ class Ui_MainWindow(object):
         self.ActOpen.setObjectName("ActOpen")
         self.ActExport = QtGui.QAction(parent=MainWindow)
         self.ActExport.setObjectName("ActExport")
+        self.ActExportAudio = QtGui.QAction(parent=MainWindow)
+        self.ActExportAudio.setObjectName("ActExportAudio")
+        self.ActSearch = QtGui.QAction(parent=MainWindow)
+        self.ActSearch.setObjectName("ActSearch")
+        self.ActHistory = QtGui.QAction(parent=MainWindow)
+        self.ActHistory.setObjectName("ActHistory")
+        self.ActPronunciation = QtGui.QAction(parent=MainWindow)
+        self.ActPronunciation.setObjectName("ActPronunciation")
         self.ActExit = QtGui.QAction(parent=MainWindow)
         self.ActExit.setObjectName("ActExit")
         self.ActAbout = QtGui.QAction(parent=MainWindow)
         self.ActAbout.setObjectName("ActAbout")
+        self.menuFile.addAction(self.ActOpen)
         self.menuFile.addAction(self.ActExport)
+        self.menuFile.addAction(self.ActExportAudio)
+        self.menuFile.addAction(self.ActSearch)
+        self.menuFile.addAction(self.ActHistory)
+        self.menuFile.addAction(self.ActPronunciation)
         self.menuHelp.addAction(self.ActAbout)
         self.menubar.addAction(self.menuFile.menuAction())
         self.menubar.addAction(self.menuHelp.menuAction())
@@ -423,6 +436,14 @@ class Ui_MainWindow(object):
         self.ActOpen.setShortcut(_translate("MainWindow", "Ctrl+O"))
         self.ActExport.setText(_translate("MainWindow", "💾 Экспорт"))
         self.ActExport.setShortcut(_translate("MainWindow", "Ctrl+S"))
+        self.ActExportAudio.setText(_translate("MainWindow", "🔊 Экспорт в аудио"))
+        self.ActExportAudio.setShortcut(_translate("MainWindow", "Ctrl+Shift+S"))
+        self.ActSearch.setText(_translate("MainWindow", "🔍 Поиск"))
+        self.ActSearch.setShortcut(_translate("MainWindow", "Ctrl+F"))
+        self.ActHistory.setText(_translate("MainWindow", "🕘 История версий"))
+        self.ActHistory.setShortcut(_translate("MainWindow", "Ctrl+H"))
+        self.ActPronunciation.setText(_translate("MainWindow", "📖 Словари произношений"))
+        self.ActPronunciation.setShortcut(_translate("MainWindow", "Ctrl+D"))
         self.ActExit.setText(_translate("MainWindow", "🚪 Выход"))
         self.ActExit.setShortcut(_translate("MainWindow", "Ctrl+Q"))
         self.ActAbout.setText(_translate("MainWindow", "О программе 💡"))